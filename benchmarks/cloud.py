@@ -0,0 +1,65 @@
+# Cloud placeholder policies on a profile whose OneDrive folder is simulated as
+# not downloaded: what each policy finds, and how many bytes the sync client
+# downloads for it.
+#
+#   python -m benchmarks.cloud --rows 50000
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.synth import ROSTER_HEADER, roster_rows, write_roster_xls, write_roster_xlsx
+from globalfinder.cloud import POLICIES, CloudPolicy, SimulatedAttributes
+from globalfinder.scanner import find_matching_files
+from globalfinder.telemetry import telemetry
+
+EXTENSIONS = ('.csv', '.xls', '.xlsx')
+OTHER_HEADER = ['Date', 'Amount', 'Memo', 'Region', 'Account', 'Owner', 'Status']
+
+
+def _write_csv(path, header, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(','.join(header) + '\r\n')
+        for row in roster_rows(rows):
+            f.write(','.join(str(value) for value in row) + '\r\n')
+
+
+def build_profile(root, rows):
+    for folder in ('Documents', 'OneDrive'):
+        directory = os.path.join(root, folder)
+        os.makedirs(directory)
+        _write_csv(os.path.join(directory, 'roster.csv'), ROSTER_HEADER, rows)
+        _write_csv(os.path.join(directory, 'ledger.csv'), OTHER_HEADER, rows)
+        write_roster_xlsx(os.path.join(directory, 'roster.xlsx'), rows)
+        write_roster_xlsx(os.path.join(directory, 'ledger.xlsx'), rows, header=OTHER_HEADER)
+        write_roster_xls(os.path.join(directory, 'roster.xls'), rows)
+    return sum(os.path.getsize(os.path.join(root, 'OneDrive', name)) for name in os.listdir(os.path.join(root, 'OneDrive')))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cloud_bytes = build_profile(tmp, args.rows)
+        print(f"OneDrive holds {cloud_bytes / 1024 / 1024:.1f} MB in placeholders")
+        provider = SimulatedAttributes(['*/OneDrive/*'])
+
+        for policy in POLICIES:
+            telemetry.counters.clear()
+            cloud = CloudPolicy(policy, provider=provider)
+            started = time.perf_counter()
+            found = find_matching_files(tmp, EXTENSIONS, cloud=cloud)
+            elapsed = time.perf_counter() - started
+
+            counters = telemetry.counters
+            in_cloud = sorted(os.path.basename(hit.path) for hit in found if os.sep + 'OneDrive' + os.sep in hit.path)
+            print(f"  {policy:<8} {elapsed * 1000:7.1f} ms  {counters['cloud.hydrated_bytes'] / 1024 / 1024:7.2f} MB hydrated  "
+                  f"{counters['cloud.skipped']} skipped  {counters['cloud.inconclusive']} inconclusive  "
+                  f"found in OneDrive: {', '.join(in_cloud) or 'nothing'}")
+
+
+if __name__ == '__main__':
+    main()
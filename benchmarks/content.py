@@ -0,0 +1,167 @@
+# Precision and recall of header-only detection against header plus the content
+# classifier, on a labeled corpus of rosters with renamed or missing headers and
+# of look-alike files that are not rosters, and what the second stage costs.
+#
+#   python -m benchmarks.content --copies 20 --rows 500
+
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.synth import COUNTRIES, FIRST_NAMES, GROUPS, LAST_NAMES, ROSTER_HEADER, TITLES, write_xls, write_xlsx
+from globalfinder.content import ContentClassifier
+from globalfinder.scanner import process_matching_file
+
+RENAMED_HEADER = ['Emp #', 'Name', 'Start Date', 'Country', 'Job Title', 'E-mail', 'Department']
+TITLE_BLOCK = [['Headcount by department'], ['Exported from Workday'], []]
+
+
+def _person(rng):
+    return rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+
+def _day(rng):
+    return date(1995, 1, 1) + timedelta(days=rng.randrange(10000))
+
+
+def _roster(rng, rows, dates='iso', ids='prefixed', names='first last'):
+    for number in range(rows):
+        first, last = _person(rng)
+        hired = _day(rng)
+        yield [
+            f"E{100000 + number}" if ids == 'prefixed' else str(200000 + number),
+            f"{first} {last}" if names == 'first last' else f"{last}, {first}",
+            hired.isoformat() if dates == 'iso' else hired.strftime('%m/%d/%Y'),
+            rng.choice(COUNTRIES),
+            rng.choice(TITLES),
+            f"{first}.{last}{number}@example.com".lower(),
+            rng.choice(GROUPS),
+        ]
+
+
+def positives(rng, rows):
+    # (name, extension, sheets)
+    body = list(_roster(rng, rows))
+    us_style = list(_roster(rng, rows, dates='us', ids='digits', names='last first'))
+    reordered = [[row[5], row[1], row[0], row[6], row[3], row[2], row[4]] for row in body]
+    return [
+        ('exact header', '.csv', [('Sheet1', [ROSTER_HEADER] + body)]),
+        ('renamed header', '.csv', [('Sheet1', [RENAMED_HEADER] + body)]),
+        ('renamed header', '.xlsx', [('Sheet1', [RENAMED_HEADER] + body)]),
+        ('renamed header', '.xls', [('Sheet1', [RENAMED_HEADER] + body)]),
+        ('headerless', '.csv', [('Sheet1', body)]),
+        ('headerless', '.xlsx', [('Sheet1', body)]),
+        ('title block, renamed', '.xlsx', [('Summary', [['Total', rows]]), ('Data', TITLE_BLOCK + [RENAMED_HEADER] + body)]),
+        ('headerless, US dates', '.csv', [('Sheet1', us_style)]),
+        ('headerless, reordered', '.csv', [('Sheet1', reordered)]),
+    ]
+
+
+def negatives(rng, rows):
+    ledger = [['Date', 'Amount', 'Memo', 'Region']] + [
+        [_day(rng).isoformat(), f"{rng.randrange(100000) / 100:.2f}", f"memo {number}", rng.choice(['EMEA', 'APAC'])]
+        for number in range(rows)
+    ]
+    contacts = [['Name', 'Email', 'Phone']] + [
+        [' '.join(_person(rng)), f"contact{number}@example.org", f"+1 555 {rng.randrange(10000):04d}"]
+        for number in range(rows)
+    ]
+    orders = [['Order', 'Ordered', 'Ship Country', 'Amount']] + [
+        [f"SO-{500000 + number}", _day(rng).isoformat(), rng.choice(COUNTRIES), f"{rng.randrange(10000)}.00"]
+        for number in range(rows)
+    ]
+    vendors = [['Vendor ID', 'Vendor', 'Country', 'Terms']] + [
+        [f"V{10000 + number}", f"{rng.choice(LAST_NAMES)} Trading", rng.choice(COUNTRIES), 'Net 30']
+        for number in range(rows)
+    ]
+    survey = [['Submitted', 'Respondent', 'Rating', 'Comment']] + [
+        [_day(rng).isoformat(), f"user{number}@example.net", str(rng.randrange(1, 6)), 'ok']
+        for number in range(rows)
+    ]
+    log = [
+        [f"{_day(rng).isoformat()} 12:00:{number % 60:02d}", rng.choice(['INFO', 'WARN']), f"request {number} served"]
+        for number in range(rows)
+    ]
+    partial = [ROSTER_HEADER[:4]] + [row[:4] for row in _roster(rng, rows)]
+    return [
+        ('ledger', '.csv', [('Sheet1', ledger)]),
+        ('contact list', '.csv', [('Sheet1', contacts)]),
+        ('contact list', '.xlsx', [('Sheet1', contacts)]),
+        ('orders', '.xlsx', [('Orders', orders)]),
+        ('vendors', '.csv', [('Sheet1', vendors)]),
+        ('survey', '.xls', [('Sheet1', survey)]),
+        ('log export', '.csv', [('Sheet1', log)]),
+        ('partial roster', '.csv', [('Sheet1', partial)]),
+    ]
+
+
+def write(path, extension, sheets):
+    if extension == '.csv':
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            csv.writer(f).writerows(sheets[0][1])
+    elif extension == '.xlsx':
+        write_xlsx(path, sheets)
+    else:
+        write_xls(path, sheets)
+
+
+def build_corpus(root, copies, rows):
+    corpus = []
+    for copy in range(copies):
+        rng = random.Random(copy)
+        for label, cases in ((True, positives(rng, rows)), (False, negatives(rng, rows))):
+            for number, (name, extension, sheets) in enumerate(cases):
+                path = os.path.join(root, f"{'pos' if label else 'neg'}{copy}-{number}{extension}")
+                write(path, extension, sheets)
+                corpus.append((name, extension, path, label))
+    return corpus
+
+
+def evaluate(corpus, content, repeat):
+    timings = []
+    for _ in range(repeat):
+        outcomes = {}
+        started = time.perf_counter()
+        for name, extension, path, label in corpus:
+            found = bool(process_matching_file(path, content=content))
+            outcomes.setdefault((name, extension, label), []).append(found)
+        timings.append(time.perf_counter() - started)
+    elapsed = min(timings)
+    true_positives = sum(found for (_, _, label), results in outcomes.items() if label for found in results)
+    false_positives = sum(found for (_, _, label), results in outcomes.items() if not label for found in results)
+    positives_total = sum(len(results) for (_, _, label), results in outcomes.items() if label)
+    precision = true_positives / (true_positives + false_positives) if true_positives + false_positives else 1.0
+    return precision, true_positives / positives_total, len(corpus) / elapsed, outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--copies', type=int, default=20)
+    parser.add_argument('--rows', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = build_corpus(tmp, args.copies, args.rows)
+        print(f"{len(corpus)} files, {sum(label for *_, label in corpus)} rosters")
+        results = {
+            'header only': evaluate(corpus, None, args.repeat),
+            'header + content': evaluate(corpus, ContentClassifier(), args.repeat),
+        }
+        for mode, (precision, recall, rate, _) in results.items():
+            print(f"  {mode:<17} precision {precision:5.3f}  recall {recall:5.3f}  {rate:7.0f} files/s")
+
+        print('  per case (found / files, header only -> header + content):')
+        before, after = results['header only'][3], results['header + content'][3]
+        for key in after:
+            name, extension, label = key
+            print(f"    {'roster' if label else 'other ':<6} {name + ' ' + extension:<28} "
+                  f"{sum(before[key])}/{len(before[key])} -> {sum(after[key])}/{len(after[key])}")
+
+
+if __name__ == '__main__':
+    main()
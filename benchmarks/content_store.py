@@ -0,0 +1,81 @@
+# The content store the scanner wrote through before globalfinder.upload: one
+# hit at a time, each paying for its own exists check and copy from the
+# calling thread. Kept as the baseline for benchmarks.dedup and benchmarks.upload.
+
+import os
+import socket
+import threading
+
+from globalfinder.store import HASH_NAME, hash_file, hit_row, object_name
+from globalfinder.telemetry import telemetry
+from globalfinder.transfer import resumable_copy
+
+
+class ContentStore:
+    # Keeps one copy of every distinct file body under <share>/objects/<aa>/<digest>.
+    # A hit is hashed from local disk first, and only bodies the share does not
+    # have yet are sent over the network; every occurrence is still recorded in
+    # the run's manifest with a pointer to its object.
+
+    def __init__(self, share_root, hash_name=HASH_NAME, limiter=None, timeout=None, part_suffix=None):
+        self.share_root = share_root
+        self.hash_name = hash_name
+        self.limiter = limiter
+        self.timeout = timeout
+        self.part_suffix = part_suffix or socket.gethostname()
+        self.bytes_hashed = 0
+        self.bytes_stored = 0
+        self.objects_stored = 0
+        self._known = set()
+        self._uploading = {}
+        self._lock = threading.Lock()
+
+    def object_path(self, digest):
+        return os.path.join(self.share_root, *object_name(digest).split('/'))
+
+    def put(self, src):
+        # Returns (digest, size, stored) where stored is False for a body the share already had
+        digest, size = hash_file(src, self.hash_name)
+        telemetry.count('bytes.hashed', size)
+        with self._lock:
+            self.bytes_hashed += size
+            # Threads holding the same new body queue up behind the first one
+            # instead of writing the same partial file at once
+            uploading = self._uploading.setdefault(digest, threading.Lock())
+
+        with uploading:
+            with self._lock:
+                known = digest in self._known
+            stored = False
+            dest = self.object_path(digest)
+            if not known and not os.path.exists(dest):
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                # The partial copy is named after this host, so an interrupted upload resumes
+                # on the next run and two hosts storing the same body never share a file
+                resumable_copy(
+                    src, dest,
+                    part_path=f"{dest}.{self.part_suffix}.part",
+                    limiter=self.limiter,
+                    timeout=self.timeout,
+                    expected_digest=digest,
+                    hash_name=self.hash_name,
+                )
+                stored = True
+
+            with self._lock:
+                self._known.add(digest)
+                self._uploading.pop(digest, None)
+                if stored:
+                    self.bytes_stored += size
+                    self.objects_stored += 1
+
+        telemetry.count('bytes.copied' if stored else 'bytes.deduplicated', size)
+        return digest, size, stored
+
+
+def store_file_and_record(src, store, manifest, hostname, username, hit=None):
+    # manifest is a ManifestWriter
+    file_stat = os.stat(src)
+    digest, size, stored = store.put(src)
+    manifest.add(hit_row(src, file_stat, hostname, username, store.hash_name, digest, size, stored, hit))
+    return digest
@@ -0,0 +1,277 @@
+# Builds a reproducible tree of user profiles for the scanner to sweep: a
+# <root>/Users folder standing in for C:\Users, with CSV, XLSX, XLS and ZIP files
+# in the usual profile folders, a chosen share of them rosters, plus documents
+# the scan has to walk past. The rosters are listed in <root>/corpus.json so a
+# sweep can be scored against them.
+#
+#   python -m benchmarks.corpus /tmp/corpus --users 20 --files 40 --mix csv=5,xlsx=3,xls=1,zip=1
+
+import argparse
+import csv
+import io
+import json
+import math
+import os
+import random
+import zipfile
+from collections import Counter, namedtuple
+from datetime import date, timedelta
+
+from benchmarks.synth import COUNTRIES, FIRST_NAMES, GROUPS, LAST_NAMES, ROSTER_HEADER, TITLES, write_xls, write_xlsx
+
+CorpusSpec = namedtuple(
+    'CorpusSpec',
+    'users folders files mix rows hit_rate renamed_rate zip_depth encodings noise depth seed',
+)
+
+DEFAULT_SPEC = CorpusSpec(
+    users=10,
+    folders=('Documents', 'Downloads', 'Desktop', 'OneDrive'),
+    files=25,
+    mix=(('csv', 5), ('xlsx', 3), ('xls', 1), ('zip', 1)),
+    rows=(20, 5000),
+    hit_rate=0.1,
+    renamed_rate=0.25,
+    zip_depth=2,
+    encodings=('utf-8', 'utf-8-sig', 'utf-16', 'cp1252'),
+    noise=10,
+    depth=2,
+    seed=0,
+)
+
+CORPUS_FILE = 'corpus.json'
+
+# Column names HR systems export instead of the ones the header matcher knows;
+# such a roster is only found by content
+RENAMED_HEADER = ['Emp #', 'Name', 'Start Date', 'Country', 'Job Title', 'E-mail', 'Department']
+OTHER_HEADERS = [
+    ['Date', 'Amount', 'Memo', 'Region', 'Account'],
+    ['Order', 'Ordered', 'Ship Country', 'Amount'],
+    ['Name', 'Email', 'Phone'],
+    ['Vendor ID', 'Vendor', 'Country', 'Terms'],
+    ['Project', 'Owner', 'Status', 'Due'],
+]
+# Spelled the way cp1252 exports carry them
+ACCENTED_NAMES = ['José', 'Zoë', 'Müller', 'Søren', 'Françoise']
+NOISE_TYPES = ['.docx', '.pdf', '.txt', '.pptx', '.msg', '.png']
+SUBFOLDERS = ['Reports', 'HR', 'Projects', 'Archive', '2023', '2024', 'Exports']
+FILE_NAMES = {
+    True: ['Global Headcount', 'employee roster', 'Workday export', 'staff list', 'HC report'],
+    False: ['budget', 'orders', 'contacts', 'vendors', 'status', 'export', 'Book1'],
+}
+DELIMITERS = [',', ',', ',', ';', '\t']
+
+
+def _roster_rows(rng, count):
+    start = date(1995, 1, 1)
+    for number in range(count):
+        first = rng.choice(FIRST_NAMES + ACCENTED_NAMES[:2])
+        last = rng.choice(LAST_NAMES + ACCENTED_NAMES[2:])
+        yield [
+            f"E{100000 + number}",
+            f"{first} {last}",
+            (start + timedelta(days=rng.randrange(10000))).isoformat(),
+            rng.choice(COUNTRIES),
+            rng.choice(TITLES),
+            f"user{number}.{rng.randrange(10000)}@example.com",
+            rng.choice(GROUPS),
+        ]
+
+
+def _other_rows(rng, header, count):
+    for number in range(count):
+        yield [
+            f"{rng.randrange(100000) / 100:.2f}" if column in ('Amount', 'Terms')
+            else (date(2020, 1, 1) + timedelta(days=rng.randrange(1500))).isoformat() if column in ('Date', 'Ordered', 'Due')
+            else f"{column.split()[0].lower()} {number}-{rng.randrange(1000)}"
+            for column in header
+        ]
+
+
+def _sheet(rng, kind, rows):
+    # (header, rows) for a roster ('header' or 'renamed') or for anything else (None)
+    if kind is None:
+        header = rng.choice(OTHER_HEADERS)
+        return header, list(_other_rows(rng, header, rows))
+    return (ROSTER_HEADER if kind == 'header' else RENAMED_HEADER), list(_roster_rows(rng, rows))
+
+
+def _csv_bytes(header, rows, delimiter, encoding):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter, lineterminator='\r\n')
+    writer.writerow(header)
+    writer.writerows(rows)
+    return buffer.getvalue().encode(encoding)
+
+
+def _xlsx_bytes(sheets):
+    # zipfile takes a file object as well as a path
+    buffer = io.BytesIO()
+    write_xlsx(buffer, sheets)
+    return buffer.getvalue()
+
+
+def _zip_bytes(rng, kind, rows, depth):
+    # A few members, one of them the roster if there is one; below the top level
+    # an archive may nest another, and the roster sits in the deepest one
+    buffer = io.BytesIO()
+    nested = depth > 1 and rng.random() < 0.5
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for number in range(rng.randint(1, 3)):
+            header, body = _sheet(rng, None, max(1, rows // 4))
+            archive.writestr(f"attachments/part{number}.csv", _csv_bytes(header, body, ',', 'utf-8'))
+        if nested:
+            archive.writestr('inner.zip', _zip_bytes(rng, kind, rows, depth - 1))
+        elif kind is not None:
+            header, body = _sheet(rng, kind, rows)
+            if rng.random() < 0.5:
+                archive.writestr('export/headcount.csv', _csv_bytes(header, body, ',', 'utf-8'))
+            else:
+                archive.writestr('export/headcount.xlsx', _xlsx_bytes([('Roster', [header] + body)]))
+    return buffer.getvalue()
+
+
+def _rows(rng, spec):
+    # Log-uniform: mostly small exports and a long tail of big ones
+    low, high = spec.rows
+    return int(math.exp(rng.uniform(math.log(max(low, 1)), math.log(max(high, low, 1)))))
+
+
+def _write_candidate(path, fmt, kind, rng, spec):
+    rows = _rows(rng, spec)
+    if fmt == 'csv':
+        header, body = _sheet(rng, kind, rows)
+        encoding = rng.choice(spec.encodings)
+        delimiter = '\t' if encoding == 'utf-16' else rng.choice(DELIMITERS)
+        with open(path, 'wb') as f:
+            f.write(_csv_bytes(header, body, delimiter, encoding))
+    elif fmt == 'xlsx':
+        header, body = _sheet(rng, kind, rows)
+        sheets = [('Roster' if kind else 'Sheet1', [header] + body)]
+        if rng.random() < 0.3:
+            sheets.insert(0, ('Summary', [['Total', rows], ['Generated', '2024-01-31']]))
+        write_xlsx(path, sheets)
+    elif fmt == 'xls':
+        header, body = _sheet(rng, kind, min(rows, 65535))
+        write_xls(path, [('Roster' if kind else 'Sheet1', [header] + body)])
+    else:
+        with open(path, 'wb') as f:
+            f.write(_zip_bytes(rng, kind, rows, spec.zip_depth))
+
+
+def build_corpus(root, spec=DEFAULT_SPEC):
+    # Returns the corpus description that is also written to <root>/corpus.json
+    rng = random.Random(spec.seed)
+    formats = [fmt for fmt, _ in spec.mix]
+    weights = [weight for _, weight in spec.mix]
+    counts = Counter()
+    rosters = []
+    total_bytes = 0
+
+    for user in range(spec.users):
+        for folder in spec.folders:
+            for number in range(spec.files):
+                directory = os.path.join(root, 'Users', f"user{user:03d}", folder,
+                                         *rng.sample(SUBFOLDERS, rng.randint(0, spec.depth)))
+                os.makedirs(directory, exist_ok=True)
+                fmt = rng.choices(formats, weights)[0]
+                kind = None
+                if rng.random() < spec.hit_rate:
+                    kind = 'renamed' if rng.random() < spec.renamed_rate else 'header'
+                path = os.path.join(directory, f"{rng.choice(FILE_NAMES[kind is not None])} {number}.{fmt}")
+                _write_candidate(path, fmt, kind, rng, spec)
+                counts[fmt] += 1
+                total_bytes += os.path.getsize(path)
+                if kind is not None:
+                    rosters.append({'path': os.path.relpath(path, root), 'kind': kind, 'format': fmt})
+
+            directory = os.path.join(root, 'Users', f"user{user:03d}", folder)
+            for number in range(spec.noise):
+                extension = rng.choice(NOISE_TYPES)
+                with open(os.path.join(directory, f"document {number}{extension}"), 'wb') as f:
+                    f.write(rng.randbytes(rng.randrange(256, 16384)))
+                counts['other'] += 1
+
+    corpus = {
+        'spec': spec._asdict(),
+        'files': sum(counts.values()),
+        'candidates': sum(count for fmt, count in counts.items() if fmt != 'other'),
+        'bytes': total_bytes,
+        'formats': dict(sorted(counts.items())),
+        'rosters': rosters,
+    }
+    with open(os.path.join(root, CORPUS_FILE), 'w', encoding='utf-8') as f:
+        json.dump(corpus, f, indent=2)
+    return corpus
+
+
+def load_corpus(root):
+    with open(os.path.join(root, CORPUS_FILE), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _mix(value):
+    mix = []
+    for part in value.split(','):
+        fmt, _, weight = part.partition('=')
+        if fmt.strip() not in ('csv', 'xlsx', 'xls', 'zip'):
+            raise argparse.ArgumentTypeError(f"unknown format: {fmt}")
+        mix.append((fmt.strip(), float(weight or 1)))
+    return tuple(mix)
+
+
+def _range(value):
+    low, _, high = value.partition('-')
+    return int(low), int(high or low)
+
+
+def _names(value):
+    return tuple(part.strip() for part in value.split(',') if part.strip())
+
+
+def add_corpus_arguments(parser):
+    parser.add_argument('--users', type=int, default=DEFAULT_SPEC.users)
+    parser.add_argument('--folders', type=_names, default=DEFAULT_SPEC.folders,
+                        help='comma-separated profile folders')
+    parser.add_argument('--files', type=int, default=DEFAULT_SPEC.files,
+                        help='spreadsheets and archives per profile folder')
+    parser.add_argument('--mix', type=_mix, default=DEFAULT_SPEC.mix,
+                        help='relative weights of the formats, e.g. csv=5,xlsx=3,xls=1,zip=1')
+    parser.add_argument('--rows', type=_range, default=DEFAULT_SPEC.rows,
+                        help='rows per file, drawn log-uniformly from LOW-HIGH')
+    parser.add_argument('--hit-rate', type=float, default=DEFAULT_SPEC.hit_rate,
+                        help='share of the files that are rosters')
+    parser.add_argument('--renamed-rate', type=float, default=DEFAULT_SPEC.renamed_rate,
+                        help='share of the rosters whose columns are renamed, so only content detection finds them')
+    parser.add_argument('--zip-depth', type=int, default=DEFAULT_SPEC.zip_depth,
+                        help='archives nest up to this many levels')
+    parser.add_argument('--encodings', type=_names, default=DEFAULT_SPEC.encodings,
+                        help='comma-separated encodings the CSV files are written in')
+    parser.add_argument('--noise', type=int, default=DEFAULT_SPEC.noise,
+                        help='other documents per profile folder')
+    parser.add_argument('--depth', type=int, default=DEFAULT_SPEC.depth,
+                        help='subfolders a file may sit in below the profile folder')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SPEC.seed)
+
+
+def spec_from_arguments(args):
+    return CorpusSpec(**{field: getattr(args, field) for field in CorpusSpec._fields})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('root', help='directory the corpus is built in; it must not exist yet')
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+
+    os.makedirs(args.root)
+    corpus = build_corpus(args.root, spec_from_arguments(args))
+    kinds = Counter(roster['kind'] for roster in corpus['rosters'])
+    print(f"{corpus['files']} files ({corpus['candidates']} spreadsheets and archives, "
+          f"{corpus['bytes'] / 1024 / 1024:.1f} MB), {len(corpus['rosters'])} rosters "
+          f"({kinds['header']} with the known header, {kinds['renamed']} renamed)")
+    print(', '.join(f"{fmt} {count}" for fmt, count in corpus['formats'].items()))
+
+
+if __name__ == '__main__':
+    main()
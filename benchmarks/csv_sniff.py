@@ -0,0 +1,70 @@
+# Accuracy of globalfinder.csvsniff on the variant corpus (against the old text-mode
+# csv.reader check) and per-file cost as the file grows.
+#
+#   python -m benchmarks.csv_sniff
+
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+from globalfinder.csvsniff import csv_contains_columns
+from benchmarks.synth import ROSTER_HEADER, csv_variants, roster_rows
+
+REQUIRED_COLUMNS = {column.lower() for column in ROSTER_HEADER}
+
+
+def old_check(file_path):
+    # find_matching_files in GlobalRoster_nodebug.py before the shared CSV sniffer
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as csvfile:
+        header = next(csv.reader(csvfile))
+    return REQUIRED_COLUMNS.issubset({col.strip().lower().replace('\ufeff', '') for col in header})
+
+
+def _time_per_file(check, path, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        check(path)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'variant':>20}  expected  sniffer  old")
+        for name, data, expected in csv_variants():
+            path = os.path.join(tmp, f"{name}.csv")
+            with open(path, 'wb') as f:
+                f.write(data)
+            sniffed = csv_contains_columns(path, REQUIRED_COLUMNS)
+            try:
+                old = old_check(path)
+            except Exception:
+                old = False
+            print(f"{name:>20}  {expected!s:>8}  {sniffed!s:>7}  {old!s:>5}")
+            if sniffed != expected:
+                failures.append(name)
+
+        print()
+        print(f"{'rows':>10}  {'size':>9}  {'sniffer':>12}")
+        line = (','.join(next(roster_rows(1))) + '\r\n').encode()
+        for rows in (10, 10000, 1000000):
+            path = os.path.join(tmp, f"big_{rows}.csv")
+            with open(path, 'wb') as f:
+                f.write((','.join(ROSTER_HEADER) + '\r\n').encode())
+                f.write(line * rows)
+            size = os.path.getsize(path) / 1024 / 1024
+            per_file = _time_per_file(lambda p: csv_contains_columns(p, REQUIRED_COLUMNS), path, args.repeat)
+            print(f"{rows:>10}  {size:>6.1f} MB  {per_file:>9.0f} us")
+
+    if failures:
+        raise SystemExit(f"misclassified: {', '.join(failures)}")
+
+
+if __name__ == '__main__':
+    main()
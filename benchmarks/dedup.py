@@ -0,0 +1,91 @@
+# Copy-every-hit (shutil.copy + _info.txt) versus the content store on a fleet where
+# the same few roster exports sit in several folders of many hosts. A local
+# directory stands in for the share.
+#
+#   python -m benchmarks.dedup --hosts 50 --unique 5
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from globalfinder.manifest import ManifestWriter
+from benchmarks.content_store import ContentStore, store_file_and_record
+from benchmarks.synth import write_roster_xlsx
+
+FOLDERS = ['Downloads', 'Desktop', 'OneDrive']
+
+
+def copy_everything(src, dest_folder, hostname, username):
+    # copy_file_and_create_info_file from GlobalFinder_2.3.py before the content store
+    os.makedirs(dest_folder, exist_ok=True)
+    shutil.copy(src, os.path.join(dest_folder, os.path.basename(src)))
+    with open(os.path.join(dest_folder, os.path.basename(src) + '_info.txt'), 'w') as f:
+        f.write(f"File location: {src}\nHostname: {hostname}\nUsername: {username}\n")
+
+
+def share_usage(root):
+    files = 0
+    size = 0
+    for directory, _, names in os.walk(root):
+        for name in names:
+            files += 1
+            size += os.path.getsize(os.path.join(directory, name))
+    return files, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hosts', type=int, default=50)
+    parser.add_argument('--unique', type=int, default=5, help='distinct roster bodies across the fleet')
+    parser.add_argument('--rows', type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bodies = []
+        for number in range(args.unique):
+            path = os.path.join(tmp, f"body_{number}.xlsx")
+            write_roster_xlsx(path, rows=args.rows, seed=number)
+            bodies.append(path)
+
+        hits = []
+        for host in range(args.hosts):
+            for position, folder in enumerate(FOLDERS):
+                directory = os.path.join(tmp, 'hosts', f"host{host}", folder)
+                os.makedirs(directory)
+                path = os.path.join(directory, 'Global Headcount.xlsx')
+                shutil.copy(bodies[(host + position) % len(bodies)], path)
+                hits.append((f"host{host}", path))
+
+        results = {}
+        for label in ('copy everything', 'content store'):
+            share = os.path.join(tmp, label.replace(' ', '_'))
+            store = ContentStore(share)
+            manifests = {}
+            started = time.perf_counter()
+            for hostname, path in hits:
+                if label == 'copy everything':
+                    copy_everything(path, os.path.join(share, f"{hostname}.user"), hostname, 'user')
+                else:
+                    manifest = manifests.setdefault(hostname, ManifestWriter(share, hostname))
+                    store_file_and_record(path, store, manifest, hostname, 'user')
+            for manifest in manifests.values():
+                manifest.close()
+            elapsed = time.perf_counter() - started
+            transferred = store.bytes_stored if label == 'content store' else sum(
+                os.path.getsize(path) for _, path in hits
+            )
+            results[label] = (elapsed, transferred, *share_usage(share))
+
+        hit_bytes = sum(os.path.getsize(path) for _, path in hits)
+        print(f"{len(hits)} hits on {args.hosts} hosts, {args.unique} distinct bodies, "
+              f"{hit_bytes / 1024 / 1024:.1f} MB of hits")
+        for label, (elapsed, transferred, files, size) in results.items():
+            print(f"{label:>16}: {elapsed:6.2f} s  {transferred / 1024 / 1024:8.1f} MB sent  "
+                  f"{size / 1024 / 1024:8.1f} MB on share  {files:6} files")
+        print('(copy everything keeps fewer files than hits because same-named files overwrite each other)')
+
+
+if __name__ == '__main__':
+    main()
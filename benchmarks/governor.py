@@ -0,0 +1,90 @@
+# What the governed mode costs and what it achieves: a generated corpus
+# (benchmarks.corpus) swept by globalfinder.scheduler.ScanPipeline without a
+# governor, with one whose budgets never bind (the cost of pacing alone), and
+# under a range of CPU and read budgets. Achieved CPU is process CPU time over
+# wall time, as a share of one core; achieved reads come from the same counter
+# the governor uses.
+#
+#   python -m benchmarks.governor --users 4 --cpu 50,25,10 --read-mb 20,5
+
+import argparse
+import os
+import tempfile
+import time
+from functools import partial
+
+from benchmarks.corpus import add_corpus_arguments, build_corpus, load_corpus, spec_from_arguments
+from globalfinder.detectors import extensions_for
+from globalfinder.governor import Governor, read_bytes_counter
+from globalfinder.scanner import classify_file, list_jobs
+from globalfinder.scheduler import ScanPipeline
+from globalfinder.telemetry import telemetry
+
+EXTENSIONS = extensions_for(['csv', 'xls', 'xlsx', 'zip'])
+
+
+def sweep(root, folders, governor, read_bytes):
+    # Returns (seconds, cpu share of one core, read bytes/s, hits)
+    hits = []
+    pipeline = ScanPipeline(
+        accept=lambda name: name.lower().endswith(EXTENSIONS),
+        classify=partial(classify_file, extensions=EXTENSIONS),
+        upload=lambda user, hit: hits.append(hit),
+        walk_workers=1,
+        sniff_workers=2,
+        copy_workers=1,
+        governor=governor,
+    )
+    jobs = list_jobs(os.path.join(root, 'Users'), folders)
+    started, cpu, read = time.perf_counter(), time.process_time(), read_bytes()
+    pipeline.run(jobs)
+    elapsed = time.perf_counter() - started
+    return elapsed, (time.process_time() - cpu) / elapsed, (read_bytes() - read) / elapsed, len(hits)
+
+
+def _numbers(value):
+    return [float(part) for part in value.split(',') if part.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--corpus', help='corpus built by benchmarks.corpus; a temporary one is built otherwise')
+    parser.add_argument('--cpu', type=_numbers, default=[50, 25, 10], help='CPU budgets, percent of one core')
+    parser.add_argument('--read-mb', type=_numbers, default=[20, 5], help='read budgets, MB per second')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of the ungoverned sweeps, fastest kept')
+    add_corpus_arguments(parser)
+    parser.set_defaults(users=4, files=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = args.corpus
+        if root is None:
+            root = os.path.join(tmp, 'corpus')
+            os.makedirs(root)
+            build_corpus(root, spec_from_arguments(args))
+        corpus = load_corpus(root)
+        folders = corpus['spec']['folders']
+        read_bytes = read_bytes_counter()
+        print(f"{corpus['files']} files, {corpus['bytes'] / 1024 / 1024:.1f} MB of candidates")
+
+        # The first sweep warms the page cache, so every row below reads from memory
+        sweep(root, folders, None, read_bytes)
+        runs = [
+            ('no governor', lambda: None, args.repeat),
+            ('budgets never bind', lambda: Governor(100000, 1024 ** 4), args.repeat),
+        ]
+        runs += [(f"CPU {budget:g}%", partial(Governor, budget), 1) for budget in args.cpu]
+        runs += [(f"read {budget:g} MB/s", partial(Governor, None, budget * 1024 * 1024), 1) for budget in args.read_mb]
+
+        baseline = None
+        for label, make, repeat in runs:
+            telemetry.counters.clear()
+            elapsed, cpu, read, hits = min(sweep(root, folders, make(), read_bytes) for _ in range(repeat))
+            baseline = baseline or elapsed
+            print(f"  {label:<20} {elapsed:6.2f} s  {corpus['files'] / elapsed:7.0f} files/s  x{elapsed / baseline:5.2f}  "
+                  f"CPU {cpu * 100:5.1f}%  read {read / 1024 / 1024:6.1f} MB/s  "
+                  f"{telemetry.counters['governor.pauses']:5} pauses  {hits} hits")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# Scaffolding shared by the header-sniffer benchmarks. Every method is timed in
+# its own interpreter so peak RSS is not shared between them, and the input
+# files are written by another one: Linux carries the parent's peak RSS over
+# into the workers it starts, which would swamp their own numbers.
+#
+# A benchmark module built on it handles the hidden --worker and --generate
+# arguments by calling time_checks and its own generator.
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+
+def peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes everywhere else
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def add_worker_arguments(parser):
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--generate', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('paths', nargs='*', help=argparse.SUPPRESS)
+
+
+def time_checks(method, check, paths):
+    # Runs in the worker: checks every path and prints the stats as JSON.
+    # The first file is checked once beforehand so that importing the
+    # method's dependencies is not counted against it.
+    check(paths[0])
+    baseline_rss = peak_rss_kb()
+
+    latencies = []
+    matched = 0
+    for path in paths:
+        started = time.perf_counter()
+        matched += bool(check(path))
+        latencies.append(time.perf_counter() - started)
+
+    latencies.sort()
+    print(json.dumps({
+        'method': method,
+        'files': len(paths),
+        'matched': matched,
+        'mean_ms': 1000 * sum(latencies) / len(latencies),
+        'p50_ms': 1000 * latencies[len(latencies) // 2],
+        'max_ms': 1000 * latencies[-1],
+        'peak_rss_kb': peak_rss_kb(),
+        'peak_rss_growth_kb': peak_rss_kb() - baseline_rss,
+    }))
+
+
+def generate(module, paths, *options):
+    subprocess.run([sys.executable, '-m', module, '--generate', *options, *paths], check=True)
+
+
+def run_worker(module, method, paths):
+    # Returns the worker's stats, or None (after saying why) when the method
+    # cannot run here, e.g. because pandas is not installed
+    result = subprocess.run(
+        [sys.executable, '-m', module, '--worker', method, *paths],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        print(f"{method}: unavailable ({result.stderr.strip().splitlines()[-1]})")
+        return None
+    return json.loads(result.stdout)
@@ -0,0 +1,123 @@
+# What recording hits costs and leaves on the share: one _info.txt per hit (the
+# original scripts), one manifest.jsonl appended per host and user, and one
+# manifest per host and run. Then the fleet merge of the per-run manifests
+# into SQLite and a query against it.
+#
+#   python -m benchmarks.manifest --hosts 100 --hits 50000
+
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.dedup import share_usage
+from globalfinder.fleet import merge_manifests
+from globalfinder.manifest import FORMATS, ManifestWriter, parquet_available
+
+
+def info_file(dest_folder, src, file_stat, hostname, username):
+    # copy_file_and_create_info_file from GlobalFinder_2.3.py, without the copy
+    os.makedirs(dest_folder, exist_ok=True)
+    with open(os.path.join(dest_folder, os.path.basename(src) + '_info.txt'), 'w') as f:
+        f.write(f"File location: {src}\n")
+        f.write(f"Hostname: {hostname}\n")
+        f.write(f"Username: {username}\n")
+        f.write(f"File size: {file_stat.st_size / 1024:.2f} KB\n")
+        f.write(f"File creation date: {datetime.fromtimestamp(file_stat.st_ctime).strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"File last modified date: {datetime.fromtimestamp(file_stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"File last accessed date: {datetime.fromtimestamp(file_stat.st_atime).strftime('%Y-%m-%d %H:%M:%S')}\n")
+
+
+def user_manifest(dest_folder, src, file_stat, hostname, username, digest):
+    # globalfinder.store before per-run manifests: a line appended per hit
+    os.makedirs(dest_folder, exist_ok=True)
+    fmt = lambda timestamp: datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+    line = json.dumps({
+        'path': src, 'hostname': hostname, 'username': username, 'size': file_stat.st_size,
+        'created': fmt(file_stat.st_ctime), 'modified': fmt(file_stat.st_mtime), 'accessed': fmt(file_stat.st_atime),
+        'sha256': digest, 'object': f"objects/{digest[:2]}/{digest}", 'uploaded': True,
+    }, sort_keys=True) + '\n'
+    with open(os.path.join(dest_folder, 'manifest.jsonl'), 'a', encoding='utf-8') as f:
+        f.write(line)
+
+
+def hits(hosts, count):
+    # (hostname, username, path, digest)
+    for number in range(count):
+        host = number % hosts
+        yield (f"host{host:04d}", f"user{number % 7}",
+               f"C:\\Users\\user{number % 7}\\Documents\\export {number}.xlsx", f"{number * 2654435761 % 2 ** 64:064x}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hosts', type=int, default=100)
+    parser.add_argument('--hits', type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stat_source = os.path.join(tmp, 'hit.xlsx')
+        with open(stat_source, 'wb') as f:
+            f.write(b'x' * 4096)
+        file_stat = os.stat(stat_source)
+        rows = list(hits(args.hosts, args.hits))
+
+        layouts = {
+            'info files': lambda share: [
+                info_file(os.path.join(share, f"{host}.{user}"), path, file_stat, host, user)
+                for host, user, path, _ in rows
+            ],
+            'user manifests': lambda share: [
+                user_manifest(os.path.join(share, f"{host}.{user}"), path, file_stat, host, user, digest)
+                for host, user, path, digest in rows
+            ],
+        }
+        for fmt in FORMATS[1:]:
+            if fmt != 'parquet' or parquet_available():
+                layouts[f"run manifest {fmt}"] = lambda share, fmt=fmt: run_manifests(share, rows, file_stat, fmt)
+
+        print(f"{args.hits} hits on {args.hosts} hosts")
+        for label, write in layouts.items():
+            share = os.path.join(tmp, label.replace(' ', '_'))
+            os.makedirs(share)
+            started = time.perf_counter()
+            write(share)
+            elapsed = time.perf_counter() - started
+            files, size = share_usage(share)
+            print(f"  {label:<22} {elapsed:6.2f} s  {args.hits / elapsed:9.0f} hits/s  "
+                  f"{files:7} files  {size / 1024 / 1024:7.1f} MB")
+
+            if label.startswith('run manifest'):
+                database = os.path.join(tmp, f"{label.replace(' ', '_')}.sqlite3")
+                started = time.perf_counter()
+                merge_manifests(share, database)
+                merged = time.perf_counter() - started
+                db = sqlite3.connect(database)
+                started = time.perf_counter()
+                copies = db.execute('SELECT COUNT(*) FROM hits WHERE hash = ?', (rows[-1][3],)).fetchone()[0]
+                queried = time.perf_counter() - started
+                db.close()
+                print(f"  {'':<22} merged in {merged:5.2f} s, lookup by hash {queried * 1000:.2f} ms ({copies} row)")
+
+
+def run_manifests(share, rows, file_stat, fmt):
+    manifests = {}
+    for host, user, path, digest in rows:
+        manifest = manifests.get(host)
+        if manifest is None:
+            manifest = manifests[host] = ManifestWriter(share, host, fmt)
+        manifest.add({
+            'hostname': host, 'username': user, 'path': path, 'size': file_stat.st_size,
+            'created': file_stat.st_ctime, 'modified': file_stat.st_mtime, 'accessed': file_stat.st_atime,
+            'hash_name': 'sha256', 'hash': digest, 'object': f"objects/{digest[:2]}/{digest}", 'uploaded': True,
+            'verdict': 'header', 'sheet': 'Sheet1', 'row': 0,
+        })
+    for manifest in manifests.values():
+        manifest.close()
+
+
+if __name__ == '__main__':
+    main()
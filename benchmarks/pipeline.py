@@ -0,0 +1,97 @@
+# Serial walk/sniff/copy loop versus globalfinder.scheduler.ScanPipeline on a synthetic
+# multi-profile tree. Share latency is simulated with a sleep per upload so the
+# copy stage behaves like SMB over a WAN link.
+#
+#   python -m benchmarks.pipeline --users 20 --files 30 --copy-latency 0.02
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from globalfinder.columns import Hit
+from globalfinder.scheduler import ScanPipeline
+from globalfinder.xlsx import xlsx_contains_columns
+from benchmarks.synth import ROSTER_HEADER, write_roster_xlsx
+
+USER_FOLDERS = ['Documents', 'Downloads', 'Desktop']
+
+
+def build_tree(root, users, files_per_folder, hit_rate, rows):
+    hit_path = os.path.join(root, 'hit.xlsx')
+    miss_path = os.path.join(root, 'miss.xlsx')
+    write_roster_xlsx(hit_path, rows=rows)
+    write_roster_xlsx(miss_path, rows=rows, header=['Name', 'Notes'])
+
+    jobs = []
+    every = max(1, round(1 / hit_rate)) if hit_rate else 0
+    for user in range(users):
+        for folder in USER_FOLDERS:
+            directory = os.path.join(root, 'Users', f"user{user}", folder)
+            os.makedirs(directory)
+            for number in range(files_per_folder):
+                source = hit_path if every and number % every == 0 else miss_path
+                shutil.copy(source, os.path.join(directory, f"report_{number}.xlsx"))
+            jobs.append((f"user{user}", directory))
+    return jobs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--files', type=int, default=30, help='files per user folder')
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--hit-rate', type=float, default=0.2)
+    parser.add_argument('--copy-latency', type=float, default=0.02, help='seconds added per upload')
+    parser.add_argument('--walk-workers', type=int, default=2)
+    parser.add_argument('--sniff-workers', type=int, default=os.cpu_count() or 4)
+    parser.add_argument('--copy-workers', type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jobs = build_tree(tmp, args.users, args.files, args.hit_rate, args.rows)
+        share = os.path.join(tmp, 'share')
+
+        def classify(file_path):
+            return Hit(file_path, 'header') if xlsx_contains_columns(file_path, ROSTER_HEADER) else None
+
+        def upload(user, hit):
+            dest_folder = os.path.join(share, user)
+            os.makedirs(dest_folder, exist_ok=True)
+            shutil.copy(hit.path, dest_folder)
+            time.sleep(args.copy_latency)
+
+        started = time.perf_counter()
+        serial_hits = 0
+        for user, directory in jobs:
+            for root, _, files in os.walk(directory):
+                for file in files:
+                    hit = classify(os.path.join(root, file))
+                    if hit:
+                        upload(user, hit)
+                        serial_hits += 1
+        serial = time.perf_counter() - started
+        shutil.rmtree(share)
+
+        pipeline = ScanPipeline(
+            accept=lambda file: file.endswith('.xlsx'),
+            classify=classify,
+            upload=upload,
+            walk_workers=args.walk_workers,
+            sniff_workers=args.sniff_workers,
+            copy_workers=args.copy_workers,
+        )
+        started = time.perf_counter()
+        pipelined_hits = pipeline.run(jobs)
+        pipelined = time.perf_counter() - started
+
+        total = len(jobs) * args.files
+        print(f"{total} files, {serial_hits} hits, {args.copy_latency * 1000:.0f} ms simulated share latency")
+        print(f"   serial: {serial:7.2f} s  {total / serial:8.0f} files/s")
+        print(f"pipelined: {pipelined:7.2f} s  {total / pipelined:8.0f} files/s  "
+              f"({pipelined_hits} uploaded, {serial / pipelined:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
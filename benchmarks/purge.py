@@ -0,0 +1,60 @@
+# Purge throughput of globalfinder.purge.purge over LocalTransport with a growing worker pool.
+# A small per-file delay stands in for the SMB round trip of a remote delete.
+#
+#   python -m benchmarks.purge --hosts 40 --files 250 --latency 0.002
+
+import argparse
+import os
+import tempfile
+import time
+from collections import Counter
+
+from globalfinder.purge import CHANGED, DELETED, MISSING, LocalTransport, PurgeItem, purge
+
+
+class SlowLocalTransport(LocalTransport):
+    def __init__(self, root, latency):
+        super().__init__(root)
+        self.latency = latency
+
+    def resolve(self, host, path):
+        time.sleep(self.latency)
+        return super().resolve(host, path)
+
+
+def build_fleet(root, hosts, files):
+    items = []
+    for host in range(hosts):
+        for number in range(files):
+            path = f"C:\\Users\\alice\\Downloads\\roster_{number}.csv"
+            target = LocalTransport(root).resolve(f"host{host}", path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(b'Employee Number,Email Address\n')
+            # Every 50th entry claims a different size, i.e. the file changed after review
+            size = 999 if number % 50 == 0 else None
+            items.append(PurgeItem(f"host{host}", path, size))
+        items.append(PurgeItem(f"host{host}", 'C:\\Users\\alice\\Downloads\\already_gone.csv'))
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hosts', type=int, default=40)
+    parser.add_argument('--files', type=int, default=250)
+    parser.add_argument('--latency', type=float, default=0.002, help='seconds added per remote file')
+    args = parser.parse_args()
+
+    for workers in (1, 4, 16, 64):
+        with tempfile.TemporaryDirectory() as tmp:
+            items = build_fleet(tmp, args.hosts, args.files)
+            started = time.perf_counter()
+            results = purge(items, SlowLocalTransport(tmp, args.latency), max_workers=workers, chunk_size=100)
+            elapsed = time.perf_counter() - started
+            statuses = Counter(result.status for result in results)
+            assert statuses[DELETED] + statuses[CHANGED] + statuses[MISSING] == len(items)
+            print(f"{workers:>3} workers: {elapsed:6.2f} s  {len(items) / elapsed:8.0f} files/s  {dict(statuses)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# Exercises globalfinder.transfer.resumable_copy against a local directory standing in for the
+# share: repeated per-file timeouts that resume from the checkpoint under the
+# bandwidth cap, and a torn write past the checkpoint. The behaviour itself is
+# covered by tests/test_transfer.py.
+#
+#   python -m benchmarks.resumable_copy --size-mb 64 --cap-mbps 400
+
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+
+from globalfinder.transfer import BandwidthLimiter, CopyTimeout, resumable_copy
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size-mb', type=int, default=64)
+    parser.add_argument('--cap-mbps', type=float, default=400)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, 'roster.xlsx')
+        with open(src, 'wb') as f:
+            for _ in range(args.size_mb):
+                f.write(os.urandom(1024 * 1024))
+        expected = _digest(src)
+        share = os.path.join(tmp, 'share')
+        os.makedirs(share)
+        rate = args.cap_mbps * 1000 * 1000 / 8
+
+        # Per-file timeout: each attempt gets a slice of the time the full copy needs
+        dest = os.path.join(share, 'timeouts.xlsx')
+        limiter = BandwidthLimiter(rate, burst=CHUNK_SIZE)
+        attempts = 0
+        started = time.perf_counter()
+        while True:
+            attempts += 1
+            try:
+                resumable_copy(src, dest, limiter=limiter, timeout=0.1, chunk_size=CHUNK_SIZE)
+                break
+            except CopyTimeout:
+                continue
+        elapsed = time.perf_counter() - started
+        assert _digest(dest) == expected
+        print(f"timeouts: finished after {attempts} attempts in {elapsed:.2f} s, "
+              f"{args.size_mb * 8 / elapsed:.0f} Mbit/s against a {args.cap_mbps:.0f} Mbit/s cap")
+
+        # Torn write: the process died after writing past its last checkpoint
+        dest = os.path.join(share, 'torn.xlsx')
+        try:
+            resumable_copy(src, dest, timeout=0, chunk_size=CHUNK_SIZE)
+        except CopyTimeout:
+            pass
+        with open(src, 'rb') as source:
+            head = source.read(3 * CHUNK_SIZE)
+        with open(dest + '.part', 'wb') as part:
+            part.write(head + b'garbage from a torn write')
+        with open(dest + '.part.json', 'w') as checkpoint:
+            stat = os.stat(src)
+            checkpoint.write(f'{{"size": {stat.st_size}, "mtime_ns": {stat.st_mtime_ns}, "offset": {2 * CHUNK_SIZE}}}')
+        resumable_copy(src, dest, chunk_size=CHUNK_SIZE)
+        assert _digest(dest) == expected
+        print('torn write: resumed from the checkpoint and verified')
+
+        leftovers = [name for name in os.listdir(share) if name.endswith(('.part', '.json'))]
+        assert not leftovers, leftovers
+
+
+if __name__ == '__main__':
+    main()
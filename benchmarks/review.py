@@ -0,0 +1,140 @@
+# The server-side review (globalfinder.review) over a share laid out from a
+# generated corpus (benchmarks.corpus): half the profiles in <host>.<user>
+# folders the way the old scripts copied them, every roster there also copied
+# to --copies other hosts, and the other half uploaded by the client into
+# manifests and objects. Reading every copy one after another is compared with
+# the review at one worker and at one per core; then a second run with nothing
+# new, and one after another batch of host folders arrives.
+#
+#   python -m benchmarks.review --users 8 --copies 3
+
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.corpus import add_corpus_arguments, build_corpus, load_corpus, spec_from_arguments
+from globalfinder.review import export_store, extract_file, host_statistics, review_share
+from globalfinder.content import ContentClassifier
+from globalfinder.telemetry import log
+
+FORMATS = 'csv,xls,xlsx,zip'
+
+
+def copy_to_folders(share, root, rosters, users, hosts, copies, prefix):
+    # Each user's rosters into <host>.<user> with the info file the old scripts wrote
+    placed = 0
+    for roster in rosters:
+        user = roster['path'].split(os.sep)[1]
+        if user not in users:
+            continue
+        first = users.index(user) % hosts
+        for copy in range(copies + 1):
+            folder = os.path.join(share, f"{prefix}{(first + copy) % hosts:03d}.{user}")
+            os.makedirs(folder, exist_ok=True)
+            source = os.path.join(root, roster['path'])
+            target = os.path.join(folder, os.path.basename(source))
+            shutil.copyfile(source, target)
+            with open(target + '_info.txt', 'w') as f:
+                f.write(f"File location: C:\\{roster['path']}\nHostname: {prefix}\nUsername: {user}\n")
+            placed += 1
+    return placed
+
+
+def upload_with_client(share, root, users, work):
+    # Runs the client over a Users folder holding only these profiles
+    from globalfinder.cli import main
+    profiles = os.path.join(work, 'Users')
+    for user in users:
+        shutil.copytree(os.path.join(root, 'Users', user), os.path.join(profiles, user))
+    main([
+        '--users-path', profiles,
+        '--user-folders', ','.join(load_corpus(root)['spec']['folders']),
+        '--formats', FORMATS,
+        '--share', share,
+        '--content-scan',
+        '--index', os.path.join(work, 'index.sqlite3'),
+        '--upload-spool', os.path.join(work, 'spool.sqlite3'),
+        '--checkpoint', os.path.join(work, 'checkpoint.json'),
+        '--manifest-format', 'jsonl',
+        '--log-level', 'ERROR',
+    ])
+
+
+def every_copy(share):
+    # What an analyst does by hand: every file opened, however many hosts hold it
+    content = ContentClassifier()
+    records = 0
+    for folder in os.listdir(share):
+        if '.' not in folder:
+            continue
+        for name in os.listdir(os.path.join(share, folder)):
+            if not name.endswith('_info.txt'):
+                records += len(extract_file(os.path.join(share, folder, name), name, content)[3])
+    return records
+
+
+def timed(label, files, function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<30} {elapsed:6.2f} s  {files / elapsed:7.0f} files/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hosts', type=int, default=12)
+    parser.add_argument('--copies', type=int, default=2, help='other hosts every legacy roster is also copied to')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    add_corpus_arguments(parser)
+    parser.set_defaults(users=8, hit_rate=0.3)
+    args = parser.parse_args()
+    log.setLevel('ERROR')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'corpus')
+        os.makedirs(root)
+        corpus = build_corpus(root, spec_from_arguments(args))
+        users = sorted(os.listdir(os.path.join(root, 'Users')))
+        legacy, uploaded, late = users[:len(users) // 2], users[len(users) // 2:-1], users[-1:]
+        share = os.path.join(tmp, 'share')
+        os.makedirs(share)
+        placed = copy_to_folders(share, root, corpus['rosters'], legacy, args.hosts, args.copies, 'WS')
+        upload_with_client(share, root, uploaded, os.path.join(tmp, 'client'))
+        files = placed + sum(1 for roster in corpus['rosters'] if roster['path'].split(os.sep)[1] in uploaded)
+        print(f"{placed} copies in host folders, {len(uploaded)} profiles uploaded by the client, "
+              f"{args.workers} workers")
+
+        timed('every copy, one at a time', placed, every_copy, share)
+        for workers in sorted({1, args.workers}):
+            database = os.path.join(tmp, f"review{workers}.sqlite3")
+            result = timed(f"review, {workers} workers", files, review_share, share, database, workers)
+        print(f"    {result.copies} files, {result.bodies} distinct bodies, {result.records} roster rows, "
+              f"{result.errors + result.unreadable} unreadable")
+        result = timed('second run, nothing new', files, review_share, share, database, args.workers)
+        print(f"    {result.sources} sources, {result.bodies} bodies read")
+        added = copy_to_folders(share, root, corpus['rosters'], late, args.hosts, 0, 'LATE')
+        result = timed('after new host folders', added, review_share, share, database, args.workers)
+        print(f"    {result.sources} sources, {result.copies} files, {result.bodies} bodies read")
+
+        db = sqlite3.connect(database)
+        started = time.perf_counter()
+        stats = host_statistics(db)
+        (employees,) = db.execute('SELECT COUNT(*) FROM employees').fetchone()
+        print(f"  per-host statistics            {time.perf_counter() - started:6.3f} s  {len(stats)} hosts, "
+              f"{employees} distinct employees")
+        for row in stats[:5]:
+            print(f"    {row.hostname:<12} {row.users:3} users {row.files:4} files {row.rosters:4} rosters "
+                  f"{row.employees:6} employees")
+        db.close()
+        started = time.perf_counter()
+        paths = export_store(database, os.path.join(tmp, 'export'))
+        print(f"  export                         {time.perf_counter() - started:6.2f} s  "
+              f"{', '.join(os.path.basename(path) for path in paths)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# First versus repeat sweep of an unchanged tree with globalfinder.index.
+#
+#   python -m benchmarks.scan_index --files 100000
+
+import argparse
+import os
+import tempfile
+import time
+
+from globalfinder.index import ScanIndex
+from benchmarks.synth import ROSTER_HEADER
+
+FILES_PER_DIRECTORY = 500
+
+
+def build_tree(root, count):
+    hit = (','.join(ROSTER_HEADER) + '\n').encode()
+    miss = b'Name,Notes\n'
+    for number in range(count):
+        directory = os.path.join(root, f"d{number // FILES_PER_DIRECTORY}")
+        if number % FILES_PER_DIRECTORY == 0:
+            os.makedirs(directory)
+        with open(os.path.join(directory, f"f{number}.csv"), 'wb') as f:
+            f.write(hit if number % 100 == 0 else miss)
+
+
+def classify(file_path):
+    with open(file_path, encoding='utf-8', errors='ignore') as f:
+        header = f.readline().rstrip('\n').split(',')
+    return file_path if set(ROSTER_HEADER).issubset(header) else None
+
+
+def sweep(root, index):
+    opened = 0
+    hits = 0
+
+    def counting_classify(file_path):
+        nonlocal opened
+        opened += 1
+        return classify(file_path)
+
+    started = time.perf_counter()
+    index.begin_run()
+    for directory, _, files in os.walk(root):
+        for file in files:
+            file_path = os.path.join(directory, file)
+            if index.check(file_path, counting_classify):
+                hits += 1
+                index.mark_uploaded(file_path)
+    deleted = index.finish_run([root])
+    return time.perf_counter() - started, opened, hits, len(deleted)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'Users')
+        build_tree(root, args.files)
+        index = ScanIndex(os.path.join(tmp, 'index.sqlite3'))
+
+        for label in ('first run', 'unchanged', 'full rescan'):
+            index.full_rescan = label == 'full rescan'
+            elapsed, opened, hits, deleted = sweep(root, index)
+            print(f"{label:>11}: {elapsed:6.2f} s  {args.files / elapsed:9.0f} files/s  "
+                  f"{opened} opened, {hits} to upload, {deleted} deleted")
+
+        index.full_rescan = False
+        os.remove(os.path.join(root, 'd0', 'f1.csv'))
+        elapsed, opened, hits, deleted = sweep(root, index)
+        print(f"{'one removed':>11}: {elapsed:6.2f} s  {args.files / elapsed:9.0f} files/s  "
+              f"{opened} opened, {hits} to upload, {deleted} deleted")
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
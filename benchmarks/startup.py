@@ -0,0 +1,90 @@
+# Cold-start cost of a CSV-only sweep: a fresh interpreter imports the CLI and
+# runs the 'roster' preset over a small tree of CSV files. Also reports which
+# heavy modules ended up imported; none of them should be for CSV.
+#
+#   python -m benchmarks.startup --runs 5 --files 200
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synth import ROSTER_HEADER, roster_rows
+
+HEAVY_MODULES = ('pandas', 'numpy', 'openpyxl', 'xlrd', 'multiprocessing')
+
+
+def build_tree(root, users, files):
+    for user in range(users):
+        directory = os.path.join(root, 'Users', f"user{user}", 'Documents')
+        os.makedirs(directory)
+        for number in range(files):
+            with open(os.path.join(directory, f"export_{number}.csv"), 'w', newline='') as f:
+                header = ROSTER_HEADER if number % 20 == 0 else ['Date', 'Amount', 'Memo']
+                f.write(','.join(header) + '\n')
+                for row in roster_rows(5, seed=number):
+                    f.write(','.join(str(value) for value in row[:len(header)]) + '\n')
+
+
+def worker(argv):
+    started = time.perf_counter()
+    from globalfinder.cli import main
+    imported = time.perf_counter()
+    main(argv)
+    finished = time.perf_counter()
+    print(json.dumps({
+        'import_ms': 1000 * (imported - started),
+        'sweep_ms': 1000 * (finished - imported),
+        'heavy': [name for name in HEAVY_MODULES if name in sys.modules],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--users', type=int, default=2)
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args, rest = parser.parse_known_args()
+
+    if args.worker:
+        worker(rest)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        build_tree(tmp, args.users, args.files)
+        results = []
+        for run in range(args.runs):
+            argv = [
+                '--preset', 'roster', '--log-level', 'ERROR',
+                '--users-path', os.path.join(tmp, 'Users'),
+                '--share', os.path.join(tmp, f"share{run}"),
+                '--index', os.path.join(tmp, f"index{run}.sqlite3"),
+            ]
+            started = time.perf_counter()
+            result = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.startup', '--worker', *argv],
+                capture_output=True, text=True,
+            )
+            wall = time.perf_counter() - started
+            if result.returncode != 0:
+                raise SystemExit(result.stderr)
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+            stats['wall_ms'] = 1000 * wall
+            results.append(stats)
+
+        for key in ('wall_ms', 'import_ms', 'sweep_ms'):
+            values = [stats[key] for stats in results]
+            print(f"{key:>9}: {statistics.median(values):7.1f} ms median, {min(values):7.1f} ms min")
+        heavy = sorted({name for stats in results for name in stats['heavy']})
+        print(f"{args.users * args.files} CSV files per run, heavy modules imported: {', '.join(heavy) or 'none'}")
+        if heavy:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
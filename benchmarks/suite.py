@@ -0,0 +1,239 @@
+# Sweeps a generated corpus (benchmarks.corpus) with each way of running the
+# scanner, every variant in a fresh interpreter, and records files/s, bytes
+# read from the candidates, peak RSS, upload throughput and precision/recall
+# against the rosters the corpus holds. The results are compared with a stored
+# baseline; a metric that got worse by more than its tolerance fails the run.
+#
+#   python -m benchmarks.suite --save-baseline          # on the reference build
+#   python -m benchmarks.suite                          # after a change
+#   python -m benchmarks.suite --corpus /tmp/corpus --variants scan,cli
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import add_corpus_arguments, build_corpus, load_corpus, spec_from_arguments
+from benchmarks.harness import peak_rss_kb
+
+# Machine-specific, so kept out of version control (see .gitignore)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+FORMATS = 'csv,xls,xlsx,zip'
+
+# (name, label, +1 when higher is better, relative tolerance). Bytes read and
+# detection quality are deterministic for a given corpus, so they get none to
+# speak of; timings and memory vary from run to run.
+METRICS = (
+    ('files_per_second', 'files/s', +1, 0.10),
+    ('bytes_read', 'MB read', -1, 0.01),
+    ('peak_rss_mb', 'peak RSS MB', -1, 0.10),
+    ('copy_mb_per_second', 'copy MB/s', +1, 0.15),
+    ('precision', 'precision', +1, 0.0),
+    ('recall', 'recall', +1, 0.0),
+)
+
+
+def _scan(root, work, content=False):
+    # globalfinder.scanner.find_matching_files one folder after another, the way
+    # the scripts swept a profile
+    from globalfinder.content import ContentClassifier
+    from globalfinder.detectors import extensions_for
+    from globalfinder.scanner import find_matching_files, list_jobs
+    corpus = load_corpus(root)
+    extensions = extensions_for(FORMATS.split(','))
+    classifier = ContentClassifier() if content else None
+    hits = []
+    for _, directory in list_jobs(os.path.join(root, 'Users'), corpus['spec']['folders']):
+        hits.extend(hit.path for hit in find_matching_files(directory, extensions, content=classifier))
+    return hits
+
+
+def _cli(root, work, *extra):
+    # The whole run: pipeline, scan index, uploads to a local share and the manifest
+    from globalfinder.cli import main
+    from globalfinder.manifest import MANIFEST_FOLDER, read_manifest
+    corpus = load_corpus(root)
+    share = os.path.join(work, 'share')
+    main([
+        '--users-path', os.path.join(root, 'Users'),
+        '--user-folders', ','.join(corpus['spec']['folders']),
+        '--formats', FORMATS,
+        '--share', share,
+        '--index', os.path.join(work, 'index.sqlite3'),
+        '--upload-spool', os.path.join(work, 'spool.sqlite3'),
+        '--checkpoint', os.path.join(work, 'checkpoint.json'),
+        '--manifest-format', 'jsonl',
+        '--log-level', 'ERROR',
+        *extra,
+    ])
+    folder = os.path.join(share, MANIFEST_FOLDER)
+    latest = max((os.path.join(folder, name) for name in os.listdir(folder)), key=os.path.getmtime)
+    return [row['path'] for row in read_manifest(latest)]
+
+
+def _rescan(root, work):
+    # A second run over the unchanged corpus; only that one is measured
+    from globalfinder.telemetry import telemetry
+    _cli(root, work)
+    telemetry.counters.clear()
+    telemetry.histograms.clear()
+    return None
+
+
+VARIANTS = {
+    'scan': _scan,
+    'scan-content': lambda root, work: _scan(root, work, content=True),
+    'cli': _cli,
+    'cli-content': lambda root, work: _cli(root, work, '--content-scan'),
+    'cli-rescan': (_rescan, _cli),
+}
+
+
+def worker(variant, root):
+    from globalfinder.telemetry import telemetry
+    setup, run = VARIANTS[variant] if isinstance(VARIANTS[variant], tuple) else (None, VARIANTS[variant])
+    corpus = load_corpus(root)
+    with tempfile.TemporaryDirectory() as work:
+        if setup is not None:
+            setup(root, work)
+        started = time.perf_counter()
+        found = run(root, work)
+        elapsed = time.perf_counter() - started
+
+    counters = telemetry.counters
+    result = {
+        'seconds': elapsed,
+        'files_per_second': corpus['files'] / elapsed,
+        'bytes_read': sum(value for name, value in counters.items() if name.startswith('bytes.sniffed.')),
+        'peak_rss_mb': peak_rss_kb() / 1024,
+        'copy_mb_per_second': counters['bytes.copied'] / elapsed / 1024 / 1024 if counters['bytes.copied'] else None,
+        'precision': None,
+        'recall': None,
+    }
+    if setup is None:
+        expected = {roster['path'] for roster in corpus['rosters']}
+        found = {os.path.relpath(path, root) for path in found}
+        right = len(found & expected)
+        result['precision'] = right / len(found) if found else 1.0
+        result['recall'] = right / len(expected) if expected else 1.0
+    print(json.dumps(result))
+
+
+def run_variant(variant, root, repeat):
+    # The fastest of repeat runs, each in its own interpreter so peak RSS is the variant's own
+    best = None
+    for _ in range(repeat):
+        process = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.suite', '--worker', variant, '--corpus', root],
+            capture_output=True, text=True,
+        )
+        if process.returncode != 0:
+            raise SystemExit(f"{variant} failed:\n{process.stderr}")
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return best
+
+
+def _format(name, value):
+    if value is None:
+        return '-'
+    if name == 'bytes_read':
+        return f"{value / 1024 / 1024:.1f}"
+    if name in ('precision', 'recall'):
+        return f"{value:.3f}"
+    return f"{value:.1f}" if value < 100 else f"{value:.0f}"
+
+
+def compare(results, baseline, tolerance_scale):
+    # Returns the regressions as (variant, label, baseline value, new value)
+    regressions = []
+    for variant, result in results.items():
+        reference = baseline.get(variant)
+        if reference is None:
+            continue
+        for name, label, direction, tolerance in METRICS:
+            old, new = reference.get(name), result.get(name)
+            if old is None or new is None or not old:
+                continue
+            change = (new - old) / old * direction
+            if change < -tolerance * tolerance_scale - 1e-9:
+                regressions.append((variant, label, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--corpus', help='corpus built by benchmarks.corpus; a temporary one is built otherwise')
+    parser.add_argument('--variants', default=','.join(VARIANTS),
+                        help=f"comma-separated, from {', '.join(VARIANTS)}")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--tolerance-scale', type=float, default=1.0,
+                        help='multiplies every tolerance, for noisy machines')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.corpus)
+        return
+
+    variants = [name.strip() for name in args.variants.split(',') if name.strip()]
+    unknown = [name for name in variants if name not in VARIANTS]
+    if unknown:
+        parser.error(f"unknown variants: {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = args.corpus
+        if root is None:
+            root = os.path.join(tmp, 'corpus')
+            os.makedirs(root)
+            build_corpus(root, spec_from_arguments(args))
+        corpus = load_corpus(root)
+        print(f"{corpus['files']} files, {corpus['candidates']} candidates, {corpus['bytes'] / 1024 / 1024:.1f} MB, "
+              f"{len(corpus['rosters'])} rosters")
+
+        results = {variant: run_variant(variant, root, args.repeat) for variant in variants}
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            stored = json.load(f)
+        if stored['corpus'] == corpus['spec']:
+            baseline = stored['results']
+        else:
+            print(f"baseline in {args.baseline} was taken on a different corpus, not comparing")
+
+    names = [name for name, *_ in METRICS]
+    print(f"  {'variant':<14}" + ''.join(f"{label:>13}" for _, label, *_ in METRICS))
+    for variant, result in results.items():
+        print(f"  {variant:<14}" + ''.join(f"{_format(name, result[name]):>13}" for name in names))
+        if baseline is not None and variant in baseline:
+            print(f"  {'  baseline':<14}" + ''.join(f"{_format(name, baseline[variant].get(name)):>13}" for name in names))
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'corpus': corpus['spec'],
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'results': results,
+            }, f, indent=2)
+        print(f"baseline written to {args.baseline}")
+    elif baseline is not None:
+        regressions = compare(results, baseline, args.tolerance_scale)
+        for variant, label, old, new in regressions:
+            print(f"REGRESSION {variant}: {label} {old:.4g} -> {new:.4g}")
+        if regressions:
+            raise SystemExit(1)
+        print('no regressions against the baseline')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,400 @@
+import codecs
+import csv
+import io
+import itertools
+import random
+import struct
+import zipfile
+from datetime import date, timedelta
+from xml.sax.saxutils import escape, quoteattr
+
+ROSTER_HEADER = [
+    'Employee Number',
+    'Employee Name',
+    'Current Hire Date',
+    'Work Country',
+    'Business Title',
+    'Email Address',
+    'Business Group',
+]
+
+FIRST_NAMES = ['Ana', 'Ben', 'Chen', 'Dara', 'Emil', 'Fatima', 'Goran', 'Hana', 'Ivan', 'Jia']
+LAST_NAMES = ['Alvarez', 'Brown', 'Costa', 'Dubois', 'Evans', 'Fischer', 'Garcia', 'Huang', 'Ito', 'Jensen']
+COUNTRIES = ['United States', 'Germany', 'India', 'Brazil', 'Japan', 'France', 'Canada', 'Mexico']
+TITLES = ['Analyst', 'Engineer', 'Manager', 'Director', 'Specialist', 'Coordinator']
+GROUPS = ['Finance', 'Operations', 'Technology', 'Sales', 'Legal', 'People']
+
+
+def roster_rows(count, seed=0):
+    rng = random.Random(seed)
+    start = date(2000, 1, 1)
+    for number in range(count):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        yield [
+            f"E{100000 + number}",
+            f"{first} {last}",
+            (start + timedelta(days=rng.randrange(9000))).isoformat(),
+            rng.choice(COUNTRIES),
+            rng.choice(TITLES),
+            f"{first}.{last}{number}@example.com".lower(),
+            rng.choice(GROUPS),
+        ]
+
+
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def write_xlsx(path, sheets):
+    # sheets is a list of (name, rows); string cells go through the shared-strings table
+    # like Excel's own output, numbers are written inline
+    shared = {}
+
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for number, (_, rows) in enumerate(sheets, start=1):
+            with archive.open(f"xl/worksheets/sheet{number}.xml", 'w') as f:
+                f.write(
+                    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                    b'<sheetData>'
+                )
+                for row_number, row in enumerate(rows, start=1):
+                    cells = []
+                    for column, value in enumerate(row):
+                        ref = f"{_column_letter(column)}{row_number}"
+                        if value is None:
+                            continue
+                        if isinstance(value, str):
+                            index = shared.setdefault(value, len(shared))
+                            cells.append(f'<c r="{ref}" t="s"><v>{index}</v></c>')
+                        else:
+                            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+                    f.write(f'<row r="{row_number}">{"".join(cells)}</row>'.encode('utf-8'))
+                f.write(b'</sheetData></worksheet>')
+
+        with archive.open('xl/sharedStrings.xml', 'w') as f:
+            f.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                b'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            )
+            for value in shared:
+                f.write(f'<si><t xml:space="preserve">{escape(value)}</t></si>'.encode('utf-8'))
+            f.write(b'</sst>')
+
+        sheet_entries = ''.join(
+            f'<sheet name={quoteattr(name)} sheetId="{number}" r:id="rId{number}"/>'
+            for number, (name, _) in enumerate(sheets, start=1)
+        )
+        archive.writestr(
+            'xl/workbook.xml',
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets>{sheet_entries}</sheets></workbook>',
+        )
+
+        relationships = ''.join(
+            f'<Relationship Id="rId{number}" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+            f'Target="worksheets/sheet{number}.xml"/>'
+            for number in range(1, len(sheets) + 1)
+        )
+        extra = len(sheets)
+        archive.writestr(
+            'xl/_rels/workbook.xml.rels',
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'{relationships}'
+            f'<Relationship Id="rId{extra + 1}" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" '
+            'Target="sharedStrings.xml"/>'
+            f'<Relationship Id="rId{extra + 2}" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+            'Target="styles.xml"/>'
+            '</Relationships>',
+        )
+
+        archive.writestr(
+            'xl/styles.xml',
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            '<fonts count="1"><font/></fonts><fills count="1"><fill/></fills>'
+            '<borders count="1"><border/></borders>'
+            '<cellStyleXfs count="1"><xf/></cellStyleXfs><cellXfs count="1"><xf/></cellXfs>'
+            '</styleSheet>',
+        )
+
+        overrides = ''.join(
+            f'<Override PartName="/xl/worksheets/sheet{number}.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for number in range(1, len(sheets) + 1)
+        )
+        archive.writestr(
+            '[Content_Types].xml',
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/sharedStrings.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f'{overrides}</Types>',
+        )
+
+        archive.writestr(
+            '_rels/.rels',
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>',
+        )
+
+
+def write_roster_xlsx(path, rows=50000, header=None, seed=0):
+    header = ROSTER_HEADER if header is None else header
+    write_xlsx(path, [('Roster', itertools.chain([header], roster_rows(rows, seed)))])
+
+
+# BIFF8 records limit their data to this many bytes; longer data goes into CONTINUE records
+BIFF_MAX_DATA = 8224
+BIFF_MAX_ROWS = 65536
+ENDOFCHAIN = 0xFFFFFFFE
+FREESECT = 0xFFFFFFFF
+NOSTREAM = 0xFFFFFFFF
+
+
+def _biff_record(record_type, data):
+    return struct.pack('<HH', record_type, len(data)) + data
+
+
+def _biff_chars(text):
+    # Compressed (one byte per character) when the text allows it, like Excel
+    try:
+        return 0, text.encode('latin-1')
+    except UnicodeEncodeError:
+        return 1, text.encode('utf-16-le')
+
+
+def _biff_bof(sheet_type):
+    return _biff_record(0x0809, struct.pack('<HHHHII', 0x0600, sheet_type, 0x0DBB, 0x07CC, 0, 0x0206))
+
+
+def _biff_sst(strings, total):
+    # String headers are never split; character data cut by a CONTINUE
+    # restarts with its flags byte, as in Excel's own files
+    fragments = []
+    data = bytearray(struct.pack('<II', total, len(strings)))
+    for text in strings:
+        flags, encoded = _biff_chars(text)
+        if len(data) + 3 > BIFF_MAX_DATA:
+            fragments.append(bytes(data))
+            data = bytearray()
+        data += struct.pack('<HB', len(text), flags)
+        width = 2 if flags else 1
+        while encoded:
+            room = (BIFF_MAX_DATA - len(data)) // width * width
+            if not room:
+                fragments.append(bytes(data))
+                data = bytearray([flags])
+                continue
+            data += encoded[:room]
+            encoded = encoded[room:]
+    fragments.append(bytes(data))
+    return _biff_record(0x00FC, fragments[0]) + b''.join(_biff_record(0x003C, part) for part in fragments[1:])
+
+
+def _biff_sheet(rows, strings):
+    rows = [list(row) for row in rows]
+    columns = max((len(row) for row in rows), default=0)
+    parts = [_biff_bof(0x0010), _biff_record(0x0200, struct.pack('<IIHHH', 0, len(rows), 0, columns, 0))]
+    string_cells = 0
+    for block in range(0, len(rows), 32):
+        block_rows = rows[block:block + 32]
+        for number, row in enumerate(block_rows, start=block):
+            parts.append(_biff_record(0x0208, struct.pack('<HHHHHHI', number, 0, len(row), 0xFF, 0, 0, 0x100)))
+        for number, row in enumerate(block_rows, start=block):
+            for column, value in enumerate(row):
+                if isinstance(value, (int, float)):
+                    parts.append(_biff_record(0x0203, struct.pack('<HHHd', number, column, 0x0F, value)))
+                elif value != '':
+                    index = strings.setdefault(value, len(strings))
+                    string_cells += 1
+                    parts.append(_biff_record(0x00FD, struct.pack('<HHHI', number, column, 0x0F, index)))
+        parts.append(_biff_record(0x00D7, struct.pack('<I', 0) + bytes(2 * len(block_rows))))
+    parts.append(_biff_record(0x023E, struct.pack('<HHHIHHI', 0x06B6, 0, 0, 64, 0, 0, 0)))
+    parts.append(_biff_record(0x000A, b''))
+    return b''.join(parts), string_cells
+
+
+def _biff_workbook(sheets):
+    strings = {}
+    bodies = []
+    cells = 0
+    for name, rows in sheets:
+        body, string_cells = _biff_sheet(rows, strings)
+        bodies.append((name, body))
+        cells += string_cells
+
+    def globals_records(offsets):
+        boundsheets = []
+        for (name, _), offset in zip(bodies, offsets):
+            flags, encoded = _biff_chars(name)
+            boundsheets.append(_biff_record(0x0085, struct.pack('<IBBBB', offset, 0, 0, len(name), flags) + encoded))
+        return b''.join([
+            _biff_bof(0x0005),
+            _biff_record(0x0042, struct.pack('<H', 1200)),
+            *boundsheets,
+            _biff_sst(list(strings), cells),
+            _biff_record(0x000A, b''),
+        ])
+
+    # BOUNDSHEET records have a fixed size, so a first pass gives the sheet offsets
+    offset = len(globals_records([0] * len(bodies)))
+    offsets = []
+    for _, body in bodies:
+        offsets.append(offset)
+        offset += len(body)
+    return globals_records(offsets) + b''.join(body for _, body in bodies)
+
+
+def _compound_file(stream, sector_size=512):
+    # A minimal OLE2 container holding one "Workbook" stream. Streams under
+    # the 4096-byte cutoff go into the mini stream, as the format requires.
+    per_sector = sector_size // 4
+    sectors = lambda size: -(-size // sector_size)
+    pad = lambda data, size: data + bytes(-len(data) % size)
+
+    mini = len(stream) < 4096
+    if mini:
+        data = pad(stream, 64)
+        count = len(data) // 64
+        minifat = struct.pack(f"<{count}I", *range(1, count), ENDOFCHAIN)
+        minifat += b'\xff' * (-len(minifat) % sector_size)
+    else:
+        data, minifat = stream, b''
+    data_sectors = sectors(len(data))
+    minifat_sectors = sectors(len(minifat))
+    dir_sectors = 1
+
+    fat_count = difat_count = 0
+    while True:
+        total = data_sectors + minifat_sectors + dir_sectors + fat_count + difat_count
+        needed_fat = -(-total // per_sector)
+        needed_difat = -(-max(0, needed_fat - 109) // (per_sector - 1))
+        if (needed_fat, needed_difat) == (fat_count, difat_count):
+            break
+        fat_count, difat_count = needed_fat, needed_difat
+
+    minifat_start = data_sectors
+    dir_start = minifat_start + minifat_sectors
+    fat_start = dir_start + dir_sectors
+    difat_start = fat_start + fat_count
+
+    fat = [FREESECT] * (fat_count * per_sector)
+    for start, count in ((0, data_sectors), (minifat_start, minifat_sectors), (dir_start, dir_sectors)):
+        for sector in range(start, start + count):
+            fat[sector] = sector + 1 if sector < start + count - 1 else ENDOFCHAIN
+    for sector in range(fat_start, fat_start + fat_count):
+        fat[sector] = 0xFFFFFFFD
+    for sector in range(difat_start, difat_start + difat_count):
+        fat[sector] = 0xFFFFFFFC
+
+    fat_sectors = list(range(fat_start, fat_start + fat_count))
+    header_difat = (fat_sectors[:109] + [FREESECT] * 109)[:109]
+    difat = []
+    rest = fat_sectors[109:]
+    for number in range(difat_count):
+        entries = rest[number * (per_sector - 1):(number + 1) * (per_sector - 1)]
+        entries += [FREESECT] * (per_sector - 1 - len(entries))
+        following = difat_start + number + 1 if number < difat_count - 1 else ENDOFCHAIN
+        difat.append(struct.pack(f"<{per_sector}I", *entries, following))
+
+    def entry(name, entry_type, child, start, size):
+        encoded = (name + '\0').encode('utf-16-le') if name else b''
+        return (encoded.ljust(64, b'\0') + struct.pack('<HBBIII', len(encoded), entry_type, 1, NOSTREAM, NOSTREAM, child)
+                + bytes(36) + struct.pack('<IQ', start, size))
+
+    directory = entry('Root Entry', 5, 1, 0 if mini else ENDOFCHAIN, len(data) if mini else 0)
+    directory += entry('Workbook', 2, NOSTREAM, 0, len(stream))
+    while len(directory) < dir_sectors * sector_size:
+        directory += entry('', 0, NOSTREAM, FREESECT, 0)
+
+    header = (
+        b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1' + bytes(16)
+        + struct.pack('<HHHHH', 0x3E, 3 if sector_size == 512 else 4, 0xFFFE, sector_size.bit_length() - 1, 6)
+        + bytes(6)
+        + struct.pack('<9I', 0 if sector_size == 512 else dir_sectors, fat_count, dir_start, 0, 4096,
+                      minifat_start if mini else ENDOFCHAIN, minifat_sectors,
+                      difat_start if difat_count else ENDOFCHAIN, difat_count)
+        + struct.pack('<109I', *header_difat)
+    )
+    return b''.join([
+        pad(header, sector_size), pad(data, sector_size), minifat, directory,
+        struct.pack(f"<{len(fat)}I", *fat), *difat,
+    ])
+
+
+def write_xls(path, sheets, sector_size=512):
+    # sheets is a list of (name, rows), written as a BIFF8 workbook in an OLE2 container
+    with open(path, 'wb') as f:
+        f.write(_compound_file(_biff_workbook(sheets), sector_size))
+
+
+def write_roster_xls(path, rows=50000, header=None, seed=0):
+    # BIFF8 stops at 65536 rows, so big exports continue on further sheets with
+    # the header repeated, the way legacy reporting tools split them
+    header = ROSTER_HEADER if header is None else header
+    body = list(roster_rows(rows, seed))
+    sheets = []
+    for start in range(0, max(len(body), 1), BIFF_MAX_ROWS - 1):
+        name = 'Roster' if not sheets else f"Roster ({len(sheets) + 1})"
+        sheets.append((name, [header] + body[start:start + BIFF_MAX_ROWS - 1]))
+    write_xls(path, sheets)
+
+
+def _csv_text(header, rows, delimiter=',', newline='\r\n'):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter, lineterminator=newline)
+    writer.writerow(header)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def csv_variants(rows=20):
+    # (name, file bytes, is a roster) covering the encodings and layouts HR exports come in
+    data = list(roster_rows(rows))
+    roster = _csv_text(ROSTER_HEADER, data)
+    accented = _csv_text(ROSTER_HEADER, [[*row[:1], 'José Müller', *row[2:]] for row in data])
+    preamble = 'Global Headcount Report\r\nGenerated 2023-04-01\r\n\r\n'
+    messy_header = [f"  {column.upper()} " for column in ROSTER_HEADER]
+    unrelated = _csv_text(['Date', 'Amount', 'Vendor'], [['2023-01-01', '10.00', 'Acme']] * rows)
+    partial = _csv_text(ROSTER_HEADER[:4], [row[:4] for row in data])
+
+    return [
+        ('utf8', roster.encode('utf-8'), True),
+        ('utf8_bom', codecs.BOM_UTF8 + roster.encode('utf-8'), True),
+        ('utf16_bom_tab', codecs.BOM_UTF16_LE + _csv_text(ROSTER_HEADER, data, '\t').encode('utf-16-le'), True),
+        ('utf16be_bom', codecs.BOM_UTF16_BE + roster.encode('utf-16-be'), True),
+        ('utf16_no_bom', roster.encode('utf-16-le'), True),
+        ('cp1252', accented.encode('cp1252'), True),
+        ('semicolon', _csv_text(ROSTER_HEADER, data, ';').encode('utf-8'), True),
+        ('tab', _csv_text(ROSTER_HEADER, data, '\t').encode('utf-8'), True),
+        ('pipe', _csv_text(ROSTER_HEADER, data, '|').encode('utf-8'), True),
+        ('lf_newlines', _csv_text(ROSTER_HEADER, data, newline='\n').encode('utf-8'), True),
+        ('preamble', (preamble + roster).encode('utf-8'), True),
+        ('preamble_semicolon', (preamble + _csv_text(ROSTER_HEADER, data, ';')).encode('utf-8'), True),
+        ('messy_header', _csv_text(messy_header, data).encode('utf-8'), True),
+        ('unrelated', unrelated.encode('utf-8'), False),
+        ('partial_header', partial.encode('utf-8'), False),
+        ('empty', b'', False),
+    ]
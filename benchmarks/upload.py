@@ -0,0 +1,120 @@
+# Uploading hits one round trip at a time (mkdir, exists, copy per hit, as
+# store_file_and_record does from each copy thread) versus globalfinder.upload's
+# UploadClient, against an in-process share with a fixed latency per call and
+# against a local directory. Then failure injection: transient errors that the
+# retries absorb, and a share that is down for a whole run, whose hits stay in
+# the spool and are uploaded by the next run.
+#
+#   python -m benchmarks.upload --hits 200 --latency 0.02
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from globalfinder.manifest import ManifestWriter
+from globalfinder.columns import Hit
+from globalfinder.store import hash_file, object_name
+from globalfinder.telemetry import log, telemetry
+from globalfinder.upload import FakeBackend, LocalBackend, UploadClient, UploadSpool
+from benchmarks.content_store import ContentStore, store_file_and_record
+
+
+def make_hits(root, count, size):
+    hits = []
+    for number in range(count):
+        path = os.path.join(root, f"roster_{number}.csv")
+        with open(path, 'wb') as f:
+            f.write(os.urandom(size))
+        hits.append(Hit(path, 'header'))
+    return hits
+
+
+async def per_hit(backend, hits, workers):
+    # Every hit pays for its own mkdir and exists check, workers at a time
+    slots = asyncio.Semaphore(workers)
+
+    async def upload(hit):
+        async with slots:
+            digest, _ = hash_file(hit.path)
+            name = object_name(digest)
+            await backend.makedirs(name.rpartition('/')[0])
+            if not await backend.exists(name):
+                await backend.put(hit.path, name, digest, 'sha256')
+
+    await asyncio.gather(*(upload(hit) for hit in hits))
+
+
+def run_client(tmp, label, backend, hits, **options):
+    # Returns (seconds, client); the spool is reopened from the same file every time
+    spool = UploadSpool(os.path.join(tmp, 'spool.sqlite3'))
+    manifest = ManifestWriter(os.path.join(tmp, 'manifests', label.replace(' ', '_')), 'bench', 'jsonl')
+    client = UploadClient(backend, spool, manifest, 'bench', **options)
+    started = time.perf_counter()
+    client.start()
+    for hit in hits:
+        client.submit('user', hit)
+    client.close()
+    return time.perf_counter() - started, client
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hits', type=int, default=200)
+    parser.add_argument('--size-kb', type=int, default=64)
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds per call to the simulated share')
+    parser.add_argument('--failure-rate', type=float, default=0.2)
+    args = parser.parse_args()
+    # Every injected failure would otherwise be logged
+    log.setLevel('ERROR')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        hits = make_hits(tmp, args.hits, args.size_kb * 1024)
+        print(f"{args.hits} hits of {args.size_kb} KB, {args.latency * 1000:.0f} ms per share call")
+
+        for workers in (1, 4):
+            backend = FakeBackend(args.latency)
+            started = time.perf_counter()
+            asyncio.run(per_hit(backend, hits, workers))
+            elapsed = time.perf_counter() - started
+            print(f"  {f'per hit, {workers} at a time':<28} {elapsed:6.2f} s  {args.hits / elapsed:7.0f} hits/s  "
+                  f"{backend.calls['makedirs']:4} mkdir  {sum(backend.calls.values()):5} calls")
+        for concurrency in (4, 16, 64):
+            backend = FakeBackend(args.latency)
+            elapsed, client = run_client(tmp, f"fake {concurrency}", backend, hits, concurrency=concurrency)
+            print(f"  {f'UploadClient, {concurrency} in flight':<28} {elapsed:6.2f} s  {args.hits / elapsed:7.0f} hits/s  "
+                  f"{backend.calls['makedirs']:4} mkdir  {sum(backend.calls.values()):5} calls")
+
+        print('local directory as the share')
+        store = ContentStore(os.path.join(tmp, 'share_store'))
+        manifest = ManifestWriter(os.path.join(tmp, 'share_store'), 'bench', 'jsonl')
+        started = time.perf_counter()
+        for hit in hits:
+            store_file_and_record(hit.path, store, manifest, 'bench', 'user', hit)
+        elapsed = time.perf_counter() - started
+        print(f"  {'ContentStore, one at a time':<28} {elapsed:6.2f} s  {args.hits / elapsed:7.0f} hits/s")
+        elapsed, client = run_client(tmp, 'local', LocalBackend(os.path.join(tmp, 'share_client')), hits)
+        print(f"  {'UploadClient, 16 in flight':<28} {elapsed:6.2f} s  {args.hits / elapsed:7.0f} hits/s")
+
+        print(f"failure injection, {args.failure_rate:.0%} of share calls fail")
+        telemetry.counters.clear()
+        backend = FakeBackend(args.latency, failure_rate=args.failure_rate, seed=1)
+        elapsed, client = run_client(tmp, 'flaky', backend, hits, backoff=args.latency, seed=1)
+        print(f"  {elapsed:6.2f} s  {client.completed} uploaded  {telemetry.counters['upload.retried']} retries  "
+              f"{client.deferred} left in the spool")
+
+        telemetry.counters.clear()
+        backend = FakeBackend(args.latency, failure_rate=1.0)
+        elapsed, client = run_client(tmp, 'down', backend, hits, retries=2, backoff=args.latency, seed=1)
+        spooled = len(UploadSpool(os.path.join(tmp, 'spool.sqlite3')))
+        print(f"  share down: {elapsed:6.2f} s  {client.completed} uploaded  {spooled} left in the spool")
+        backend = FakeBackend(args.latency)
+        elapsed, client = run_client(tmp, 'next run', backend, [])
+        spooled = len(UploadSpool(os.path.join(tmp, 'spool.sqlite3')))
+        print(f"  next run:   {elapsed:6.2f} s  {client.drained} taken from the spool  {client.completed} uploaded  "
+              f"{spooled} left")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# Enumeration rate of globalfinder.walk.Walker against the os.walk + join + splitext +
+# os.stat loop the scripts used, on a synthetic tree of about a million entries with
+# node_modules and .git subtrees, empty placeholder files and a symlink loop.
+#
+#   python -m benchmarks.walk --entries 1000000
+
+import argparse
+import os
+import tempfile
+import time
+
+from globalfinder.walk import HEADER_MIN_SIZE, Walker
+
+EXTENSIONS = ('.csv', '.xls', '.xlsx', '.zip')
+FILE_TYPES = ['.pdf', '.docx', '.jpg', '.txt', '.csv', '.xlsx', '.xls', '.png', '.msg', '.zip']
+FILES_PER_DIR = 100
+
+
+def _touch(path, size):
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+    if size:
+        os.write(fd, b'x' * size)
+    os.close(fd)
+
+
+def build_tree(root, entries):
+    # Directories of FILES_PER_DIR files; a tenth of them sit under node_modules
+    # and a twentieth under .git. Every other candidate file is empty.
+    created = 0
+    number = 0
+    while created < entries:
+        user = f"user{number % 50}"
+        if number % 10 == 0:
+            directory = os.path.join(root, user, 'Documents', 'app', 'node_modules', f"pkg{number}", 'lib')
+        elif number % 20 == 1:
+            directory = os.path.join(root, user, 'Documents', 'repo', '.git', 'objects', f"{number:04x}")
+        else:
+            directory = os.path.join(root, user, 'Documents', f"project{number % 7}", f"batch{number}")
+        os.makedirs(directory, exist_ok=True)
+        created += 1
+        for index in range(FILES_PER_DIR):
+            extension = FILE_TYPES[index % len(FILE_TYPES)]
+            _touch(os.path.join(directory, f"file{index}{extension}"), 128 if index % 20 < 10 else 0)
+        created += FILES_PER_DIR
+        number += 1
+    if hasattr(os, 'symlink'):
+        os.symlink(os.path.join(root, 'user0'), os.path.join(root, 'user0', 'Documents', 'loop'))
+    return created
+
+
+def walk_baseline(root):
+    # What find_matching_files did: os.walk, join and splitext every file, stat the candidates
+    count = 0
+    for directory, _, files in os.walk(root):
+        for file in files:
+            file_path = os.path.join(directory, file)
+            if os.path.splitext(file)[1].lower() in EXTENSIONS:
+                os.stat(file_path)
+                count += 1
+    return count
+
+
+def walk_walker(root, **options):
+    count = 0
+    for entry in Walker(EXTENSIONS, **options).walk(root):
+        entry.stat()
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        entries = build_tree(tmp, args.entries)
+        print(f"{entries} entries built in {time.perf_counter() - started:.1f} s")
+
+        methods = [
+            ('os.walk + os.stat', lambda: walk_baseline(tmp)),
+            ('Walker, no pruning', lambda: walk_walker(tmp, prune=())),
+            ('Walker, defaults', lambda: walk_walker(tmp)),
+            ('Walker, --min-size', lambda: walk_walker(tmp, min_size=HEADER_MIN_SIZE)),
+        ]
+        for name, method in methods:
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                candidates = method()
+                timings.append(time.perf_counter() - started)
+            elapsed = min(timings)
+            print(f"{name:>20}: {elapsed:6.2f} s  {entries / elapsed:9.0f} entries/s  {candidates} candidates")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# Multi-sheet, offset-header detection on 50-sheet workbooks, for both .xlsx and
+# .xls. Each layout puts the roster somewhere else; "first sheet, row 0" is what
+# pd.read_excel(nrows=0) looked at before.
+#
+#   python -m benchmarks.workbook_sheets --sheets 50 --rows 2000
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.synth import ROSTER_HEADER, roster_rows, write_xls, write_xlsx
+from globalfinder.telemetry import CountingReader
+from globalfinder.xls import find_xls_header
+from globalfinder.xlsx import find_xlsx_header
+
+TITLE_BLOCK = [['Quarterly headcount export'], ['Generated by HRIS'], []]
+FINDERS = {'.xlsx': find_xlsx_header, '.xls': find_xls_header}
+
+
+def _other_sheet(rows, seed):
+    rng = random.Random(seed)
+    yield ['Date', 'Amount', 'Memo', 'Region']
+    for number in range(rows):
+        yield [f"2023-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}", rng.randrange(10000),
+               f"memo {seed}-{number}", rng.choice(['EMEA', 'APAC', 'AMER'])]
+
+
+def layouts(sheets, rows):
+    # (name, roster sheet index or None, header rows above the roster, found by the old path)
+    return [
+        ('first sheet, row 0', 0, [], True),
+        ('second sheet, title block', 1, TITLE_BLOCK, False),
+        ('last sheet, title block', sheets - 1, TITLE_BLOCK, False),
+        ('no roster', None, [], False),
+    ]
+
+
+def build(path, sheets, rows, roster_sheet, above):
+    contents = []
+    for index in range(sheets):
+        if index == roster_sheet:
+            body = above + [ROSTER_HEADER] + list(roster_rows(rows, seed=index))
+        else:
+            body = list(_other_sheet(rows, seed=index))
+        contents.append((f"Sheet{index + 1}", body))
+    if path.endswith('.xls'):
+        write_xls(path, contents)
+    else:
+        write_xlsx(path, contents)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sheets', type=int, default=50)
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for extension, find in FINDERS.items():
+            print(f"{extension}: {args.sheets} sheets of {args.rows} rows")
+            for name, roster_sheet, above, old in layouts(args.sheets, args.rows):
+                path = os.path.join(tmp, f"workbook{extension}")
+                build(path, args.sheets, args.rows, roster_sheet, above)
+                size_mb = os.path.getsize(path) / 1024 / 1024
+
+                timings = []
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    with CountingReader(path, extension) as f:
+                        match = find(f, ROSTER_HEADER)
+                    timings.append(time.perf_counter() - started)
+                    bytes_read = f.bytes_read
+
+                expected = roster_sheet is not None
+                assert match.matched == expected, (name, match)
+                where = f"sheet {match.sheet!r} row {match.row}" if match.matched else 'no match'
+                print(f"  {name:<26} {min(timings) * 1000:7.1f} ms  {bytes_read / 1024:8.0f} KB read "
+                      f"of {size_mb:5.1f} MB  {where:<24} old path: {'found' if old else 'missed'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# Compare the BIFF header sniffer in globalfinder.xls against pd.read_excel(engine='xlrd', nrows=0),
+# the path .xls files took before. Each method runs in its own interpreter so peak
+# RSS is not shared between them.
+#
+#   python -m benchmarks.xls_header --rows 600000 --files 3
+
+import argparse
+import os
+import tempfile
+
+from benchmarks.harness import add_worker_arguments, generate, run_worker, time_checks
+from benchmarks.synth import ROSTER_HEADER, write_roster_xls
+
+
+def _sniff(path):
+    from globalfinder.xls import xls_contains_columns
+    return xls_contains_columns(path, ROSTER_HEADER)
+
+
+def _xlrd(path):
+    import pandas as pd
+    df = pd.read_excel(path, engine='xlrd', nrows=0)
+    return all(column in df.columns for column in ROSTER_HEADER)
+
+
+METHODS = {'sniff': _sniff, 'xlrd': _xlrd}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=600000, help='600000 rows is about 60 MB per file')
+    parser.add_argument('--files', type=int, default=3)
+    parser.add_argument('--methods', default='sniff,xlrd')
+    add_worker_arguments(parser)
+    args = parser.parse_args()
+
+    if args.worker:
+        time_checks(args.worker, METHODS[args.worker], args.paths)
+        return
+    if args.generate:
+        for number, path in enumerate(args.paths):
+            write_roster_xls(path, rows=args.rows, seed=number)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, f"roster_{number}.xls") for number in range(args.files)]
+        generate('benchmarks.xls_header', paths, '--rows', str(args.rows))
+        size_mb = sum(os.path.getsize(path) for path in paths) / len(paths) / 1024 / 1024
+        print(f"{args.files} workbooks, {args.rows} rows each, {size_mb:.1f} MB average")
+
+        for method in args.methods.split(','):
+            stats = run_worker('benchmarks.xls_header', method, paths)
+            if stats is None:
+                continue
+            print(
+                f"{method:>6}: {stats['mean_ms']:8.1f} ms/file mean, {stats['max_ms']:8.1f} ms max, "
+                f"peak RSS {stats['peak_rss_kb'] / 1024:6.1f} MB "
+                f"(+{stats['peak_rss_growth_kb'] / 1024:.1f} MB while sniffing), "
+                f"{stats['matched']}/{stats['files']} matched"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# Compare the streaming .xlsx header sniffer against pd.read_excel(nrows=0).
+# Each method runs in its own interpreter so peak RSS is not shared between them.
+#
+#   python -m benchmarks.xlsx_header --rows 50000 --files 5
+
+import argparse
+import os
+import tempfile
+
+from benchmarks.harness import add_worker_arguments, generate, run_worker, time_checks
+from benchmarks.synth import ROSTER_HEADER, write_roster_xlsx
+
+
+def _sniff(path):
+    from globalfinder.xlsx import xlsx_contains_columns
+    return xlsx_contains_columns(path, ROSTER_HEADER)
+
+
+def _pandas(path):
+    import pandas as pd
+    df = pd.read_excel(path, engine='openpyxl', nrows=0)
+    return all(column in df.columns for column in ROSTER_HEADER)
+
+
+METHODS = {'sniff': _sniff, 'pandas': _pandas}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--files', type=int, default=5)
+    parser.add_argument('--methods', default='sniff,pandas')
+    add_worker_arguments(parser)
+    args = parser.parse_args()
+
+    if args.worker:
+        time_checks(args.worker, METHODS[args.worker], args.paths)
+        return
+    if args.generate:
+        for number, path in enumerate(args.paths):
+            write_roster_xlsx(path, rows=args.rows, seed=number)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, f"roster_{number}.xlsx") for number in range(args.files)]
+        generate('benchmarks.xlsx_header', paths, '--rows', str(args.rows))
+        size_mb = sum(os.path.getsize(path) for path in paths) / len(paths) / 1024 / 1024
+        print(f"{args.files} workbooks, {args.rows} rows each, {size_mb:.1f} MB average")
+
+        for method in args.methods.split(','):
+            stats = run_worker('benchmarks.xlsx_header', method, paths)
+            if stats is None:
+                continue
+            print(
+                f"{method:>7}: {stats['mean_ms']:8.1f} ms/file mean, {stats['p50_ms']:8.1f} ms p50, "
+                f"peak RSS {stats['peak_rss_kb'] / 1024:6.1f} MB "
+                f"(+{stats['peak_rss_growth_kb'] / 1024:.1f} MB while sniffing), "
+                f"{stats['matched']}/{stats['files']} matched"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# Old extract-every-member-then-sniff archive handling versus globalfinder.archive.ArchiveScanner.
+# Write volume is read from /proc/self/io (wchar), so the scanner's figure should be ~0.
+#
+#   python -m benchmarks.zip_members --filler-mb 200
+
+import argparse
+import io
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+from globalfinder.xlsx import xlsx_contains_columns
+from globalfinder.archive import ArchiveScanner
+from benchmarks.synth import ROSTER_HEADER, write_roster_xlsx
+
+
+def _written_bytes():
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('wchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def classify_member(name, source):
+    return name.lower().endswith('.xlsx') and xlsx_contains_columns(source, ROSTER_HEADER)
+
+
+def extract_then_sniff(file_path, temp_root):
+    # The archive branch of find_matching_files before ArchiveScanner
+    with zipfile.ZipFile(file_path, 'r') as archive:
+        for archive_file in archive.namelist():
+            with archive.open(archive_file) as af:
+                temp_path = os.path.join(temp_root, 'temp', archive_file)
+                os.makedirs(os.path.dirname(temp_path), exist_ok=True)
+                with open(temp_path, 'wb') as tf:
+                    shutil.copyfileobj(af, tf)
+                matched = classify_member(temp_path, temp_path)
+                os.remove(temp_path)
+            if matched:
+                return file_path
+    return None
+
+
+def build_archive(path, filler_mb, nested):
+    roster = io.BytesIO()
+    write_roster_xlsx(roster, rows=5000)
+    other = io.BytesIO()
+    write_roster_xlsx(other, rows=5000, header=['Name', 'Notes'])
+
+    inner = io.BytesIO()
+    with zipfile.ZipFile(inner, 'w') as archive:
+        archive.writestr('reports/q1.xlsx', other.getvalue())
+        archive.writestr('reports/roster.xlsx', roster.getvalue())
+
+    chunk = os.urandom(1024 * 1024)
+    with zipfile.ZipFile(path, 'w') as archive:
+        for number in range(filler_mb):
+            archive.writestr(f"photos/IMG_{number:04}.jpg", chunk)
+        archive.writestr('notes/summary.xlsx', other.getvalue())
+        if nested:
+            archive.writestr('exports/hr_export.zip', inner.getvalue())
+        else:
+            archive.writestr('exports/roster.xlsx', roster.getvalue())
+
+
+def measure(label, scan, size):
+    written = _written_bytes()
+    started = time.perf_counter()
+    found = scan()
+    elapsed = time.perf_counter() - started
+    written = _written_bytes() - written
+    print(f"{label:>22}: {elapsed:7.3f} s  {size / elapsed / 1024 / 1024:8.1f} MB/s  "
+          f"{written / 1024 / 1024:8.1f} MB written  match={found}")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--filler-mb', type=int, default=200, help='irrelevant members ahead of the roster')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for nested in (False, True):
+            path = os.path.join(tmp, 'archive.zip')
+            build_archive(path, args.filler_mb, nested)
+            size = os.path.getsize(path)
+            print(f"{size / 1024 / 1024:.0f} MB archive, roster {'in a nested zip' if nested else 'at top level'}")
+
+            if not nested:
+                measure('extract-then-sniff', lambda: extract_then_sniff(path, tmp), size)
+            written = measure('ArchiveScanner', lambda: ArchiveScanner(classify_member).scan(path), size)
+            if written:
+                raise SystemExit(f"ArchiveScanner wrote {written} bytes while scanning")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,2 @@
+# Roster scanner. Kept import-free so that `python -m globalfinder` and the script
+# shims only pay for the modules a sweep actually uses.
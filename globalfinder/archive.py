@@ -0,0 +1,96 @@
+import io
+import posixpath
+import zipfile
+from .telemetry import telemetry
+
+ROSTER_EXTENSIONS = ('.csv', '.xls', '.xlsx')
+
+MAX_DEPTH = 2
+MAX_MEMBER_SIZE = 512 * 1024 * 1024
+MAX_TOTAL_SIZE = 4 * 1024 * 1024 * 1024
+MAX_RATIO = 200
+# Small members compress extremely well by nature, so the ratio check starts above this size
+RATIO_MIN_SIZE = 1024 * 1024
+# Workbooks and nested archives need random access; up to this size they are
+# decompressed into memory, beyond it zipfile's seekable member stream is used
+BUFFER_SIZE = 64 * 1024 * 1024
+
+
+class ZipLimitExceeded(Exception):
+    pass
+
+
+class ArchiveScanner:
+    # Classifies archive members straight from the zip stream. Members whose
+    # extension cannot hold a roster are never decompressed, nested archives are
+    # followed up to max_depth, and the declared sizes are checked against the
+    # limits before any member is read so a zip bomb costs nothing.
+
+    def __init__(self, classify_member, extensions=ROSTER_EXTENSIONS, max_depth=MAX_DEPTH,
+                 max_member_size=MAX_MEMBER_SIZE, max_total_size=MAX_TOTAL_SIZE, max_ratio=MAX_RATIO):
+        # classify_member(name, fileobj) returns True when the member is a roster
+        self.classify_member = classify_member
+        self.extensions = tuple(extensions)
+        self.max_depth = max_depth
+        self.max_member_size = max_member_size
+        self.max_total_size = max_total_size
+        self.max_ratio = max_ratio
+
+    def scan(self, source):
+        # Returns the path of the first matching member (nested archives joined
+        # with '/'), or None
+        with zipfile.ZipFile(source) as archive:
+            return self._scan(archive, '', 0, [0])
+
+    def _check_limits(self, info, budget):
+        if info.file_size > self.max_member_size:
+            raise ZipLimitExceeded(f"{info.filename} expands to {info.file_size} bytes")
+        if info.file_size > RATIO_MIN_SIZE and info.file_size > info.compress_size * self.max_ratio:
+            raise ZipLimitExceeded(f"{info.filename} has a compression ratio above {self.max_ratio}")
+        budget[0] += info.file_size
+        if budget[0] > self.max_total_size:
+            raise ZipLimitExceeded(f"archive expands to more than {self.max_total_size} bytes")
+
+    def _scan(self, archive, prefix, depth, budget):
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            name = info.filename.lower()
+            nested = name.endswith('.zip')
+            if (nested and depth >= self.max_depth) or (not nested and not name.endswith(self.extensions)):
+                telemetry.count('zip.members_skipped')
+                continue
+
+            self._check_limits(info, budget)
+            telemetry.count('zip.nested_archives' if nested else 'zip.members_inspected')
+            member_path = prefix + info.filename
+            with archive.open(info) as member:
+                if nested or not name.endswith('.csv'):
+                    member = _random_access(member, info)
+
+                if nested:
+                    with zipfile.ZipFile(member) as inner:
+                        found = self._scan(inner, member_path + '/', depth + 1, budget)
+                elif self.classify_member(posixpath.basename(info.filename), member):
+                    found = member_path
+                else:
+                    found = None
+
+            if found:
+                return found
+        return None
+
+
+def _random_access(member, info):
+    if info.file_size <= BUFFER_SIZE:
+        return io.BytesIO(member.read())
+    return member
+
+
+def add_archive_arguments(parser):
+    parser.add_argument('--zip-depth', type=int, default=MAX_DEPTH,
+                        help='how many levels of nested archives to open')
+    parser.add_argument('--zip-max-member-mb', type=int, default=MAX_MEMBER_SIZE // 1024 // 1024,
+                        help='skip archives with a member that expands beyond this size')
+    parser.add_argument('--zip-max-ratio', type=int, default=MAX_RATIO,
+                        help='skip archives with a member compressed more than this ratio')
@@ -0,0 +1,139 @@
+import argparse
+import socket
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from .archive import ArchiveScanner, add_archive_arguments
+from .cloud import add_cloud_arguments, cloud_policy_from_arguments
+from .columns import REQUIRED_COLUMNS
+from .config import add_config_arguments, config_from_arguments
+from .content import add_content_arguments, content_classifier_from_arguments
+from .detectors import extensions_for, has_required_columns
+from .governor import ScanCheckpoint, add_governor_arguments, governor_from_arguments, lower_priority
+from .index import ScanIndex, add_index_arguments, classifier_fingerprint
+from .manifest import ManifestWriter, add_manifest_arguments
+from .scanner import classify_file, list_jobs
+from .scheduler import ScanPipeline, add_pipeline_arguments
+from .telemetry import add_telemetry_arguments, configure_logging, log, telemetry
+from .transfer import add_copy_arguments, limiter_from_arguments
+from .upload import LocalBackend, add_upload_arguments, upload_client_from_arguments
+from .walk import add_walk_arguments, walker_from_arguments
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='globalfinder')
+    add_config_arguments(parser)
+    add_walk_arguments(parser)
+    add_cloud_arguments(parser)
+    add_pipeline_arguments(parser)
+    add_governor_arguments(parser)
+    add_index_arguments(parser)
+    add_archive_arguments(parser)
+    add_content_arguments(parser)
+    add_copy_arguments(parser)
+    add_upload_arguments(parser)
+    add_manifest_arguments(parser)
+    add_telemetry_arguments(parser)
+    return parser
+
+
+def main(argv=None, preset=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    config = config_from_arguments(args, preset)
+    try:
+        extensions = extensions_for(config.formats)
+    except ValueError as e:
+        parser.error(str(e))
+    configure_logging(config.log_level)
+
+    if args.scan_window is not None and not args.scan_window.open():
+        log.info('Outside the scan window %s, nothing to do', args.scan_window.spec)
+        return 0
+    if args.governed:
+        # Before any thread starts: they inherit the priority of the one starting them
+        log.info('Running governed: %s', ', '.join(lower_priority()) or 'priority unchanged')
+    governor = governor_from_arguments(args)
+
+    shared_folder = config.share
+    Path(shared_folder).mkdir(parents=True, exist_ok=True)
+
+    hostname = socket.gethostname()
+    all_jobs = list_jobs(config.users_path, config.user_folders)
+    checkpoint = ScanCheckpoint(args.checkpoint, key=[config.users_path, list(config.user_folders), list(extensions)])
+    jobs = checkpoint.remaining(all_jobs)
+    if len(jobs) < len(all_jobs):
+        log.info('Resuming the sweep started %s: %d of %d folders left',
+                 datetime.fromtimestamp(checkpoint.started).isoformat(timespec='seconds'), len(jobs), len(all_jobs))
+
+    archive_scanner = None
+    if '.zip' in extensions:
+        archive_scanner = ArchiveScanner(
+            has_required_columns,
+            extensions=[extension for extension in extensions if extension != '.zip'],
+            max_depth=args.zip_depth,
+            max_member_size=args.zip_max_member_mb * 1024 * 1024,
+            max_ratio=args.zip_max_ratio,
+        )
+
+    content = content_classifier_from_arguments(args)
+    # Files that did not match under other settings are classified again
+    fingerprint = classifier_fingerprint(
+        formats=sorted(extensions),
+        columns=sorted(REQUIRED_COLUMNS),
+        content=None if content is None else content.threshold,
+        zip=[args.zip_depth, args.zip_max_member_mb, args.zip_max_ratio],
+    )
+
+    manifest = ManifestWriter(shared_folder, hostname, args.manifest_format, telemetry.started)
+    backend = LocalBackend(shared_folder, limiter=limiter_from_arguments(args), timeout=args.copy_timeout)
+
+    # The uploader is closed, and so waits for its uploads and writes the
+    # manifest, after the index is written: a hit counts as handled once it is
+    # in the spool
+    with upload_client_from_arguments(args, backend, manifest, hostname) as uploader:
+        if uploader.drained:
+            log.info('%d hits left over from earlier runs are uploaded first', uploader.drained)
+        with ScanIndex(args.index, full_rescan=args.full_rescan, fingerprint=fingerprint) as index:
+            def save_progress():
+                index.flush()
+                checkpoint.save()
+
+            pipeline = ScanPipeline(
+                accept=lambda file: file.lower().endswith(extensions),
+                classify=partial(classify_file, extensions=extensions, archive_scanner=archive_scanner,
+                                 content=content),
+                upload=uploader.submit,
+                walk_workers=args.walk_workers,
+                sniff_workers=args.sniff_workers,
+                copy_workers=args.copy_workers,
+                queue_size=args.queue_size,
+                sniff_processes=args.sniff_processes,
+                index=index,
+                walker=walker_from_arguments(args, extensions),
+                cloud=cloud_policy_from_arguments(args),
+                governor=governor,
+                on_job_done=checkpoint.job_done,
+                on_checkpoint=save_progress,
+            )
+            pipeline.run(jobs)
+
+            if governor is not None and governor.stopped:
+                # Not a finished sweep: nothing can be called deleted yet
+                save_progress()
+                log.info('Stopped with %d of %d folders done, the next run resumes the sweep',
+                         len(checkpoint.done), len(all_jobs))
+            else:
+                # Over the whole sweep, including folders earlier windows finished
+                roots = [target_directory for _, target_directory in all_jobs]
+                for deleted_file in index.finish_run(roots, since=checkpoint.started):
+                    log.info('File removed since the last scan: %s', deleted_file)
+                index.compact(since=checkpoint.started)
+                checkpoint.clear()
+
+    log.info('%d hits listed in %s', len(manifest.rows), uploader.manifest_path)
+    report_path = telemetry.write_report(shared_folder)
+    if uploader.deferred:
+        log.warning('%d hits could not be uploaded and stay spooled for the next run', uploader.deferred)
+    log.info('%d files uploaded, run report written to %s', uploader.completed, report_path)
+    return 0
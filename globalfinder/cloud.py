@@ -0,0 +1,98 @@
+import fnmatch
+import re
+from .telemetry import log, telemetry
+
+# Windows file attributes a sync client (OneDrive, Box Drive, any Cloud Files
+# provider) sets on a placeholder whose data is not on the disk. Opening or
+# reading such a file makes the provider download it.
+FILE_ATTRIBUTE_OFFLINE = 0x1000
+FILE_ATTRIBUTE_RECALL_ON_OPEN = 0x40000
+FILE_ATTRIBUTE_RECALL_ON_DATA_ACCESS = 0x400000
+PLACEHOLDER_ATTRIBUTES = FILE_ATTRIBUTE_OFFLINE | FILE_ATTRIBUTE_RECALL_ON_OPEN | FILE_ATTRIBUTE_RECALL_ON_DATA_ACCESS
+
+# skip: never open a placeholder. ranged: sniff at most RANGE_BYTES of it.
+# hydrate: open it like a local file. Both open only placeholders no larger
+# than HYDRATE_MAX_BYTES: a sync client downloads the whole file on the first
+# read, whatever range is asked for, and workbooks and zips are read from the
+# end first, so the range bounds what the sniff parses, not what is fetched.
+POLICIES = ('skip', 'ranged', 'hydrate')
+DEFAULT_POLICY = 'skip'
+# Enough for a whole CSV sniff
+RANGE_BYTES = 64 * 1024
+HYDRATE_MAX_BYTES = 16 * 1024 * 1024
+
+# Returned by CloudPolicy.read_limit for a file that is not to be opened
+SKIP = object()
+
+
+class StatAttributes:
+    # Reads the attributes from the stat the directory listing returned, so on
+    # Windows asking costs nothing. Other platforms have no placeholders.
+
+    def attributes(self, entry):
+        return getattr(entry.stat(follow_symlinks=False), 'st_file_attributes', 0)
+
+
+class SimulatedAttributes:
+    # Reports files whose path matches one of the globs as placeholders, so the
+    # policies can be exercised on a machine without a sync client
+
+    def __init__(self, patterns, attributes=FILE_ATTRIBUTE_RECALL_ON_DATA_ACCESS):
+        translated = [fnmatch.translate(pattern.replace('\\', '/')) for pattern in patterns]
+        self._match = re.compile('|'.join(translated), re.IGNORECASE).match if translated else None
+        self._attributes = attributes
+
+    def attributes(self, entry):
+        if self._match is not None and self._match(entry.path.replace('\\', '/')):
+            return self._attributes
+        return 0
+
+
+class CloudPolicy:
+    # Decides, before a file is opened, how much of it the scan may read. Local
+    # files are read without limit; placeholders are skipped, sniffed within a
+    # byte range or opened whole depending on the policy, and only up to a size
+    # cap. The full size of every placeholder opened is added to
+    # cloud.hydrated_bytes, since that is what the sync client downloads.
+
+    def __init__(self, policy=DEFAULT_POLICY, range_bytes=RANGE_BYTES, hydrate_max_bytes=HYDRATE_MAX_BYTES,
+                 provider=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown cloud policy: {policy}")
+        self.policy = policy
+        self.range_bytes = range_bytes
+        self.hydrate_max_bytes = hydrate_max_bytes
+        self.provider = StatAttributes() if provider is None else provider
+
+    def read_limit(self, entry):
+        # Returns SKIP, the number of bytes the sniff may read, or None for no limit
+        if not self.provider.attributes(entry) & PLACEHOLDER_ATTRIBUTES:
+            return None
+        telemetry.count('cloud.placeholders')
+        size = entry.stat().st_size
+
+        if self.policy != 'skip' and size <= self.hydrate_max_bytes:
+            telemetry.count(f"cloud.{'ranged' if self.policy == 'ranged' else 'hydrated'}")
+            telemetry.count('cloud.hydrated_bytes', size)
+            return self.range_bytes if self.policy == 'ranged' else None
+
+        telemetry.count('cloud.skipped')
+        log.debug('Skipping cloud placeholder %s (%d bytes)', entry.path, size)
+        return SKIP
+
+
+def add_cloud_arguments(parser):
+    parser.add_argument('--cloud-policy', choices=POLICIES, default=DEFAULT_POLICY,
+                        help='what to do with OneDrive/Box files that are not downloaded')
+    parser.add_argument('--cloud-range-kb', type=int, default=RANGE_BYTES // 1024,
+                        help='bytes of a placeholder the ranged policy may parse; CSV needs 64')
+    parser.add_argument('--cloud-hydrate-max-mb', type=int, default=HYDRATE_MAX_BYTES // 1024 // 1024,
+                        help='largest placeholder the ranged and hydrate policies open')
+    parser.add_argument('--simulate-placeholders', action='append', default=[], metavar='GLOB',
+                        help='treat files matching this path glob as placeholders, for testing the policies')
+
+
+def cloud_policy_from_arguments(args):
+    provider = SimulatedAttributes(args.simulate_placeholders) if args.simulate_placeholders else None
+    return CloudPolicy(args.cloud_policy, args.cloud_range_kb * 1024, args.cloud_hydrate_max_mb * 1024 * 1024,
+                       provider)
@@ -0,0 +1,65 @@
+from collections import namedtuple
+
+REQUIRED_COLUMNS = frozenset({
+    'Employee Number',
+    'Employee Name',
+    'Current Hire Date',
+    'Work Country',
+    'Business Title',
+    'Email Address',
+    'Business Group',
+})
+
+
+def normalize_column(name):
+    # The scripts disagreed on case and padding; every format now compares
+    # header cells case-insensitively with whitespace and BOMs squeezed out
+    if not isinstance(name, str):
+        name = '' if name is None else str(name)
+    return ' '.join(name.replace('\ufeff', '').split()).casefold()
+
+
+class ColumnMatcher:
+
+    def __init__(self, required_columns=REQUIRED_COLUMNS):
+        self.required_columns = frozenset(required_columns)
+        self._required = {normalize_column(column): column for column in self.required_columns}
+
+    def missing(self, cells):
+        # Required columns (in their original spelling) that cells does not contain
+        found = {normalize_column(cell) for cell in cells}
+        return frozenset(column for key, column in self._required.items() if key not in found)
+
+    def matches(self, cells):
+        return not self.missing(cells)
+
+
+DEFAULT_MATCHER = ColumnMatcher()
+
+
+# Where a workbook detector found the header, or the closest it came. sheet is the
+# sheet name and row the 0-based row index; missing is empty on a match. For a
+# CSV, dialect is the (encoding, delimiter) the header was read with.
+HeaderMatch = namedtuple('HeaderMatch', 'matched sheet row header missing dialect', defaults=(None,))
+
+
+# A file classified as a roster. verdict names the check that decided it:
+# 'header', 'content', 'archive', or 'indexed' for a hit remembered from an
+# earlier run; member is the matching path inside an archive.
+Hit = namedtuple('Hit', 'path verdict sheet row member confidence', defaults=(None, None, None, None))
+
+
+class Miss(namedtuple('Miss', 'path missing')):
+    # A file classified as not a roster; missing holds the required columns
+    # (in their original spelling) that its closest header lacked. A Miss is
+    # false, so callers that only ask whether a file is a roster can treat it
+    # like None.
+    __slots__ = ()
+
+    def __bool__(self):
+        return False
+
+
+class SniffBudgetExceeded(Exception):
+    # Raised inside a detector once it has read its per-file byte budget
+    pass
@@ -0,0 +1,211 @@
+import os
+import stat
+import sys
+import tempfile
+from collections import namedtuple
+
+ScanConfig = namedtuple('ScanConfig', 'users_path user_folders share formats log_level')
+
+USERS_PATH = 'C:\\Users'
+SHARE = '\\\\s-amusdat-ile03\\Cyber-Review\\'
+
+
+def data_dir():
+    # %PROGRAMDATA%\GlobalRosterFinder, or the temp directory where there is no PROGRAMDATA
+    return os.path.join(os.environ.get('PROGRAMDATA', tempfile.gettempdir()), 'GlobalRosterFinder')
+
+
+def data_path(name):
+    # A file the client keeps between runs, see prepare_data_path
+    return os.path.join(data_dir(), name)
+
+
+# Full control for SYSTEM and Administrators only, inherited by everything
+# created inside and not by what the parent folder grants
+DATA_DIR_SDDL = 'D:P(A;OICI;FA;;;SY)(A;OICI;FA;;;BA)'
+TRUSTED_OWNER_SIDS = ('S-1-5-18', 'S-1-5-32-544')
+SE_FILE_OBJECT = 1
+OWNER_SECURITY_INFORMATION = 0x1
+DACL_SECURITY_INFORMATION = 0x4
+PROTECTED_DACL_SECURITY_INFORMATION = 0x80000000
+SDDL_REVISION_1 = 1
+ERROR_ALREADY_EXISTS = 183
+
+
+def _security_descriptor(advapi32):
+    import ctypes
+    from ctypes import wintypes
+    descriptor = wintypes.LPVOID()
+    if not advapi32.ConvertStringSecurityDescriptorToSecurityDescriptorW(
+            DATA_DIR_SDDL, SDDL_REVISION_1, ctypes.byref(descriptor), None):
+        raise ctypes.WinError(ctypes.get_last_error())
+    return descriptor
+
+
+def _create_restricted_dir(directory):
+    # CreateDirectoryW with the restricted DACL, so there is no moment at
+    # which another user could write into the new directory
+    import ctypes
+    from ctypes import wintypes
+
+    class SECURITY_ATTRIBUTES(ctypes.Structure):
+        _fields_ = [
+            ('nLength', wintypes.DWORD),
+            ('lpSecurityDescriptor', wintypes.LPVOID),
+            ('bInheritHandle', wintypes.BOOL),
+        ]
+
+    advapi32 = ctypes.WinDLL('advapi32', use_last_error=True)
+    kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    descriptor = _security_descriptor(advapi32)
+    try:
+        attributes = SECURITY_ATTRIBUTES(ctypes.sizeof(SECURITY_ATTRIBUTES), descriptor, False)
+        if not kernel32.CreateDirectoryW(directory, ctypes.byref(attributes)):
+            error = ctypes.get_last_error()
+            if error != ERROR_ALREADY_EXISTS:
+                raise ctypes.WinError(error)
+    finally:
+        kernel32.LocalFree(descriptor)
+
+
+def _restrict_dir(directory):
+    # Replaces the DACL of a directory created before it was restricted, which
+    # inherited the right to add files from %PROGRAMDATA%
+    import ctypes
+    from ctypes import wintypes
+    advapi32 = ctypes.WinDLL('advapi32', use_last_error=True)
+    kernel32 = ctypes.WinDLL('kernel32')
+    descriptor = _security_descriptor(advapi32)
+    try:
+        present, defaulted, dacl = wintypes.BOOL(), wintypes.BOOL(), wintypes.LPVOID()
+        if not advapi32.GetSecurityDescriptorDacl(descriptor, ctypes.byref(present), ctypes.byref(dacl),
+                                                  ctypes.byref(defaulted)):
+            raise ctypes.WinError(ctypes.get_last_error())
+        error = advapi32.SetNamedSecurityInfoW(
+            directory, SE_FILE_OBJECT, DACL_SECURITY_INFORMATION | PROTECTED_DACL_SECURITY_INFORMATION,
+            None, None, dacl, None,
+        )
+        if error:
+            raise ctypes.WinError(error)
+    finally:
+        kernel32.LocalFree(descriptor)
+
+
+def _owner_sid(path):
+    import ctypes
+    from ctypes import wintypes
+    advapi32 = ctypes.WinDLL('advapi32', use_last_error=True)
+    kernel32 = ctypes.WinDLL('kernel32')
+    owner, descriptor = wintypes.LPVOID(), wintypes.LPVOID()
+    error = advapi32.GetNamedSecurityInfoW(
+        path, SE_FILE_OBJECT, OWNER_SECURITY_INFORMATION,
+        ctypes.byref(owner), None, None, None, ctypes.byref(descriptor),
+    )
+    if error:
+        raise ctypes.WinError(error)
+    try:
+        sid = wintypes.LPWSTR()
+        if not advapi32.ConvertSidToStringSidW(owner, ctypes.byref(sid)):
+            raise ctypes.WinError(ctypes.get_last_error())
+        try:
+            return sid.value
+        finally:
+            kernel32.LocalFree(sid)
+    finally:
+        kernel32.LocalFree(descriptor)
+
+
+def _check_owner(path):
+    # SYSTEM or Administrators on Windows; root or this user elsewhere, and
+    # nobody else may write to it
+    if sys.platform == 'win32':
+        owner = _owner_sid(path)
+        if owner not in TRUSTED_OWNER_SIDS:
+            raise PermissionError(f"{path} is owned by {owner}, not SYSTEM or Administrators; refusing to use it")
+        return
+    info = os.lstat(path)
+    if info.st_uid not in (0, os.getuid()):
+        raise PermissionError(f"{path} is owned by uid {info.st_uid}; refusing to use it")
+    if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH) or stat.S_ISLNK(info.st_mode):
+        raise PermissionError(f"{path} is writable by other users; refusing to use it")
+
+
+def prepare_data_path(path):
+    # Creates the directory of a file kept between runs. Any local user can
+    # create folders under %PROGRAMDATA% (or the temp directory), so the data
+    # directory is created for SYSTEM and Administrators (this user elsewhere)
+    # only, and an existing one, or the file itself, is refused unless one of
+    # them owns it. Paths outside the data directory were chosen on the
+    # command line and are only created.
+    directory = os.path.dirname(os.path.abspath(path))
+    if os.path.normcase(directory) != os.path.normcase(os.path.abspath(data_dir())):
+        os.makedirs(directory, exist_ok=True)
+        return
+    os.makedirs(os.path.dirname(directory), exist_ok=True)
+    if sys.platform == 'win32':
+        _create_restricted_dir(directory)
+        _check_owner(directory)
+        _restrict_dir(directory)
+    else:
+        try:
+            os.mkdir(directory, 0o700)
+        except FileExistsError:
+            pass
+        _check_owner(directory)
+    if os.path.lexists(path):
+        _check_owner(path)
+
+
+# What each of the old scripts scanned; the scripts themselves are now shims that
+# start the CLI with their preset
+PRESETS = {
+    # GlobalFinder_2.3.py, GlobalFinderXLSXCLOUD.py
+    'finder': ScanConfig(
+        USERS_PATH, ('Documents', 'Downloads', 'Desktop', 'Box', 'OneDrive'),
+        SHARE + 'GlobalR\\', ('xls', 'xlsx', 'csv', 'zip'), 'INFO',
+    ),
+    # GlobalColumn3.0.py
+    'column': ScanConfig(
+        USERS_PATH, ('Documents', 'Downloads', 'Desktop', 'Box', 'OneDrive'),
+        SHARE, ('csv', 'xls', 'xlsx'), 'INFO',
+    ),
+    # GlobalRosterFinder.py
+    'roster': ScanConfig(
+        USERS_PATH, ('Documents', 'Downloads', 'Desktop'),
+        SHARE, ('csv',), 'DEBUG',
+    ),
+    # GlobalRoster_nodebug.py
+    'nodebug': ScanConfig(
+        USERS_PATH, ('Documents', 'Downloads', 'Desktop'),
+        SHARE, ('csv',), 'WARNING',
+    ),
+}
+DEFAULT_PRESET = 'finder'
+
+
+def _split(value):
+    return tuple(part.strip() for part in value.split(',') if part.strip())
+
+
+def add_config_arguments(parser):
+    parser.add_argument('--preset', choices=sorted(PRESETS),
+                        help=f"Starting point for the options below (default: {DEFAULT_PRESET})")
+    parser.add_argument('--users-path', help='Directory holding one folder per user profile')
+    parser.add_argument('--user-folders', type=_split,
+                        help='Comma-separated folders scanned under each profile')
+    parser.add_argument('--share', help='Share the hits are uploaded to')
+    parser.add_argument('--formats', type=_split,
+                        help='Comma-separated formats to sniff: csv, xls, xlsx, zip')
+
+
+def config_from_arguments(args, preset=None):
+    # Options given on the command line override the preset
+    config = PRESETS[args.preset or preset or DEFAULT_PRESET]
+    overrides = {
+        'users_path': args.users_path,
+        'user_folders': args.user_folders,
+        'share': args.share,
+        'formats': args.formats,
+        'log_level': args.log_level,
+    }
+    return config._replace(**{field: value for field, value in overrides.items() if value is not None})
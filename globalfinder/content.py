@@ -0,0 +1,237 @@
+import re
+from collections import defaultdict, namedtuple
+from itertools import zip_longest
+from .columns import normalize_column
+from .detectors import sample_sheets
+from .telemetry import telemetry
+
+# Second-stage roster detection for files whose header does not carry the
+# required column names: renamed columns ("Emp #", "E-mail") or no header at
+# all. A bounded sample of rows is scored column by column against the kind of
+# value each required column holds.
+
+# Rows sampled per sheet, scored CHUNK_ROWS at a time so a clear roster stops early
+SAMPLE_ROWS = 200
+CHUNK_ROWS = 25
+# Share of a column's non-empty sampled values that must fit a field
+MIN_FRACTION = 0.6
+# Fewer values than this say nothing about a column
+MIN_VALUES = 5
+# Rows at the top of a sample searched for a renamed header
+HEADER_ROWS = 10
+CONFIDENCE_THRESHOLD = 0.6
+
+EMAIL = r"[A-Za-z0-9._%+'-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}"
+# Digits with an optional short alphabetic prefix: 104233, E104233, EMP-104233
+EMPLOYEE_ID = r'(?:[A-Za-z]{1,3}[-_]?)?\d{4,10}'
+_MONTH_NAME = r'(?i:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?'
+DATE = '|'.join([
+    r'(?:19|20)\d\d[-/.](?:0?[1-9]|1[0-2])[-/.](?:0?[1-9]|[12]\d|3[01])(?:[ T]\d\d?:\d\d(?::\d\d(?:\.\d+)?)?)?',
+    r'(?:0?[1-9]|[12]\d|3[01])[-/.](?:0?[1-9]|[12]\d|3[01])[-/.](?:(?:19|20)\d\d|\d\d)(?: \d\d?:\d\d(?::\d\d)?)?',
+    rf'(?:0?[1-9]|[12]\d|3[01])[- ]{_MONTH_NAME}[- ,]+(?:(?:19|20)\d\d|\d\d)',
+    rf'{_MONTH_NAME} (?:0?[1-9]|[12]\d|3[01]),? (?:19|20)\d\d',
+])
+# Two to four capitalized words, or "Last, First"
+PERSON_NAME = r"[A-ZÀ-Þ][\w'’.-]+(?:,? [A-ZÀ-Þ][\w'’.-]+){1,3}"
+
+# ISO 3166 short names plus the spellings HR systems commonly export
+COUNTRIES = frozenset(normalize_column(name) for name in (
+    'Afghanistan', 'Albania', 'Algeria', 'Andorra', 'Angola', 'Argentina', 'Armenia', 'Australia', 'Austria',
+    'Azerbaijan', 'Bahamas', 'Bahrain', 'Bangladesh', 'Barbados', 'Belarus', 'Belgium', 'Belize', 'Benin',
+    'Bermuda', 'Bhutan', 'Bolivia', 'Bosnia and Herzegovina', 'Botswana', 'Brazil', 'Brunei', 'Bulgaria',
+    'Burkina Faso', 'Burundi', 'Cambodia', 'Cameroon', 'Canada', 'Cape Verde', 'Cayman Islands', 'Chad',
+    'Chile', 'China', 'Colombia', 'Congo', 'Costa Rica', "Cote d'Ivoire", 'Croatia', 'Cuba', 'Cyprus',
+    'Czech Republic', 'Czechia', 'Denmark', 'Djibouti', 'Dominican Republic', 'Ecuador', 'Egypt', 'El Salvador',
+    'Estonia', 'Eswatini', 'Ethiopia', 'Fiji', 'Finland', 'France', 'Gabon', 'Gambia', 'Georgia', 'Germany',
+    'Ghana', 'Gibraltar', 'Greece', 'Guatemala', 'Guernsey', 'Guinea', 'Guyana', 'Haiti', 'Honduras',
+    'Hong Kong', 'Hungary', 'Iceland', 'India', 'Indonesia', 'Iran', 'Iraq', 'Ireland', 'Isle of Man', 'Israel',
+    'Italy', 'Jamaica', 'Japan', 'Jersey', 'Jordan', 'Kazakhstan', 'Kenya', 'Korea', 'South Korea',
+    'Republic of Korea', 'Kosovo', 'Kuwait', 'Kyrgyzstan', 'Laos', 'Latvia', 'Lebanon', 'Liberia', 'Libya',
+    'Liechtenstein', 'Lithuania', 'Luxembourg', 'Macao', 'Macau', 'Madagascar', 'Malawi', 'Malaysia',
+    'Maldives', 'Mali', 'Malta', 'Mauritania', 'Mauritius', 'Mexico', 'Moldova', 'Monaco', 'Mongolia',
+    'Montenegro', 'Morocco', 'Mozambique', 'Myanmar', 'Namibia', 'Nepal', 'Netherlands', 'New Zealand',
+    'Nicaragua', 'Niger', 'Nigeria', 'North Macedonia', 'Norway', 'Oman', 'Pakistan', 'Panama',
+    'Papua New Guinea', 'Paraguay', 'Peru', 'Philippines', 'Poland', 'Portugal', 'Puerto Rico', 'Qatar',
+    'Romania', 'Russia', 'Russian Federation', 'Rwanda', 'Saudi Arabia', 'Senegal', 'Serbia', 'Seychelles',
+    'Sierra Leone', 'Singapore', 'Slovakia', 'Slovenia', 'Somalia', 'South Africa', 'Spain', 'Sri Lanka',
+    'Sudan', 'Suriname', 'Sweden', 'Switzerland', 'Syria', 'Taiwan', 'Tajikistan', 'Tanzania', 'Thailand',
+    'Togo', 'Trinidad and Tobago', 'Tunisia', 'Turkey', 'Turkiye', 'Turkmenistan', 'Uganda', 'Ukraine',
+    'United Arab Emirates', 'UAE', 'United Kingdom', 'UK', 'Great Britain', 'United States',
+    'United States of America', 'USA', 'US', 'Uruguay', 'Uzbekistan', 'Venezuela', 'Vietnam', 'Viet Nam',
+    'Yemen', 'Zambia', 'Zimbabwe',
+))
+
+
+def _matching(pattern):
+    # Counts the values that are entirely a match. Each value is matched on its
+    # own: a cell holding a line break must not count once per line.
+    fullmatch = re.compile(pattern).fullmatch
+    return lambda values: sum(1 for value in values if fullmatch(value))
+
+
+def _listed(vocabulary):
+    return lambda values: sum(map(vocabulary.__contains__, map(str.casefold, values)))
+
+
+# column: the required column the field stands for. test(values) counts the
+# values that fit it; fields without one are only recognized by a header alias.
+# min_distinct keeps names and ids apart from repetitive columns such as titles.
+Field = namedtuple('Field', 'column weight test min_distinct aliases')
+
+FIELDS = (
+    Field('Email Address', 3, _matching(EMAIL), 0, (
+        'email', 'e-mail', 'email address', 'e-mail address', 'mail', 'work email', 'business email',
+        'email id', 'primary email',
+    )),
+    Field('Employee Number', 2, _matching(EMPLOYEE_ID), 0.95, (
+        'employee number', 'emp #', 'emp#', 'emp no', 'emp no.', 'emp num', 'employee no', 'employee no.',
+        'employee #', 'employee id', 'emp id', 'empid', 'eid', 'staff id', 'staff number', 'worker id',
+        'personnel number', 'person number', 'badge number', 'associate id',
+    )),
+    Field('Current Hire Date', 1, _matching(DATE), 0, (
+        'current hire date', 'hire date', 'date of hire', 'doh', 'start date', 'original hire date',
+        'date hired', 'join date', 'date joined', 'joining date', 'seniority date',
+    )),
+    Field('Work Country', 1, _listed(COUNTRIES), 0, (
+        'work country', 'country', 'country name', 'location country', 'country of work', 'work location country',
+    )),
+    Field('Employee Name', 1, _matching(PERSON_NAME), 0.2, (
+        'employee name', 'name', 'full name', 'emp name', 'employee', 'worker name', 'associate name',
+        'legal name', 'display name', 'preferred name',
+    )),
+    Field('Business Title', 0.5, None, 0, (
+        'business title', 'title', 'job title', 'position', 'position title', 'job', 'role', 'designation',
+    )),
+    Field('Business Group', 0.5, None, 0, (
+        'business group', 'group', 'department', 'dept', 'division', 'business unit', 'bu', 'org',
+        'organization', 'organisation', 'function', 'segment',
+    )),
+)
+TOTAL_WEIGHT = sum(field.weight for field in FIELDS)
+ALIASES = {normalize_column(alias): field for field in FIELDS for alias in field.aliases}
+
+# confidence is the weighted share of required columns found; mapping takes each
+# found required column to its 0-based column index in sheet
+ContentMatch = namedtuple('ContentMatch', 'matched confidence sheet mapping')
+
+
+class _SheetSample:
+    # Running per-column counts for one sheet. A renamed header, if any, is
+    # looked for in the first chunk; every later row is data.
+
+    def __init__(self, sheet):
+        self.sheet = sheet
+        self.chunks = 0
+        self.mapping = None
+        # Set once more rows are not expected to change the outcome
+        self.settled = False
+        self.header = {}
+        self.filled = defaultdict(int)
+        self.hits = defaultdict(int)
+        self.distinct = defaultdict(set)
+
+    def _find_header(self, rows):
+        best_row, best = -1, {}
+        for number, row in enumerate(rows[:HEADER_ROWS]):
+            found = {}
+            for column, cell in enumerate(row):
+                field = ALIASES.get(normalize_column(cell))
+                if field is not None and field.column not in found:
+                    found[field.column] = column
+            if len(found) >= 2 and len(found) > len(best):
+                best_row, best = number, found
+        self.header = best
+        return best_row + 1
+
+    def add(self, rows):
+        if not self.chunks:
+            rows = rows[self._find_header(rows):]
+        self.chunks += 1
+        # Transposed so every test sees a whole column at once
+        for column, values in enumerate(zip_longest(*rows, fillvalue='')):
+            values = list(filter(None, map(str.strip, values)))
+            if not values:
+                continue
+            self.filled[column] += len(values)
+            self.distinct[column].update(values)
+            for field in FIELDS:
+                if field.test is not None:
+                    self.hits[field.column, column] += field.test(values)
+
+    def score(self):
+        # A header alone is no roster: an empty template names the columns too.
+        # Nothing counts until a data row fits one of the tested fields.
+        if not any(self.hits.values()):
+            return 0.0, {}
+        mapping = dict(self.header)
+        taken = set(mapping.values())
+        for field in FIELDS:
+            if field.test is None or field.column in mapping:
+                continue
+            best = None
+            for column, filled in self.filled.items():
+                if column in taken or filled < MIN_VALUES:
+                    continue
+                fraction = self.hits[field.column, column] / filled
+                if fraction < MIN_FRACTION or len(self.distinct[column]) < field.min_distinct * filled:
+                    continue
+                if best is None or fraction > best[0]:
+                    best = (fraction, column)
+            if best is not None:
+                mapping[field.column] = best[1]
+                taken.add(best[1])
+        weights = {field.column: field.weight for field in FIELDS}
+        return sum(weights[column] for column in mapping) / TOTAL_WEIGHT, mapping
+
+
+class ContentClassifier:
+    # Scores sampled rows sheet by sheet and stops at the first sheet whose
+    # confidence reaches the threshold. A sheet is left as soon as a chunk shows
+    # no evidence at all or does not change what the previous chunks found.
+
+    def __init__(self, threshold=CONFIDENCE_THRESHOLD, sample_rows=SAMPLE_ROWS, chunk_rows=CHUNK_ROWS):
+        self.threshold = threshold
+        self.sample_rows = sample_rows
+        self.chunk_rows = chunk_rows
+
+    def classify(self, name, source):
+        best = ContentMatch(False, 0.0, None, {})
+        for sheet, rows in sample_sheets(name, source, self.sample_rows):
+            sample = _SheetSample(sheet)
+            chunk = []
+            for _, values in rows:
+                chunk.append(values)
+                if len(chunk) == self.chunk_rows:
+                    best = self._scored(sample, chunk, best)
+                    chunk = []
+                    if best.matched or sample.settled:
+                        break
+            if chunk:
+                best = self._scored(sample, chunk, best)
+            if best.matched:
+                return best
+        return best
+
+    def _scored(self, sample, chunk, best):
+        previous = sample.mapping
+        sample.add(chunk)
+        confidence, sample.mapping = sample.score()
+        if confidence == 0:
+            telemetry.count('content.sheets_dismissed')
+            sample.settled = True
+        elif sample.mapping == previous:
+            sample.settled = True
+        if confidence > best.confidence:
+            return ContentMatch(confidence >= self.threshold, confidence, sample.sheet, sample.mapping)
+        return best
+
+
+def add_content_arguments(parser):
+    parser.add_argument('--content-scan', action='store_true',
+                        help='also score sampled cell contents of files whose header does not match')
+    parser.add_argument('--content-threshold', type=float, default=CONFIDENCE_THRESHOLD,
+                        help='weighted share of the required columns the contents must show, 0 to 1')
+
+
+def content_classifier_from_arguments(args):
+    return ContentClassifier(args.content_threshold) if args.content_scan else None
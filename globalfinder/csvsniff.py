@@ -0,0 +1,124 @@
+import codecs
+import csv
+import io
+from collections import namedtuple
+from .columns import ColumnMatcher
+
+# Upper bound on what is read from any one file, however large it is
+SNIFF_BYTES = 64 * 1024
+# Rows examined for a header, so exports with a title block above the header still match
+MAX_LINES = 50
+DELIMITERS = ',;\t|'
+
+# UTF-32 LE starts with the UTF-16 LE mark, so it has to be tested first
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+
+# missing holds the required columns, in their original spelling, that the
+# closest header lacked; it is empty on a match
+CsvSniffResult = namedtuple('CsvSniffResult', 'matched encoding delimiter line_number header missing')
+
+
+def detect_encoding(head):
+    # Returns (encoding, length of the byte order mark)
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding, len(bom)
+
+    # UTF-16 without a BOM: mostly-ASCII text leaves every other byte zero
+    sample = head[:4096]
+    if sample.count(0) > len(sample) // 4:
+        odd_zeros = sample[1::2].count(0)
+        even_zeros = sample[0::2].count(0)
+        return ('utf-16-le' if odd_zeros >= even_zeros else 'utf-16-be'), 0
+
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8', 0
+    except UnicodeDecodeError:
+        # Excel's "CSV" export on Windows writes the ANSI code page
+        return 'cp1252', 0
+
+
+def _decode(head, encoding, bom_length):
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    # final=False drops a character cut in half at the end of the byte budget
+    return decoder.decode(head[bom_length:], final=False)
+
+
+def _guess_delimiter(sample):
+    # Whichever candidate appears most often in the sampled lines
+    counts = {delimiter: sample.count(delimiter) for delimiter in DELIMITERS}
+    best = max(counts, key=counts.get)
+    return best if counts[best] else ','
+
+
+def _read_head(source, max_bytes):
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source[:max_bytes])
+    if hasattr(source, 'read'):
+        return source.read(max_bytes)
+    with open(source, 'rb') as f:
+        return f.read(max_bytes)
+
+
+def sniff_csv(source, required_columns, max_bytes=SNIFF_BYTES, max_lines=MAX_LINES):
+    # source is a path, an open binary stream or the leading bytes of a file
+    head = _read_head(source, max_bytes)
+    encoding, bom_length = detect_encoding(head)
+    text = _decode(head, encoding, bom_length)
+
+    matcher = ColumnMatcher(required_columns)
+    sample = '\n'.join(text.split('\n', max_lines)[:max_lines])
+    guessed = _guess_delimiter(sample)
+    candidates = [guessed] + [delimiter for delimiter in DELIMITERS if delimiter != guessed and delimiter in sample]
+
+    best = None
+    for delimiter in candidates:
+        reader = csv.reader(io.StringIO(text, newline=''), delimiter=delimiter)
+        try:
+            for line_number, row in enumerate(reader):
+                if line_number >= max_lines:
+                    break
+                missing = matcher.missing(row)
+                if not missing:
+                    return CsvSniffResult(True, encoding, delimiter, line_number, row, frozenset())
+                if best is None or len(missing) < len(best.missing):
+                    best = CsvSniffResult(False, encoding, delimiter, line_number, row, missing)
+        except csv.Error:
+            continue
+
+    if best is None:
+        return CsvSniffResult(False, encoding, guessed, None, [], matcher.required_columns)
+    return best
+
+
+def iter_csv_rows(source, max_bytes=SNIFF_BYTES, max_lines=MAX_LINES, encoding=None, delimiter=None):
+    # Yields (line number, cells) for the non-empty rows among the first
+    # max_lines. The encoding and delimiter sniff_csv matched a header with
+    # are passed in when known; otherwise they are detected and guessed here.
+    head = _read_head(source, max_bytes)
+    detected, bom_length = detect_encoding(head)
+    if encoding is not None and encoding != detected:
+        bom_length = next((len(bom) for bom, name in BOMS if name == encoding and head.startswith(bom)), 0)
+    text = _decode(head, encoding or detected, bom_length)
+    if len(head) >= max_bytes:
+        # The byte budget most likely cut the last line short
+        text = text[:text.rfind('\n') + 1]
+    sample = '\n'.join(text.split('\n', max_lines)[:max_lines])
+    reader = csv.reader(io.StringIO(sample, newline=''), delimiter=delimiter or _guess_delimiter(sample))
+    try:
+        for line_number, row in enumerate(reader):
+            if any(row):
+                yield line_number, row
+    except csv.Error:
+        return
+
+
+def csv_contains_columns(source, required_columns, max_bytes=SNIFF_BYTES, max_lines=MAX_LINES):
+    return sniff_csv(source, required_columns, max_bytes, max_lines).matched
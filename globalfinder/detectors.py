@@ -0,0 +1,126 @@
+# Format detectors, keyed by file extension. Each detector takes the file (a path
+# or an open binary stream) and a ColumnMatcher and returns a HeaderMatch.
+# Detectors import their parser on first use, so a CSV-only sweep never loads
+# pandas or the workbook readers. Samplers, keyed the same way, feed the
+# content classifier and the review's extraction: each yields (sheet, rows)
+# per sheet, rows yielding (row index, values) for the first max_rows rows,
+# reading at most max_bytes (None for the format's sniffing budget). dialect is
+# a HeaderMatch's, so rows are split the way the header was; only CSV has one.
+
+import os
+from .columns import DEFAULT_MATCHER, HeaderMatch
+
+DETECTORS = {}
+SAMPLERS = {}
+
+
+def _registry(table):
+    def decorator(*extensions):
+        def register(function):
+            for extension in extensions:
+                table[extension] = function
+            return function
+        return register
+    return decorator
+
+
+detector = _registry(DETECTORS)
+sampler = _registry(SAMPLERS)
+
+
+@detector('.csv')
+def detect_csv(source, matcher):
+    from .csvsniff import sniff_csv
+    result = sniff_csv(source, matcher.required_columns)
+    return HeaderMatch(result.matched, None, result.line_number, result.header, result.missing,
+                       (result.encoding, result.delimiter))
+
+
+@detector('.xlsx')
+def detect_xlsx(source, matcher):
+    from .xlsx import find_xlsx_header
+    return find_xlsx_header(source, matcher.required_columns)
+
+
+@detector('.xls')
+def detect_xls(source, matcher):
+    from .xls import XlsFormatError, find_xls_header
+    try:
+        return find_xls_header(source, matcher.required_columns)
+    except XlsFormatError:
+        # BIFF5 and older, encrypted or not a compound document at all: leave it to xlrd
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        return _detect_xls_pandas(source, matcher)
+
+
+def _detect_xls_pandas(source, matcher):
+    from .xls import MAX_ROWS
+    import pandas as pd
+    best = HeaderMatch(False, None, None, [], matcher.required_columns)
+    sheets = pd.read_excel(source, engine='xlrd', sheet_name=None, header=None, nrows=MAX_ROWS)
+    for name, df in sheets.items():
+        for row, values in enumerate(df.itertuples(index=False)):
+            header = [value for value in values if not pd.isna(value)]
+            missing = matcher.missing(header)
+            if not missing:
+                return HeaderMatch(True, name, row, header, frozenset())
+            if len(missing) < len(best.missing):
+                best = HeaderMatch(False, name, row, header, missing)
+    return best
+
+
+@sampler('.csv')
+def sample_csv(source, max_rows, max_bytes=None, dialect=None):
+    from .csvsniff import SNIFF_BYTES, iter_csv_rows
+    encoding, delimiter = dialect or (None, None)
+    return [(None, iter_csv_rows(source, max_bytes or SNIFF_BYTES, max_rows, encoding, delimiter))]
+
+
+@sampler('.xlsx')
+def sample_xlsx(source, max_rows, max_bytes=None, dialect=None):
+    from .xlsx import MAX_BYTES, iter_xlsx_sheets
+    return iter_xlsx_sheets(source, max_rows, max_bytes or MAX_BYTES)
+
+
+@sampler('.xls')
+def sample_xls(source, max_rows, max_bytes=None, dialect=None):
+    from .xls import MAX_BYTES, XlsFormatError, iter_xls_sheets
+    try:
+        yield from iter_xls_sheets(source, max_rows, max_bytes or MAX_BYTES)
+    except XlsFormatError:
+        # Older BIFF is only covered by the header check
+        return
+
+
+def extensions_for(formats):
+    # formats are names like 'csv' or '.xlsx'; unknown names are rejected here
+    # rather than silently matching nothing
+    extensions = []
+    for name in formats:
+        extension = '.' + name.lower().lstrip('.')
+        if extension not in DETECTORS and extension != '.zip':
+            raise ValueError(f"unsupported format: {name}")
+        extensions.append(extension)
+    return tuple(extensions)
+
+
+def find_header(name, source, matcher=DEFAULT_MATCHER):
+    # source is either the file path or an open binary stream of the file.
+    # Returns a HeaderMatch, or None when no detector handles the extension.
+    detect = DETECTORS.get(os.path.splitext(name)[1].lower())
+    if detect is None:
+        return None
+    return detect(source, matcher)
+
+
+def sample_sheets(name, source, max_rows, max_bytes=None, dialect=None):
+    sample = SAMPLERS.get(os.path.splitext(name)[1].lower())
+    if sample is None:
+        return iter(())
+    return sample(source, max_rows, max_bytes, dialect)
+
+
+def has_required_columns(name, source, matcher=DEFAULT_MATCHER):
+    match = find_header(name, source, matcher)
+    return match is not None and match.matched
@@ -0,0 +1,103 @@
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import time
+from .manifest import COLUMN_NAMES, EXTENSIONS, MANIFEST_FOLDER, manifest_format, read_manifest
+
+# Merges every host's per-run manifests from <share>/manifests into one SQLite
+# database that the review team can query without listing the share. Manifests
+# already merged are remembered by name, so a merge only reads new ones.
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS hits (
+    run_started TEXT,
+    hostname TEXT NOT NULL,
+    username TEXT,
+    path TEXT NOT NULL,
+    size INTEGER,
+    created REAL,
+    modified REAL,
+    accessed REAL,
+    hash_name TEXT,
+    hash TEXT,
+    object TEXT,
+    uploaded INTEGER,
+    verdict TEXT,
+    member TEXT,
+    sheet TEXT,
+    row INTEGER,
+    confidence REAL,
+    manifest TEXT NOT NULL,
+    PRIMARY KEY (hostname, path, hash)
+);
+CREATE INDEX IF NOT EXISTS hits_hash ON hits (hash);
+CREATE INDEX IF NOT EXISTS hits_username ON hits (username);
+CREATE INDEX IF NOT EXISTS hits_modified ON hits (modified);
+CREATE TABLE IF NOT EXISTS manifests (
+    name TEXT PRIMARY KEY,
+    rows INTEGER NOT NULL,
+    merged REAL NOT NULL
+);
+'''
+
+# <host>-<YYYYmmddTHHMMSS>[-<n>].<extension>, see ManifestWriter.close
+MANIFEST_NAME = re.compile(r'(?P<host>.*)-(?P<stamp>\d{8}T\d{6})(?:-(?P<number>\d+))?')
+
+INSERT = (
+    f"INSERT OR REPLACE INTO hits ({', '.join(COLUMN_NAMES)}, manifest) "
+    f"VALUES ({', '.join('?' * (len(COLUMN_NAMES) + 1))})"
+)
+
+
+def _merge_order(name):
+    # (host, start, number): host-STAMP-1 was written after host-STAMP, and
+    # host-STAMP-10 after host-STAMP-9, which plain name order gets wrong
+    base = name[:-len(EXTENSIONS[manifest_format(name)])]
+    match = MANIFEST_NAME.fullmatch(base)
+    if not match:
+        return base, '', 0
+    return match['host'], match['stamp'], int(match['number'] or 0)
+
+
+def merge_manifests(share_root, database_path):
+    # Returns (manifests merged, rows merged). Manifests are merged by host,
+    # then start time, then resume number, so a later run's row for the same
+    # file wins.
+    folder = os.path.join(share_root, MANIFEST_FOLDER)
+    db = sqlite3.connect(database_path)
+    try:
+        db.executescript(SCHEMA)
+        merged = {name for (name,) in db.execute('SELECT name FROM manifests')}
+        names = sorted(
+            (name for name in os.listdir(folder) if manifest_format(name) and name not in merged),
+            key=_merge_order,
+        )
+        total = 0
+        for name in names:
+            rows = [
+                tuple(row.get(column) for column in COLUMN_NAMES) + (name,)
+                for row in read_manifest(os.path.join(folder, name))
+            ]
+            with db:
+                db.executemany(INSERT, rows)
+                db.execute('INSERT INTO manifests (name, rows, merged) VALUES (?, ?, ?)', (name, len(rows), time.time()))
+            total += len(rows)
+    finally:
+        db.close()
+    return len(names), total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='globalfinder.fleet', description='Merge per-host manifests into SQLite')
+    parser.add_argument('share', help='share root holding the manifests folder')
+    parser.add_argument('--database', default='fleet.sqlite3', help='SQLite database to create or update')
+    args = parser.parse_args(argv)
+    manifests, rows = merge_manifests(args.share, args.database)
+    print(f"Merged {rows} rows from {manifests} new manifests into {args.database}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
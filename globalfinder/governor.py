@@ -0,0 +1,298 @@
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from .config import data_path, prepare_data_path
+from .telemetry import log, telemetry
+
+DEFAULT_CHECKPOINT_PATH = data_path('scan_checkpoint.json')
+
+# What --governed means when no budget is given
+GOVERNED_CPU_PERCENT = 25.0
+GOVERNED_READ_MB_PER_SEC = 20.0
+# Consumption is sampled at most this often; between samples pacing is a clock read
+SAMPLE_SECONDS = 0.05
+# The budget is enforced over windows of this length, so a burst is paid back
+# within a second or two instead of being averaged into the whole run
+WINDOW_SECONDS = 2.0
+# A checkpoint older than this belongs to a sweep that was abandoned
+CHECKPOINT_MAX_AGE_SECONDS = 7 * 24 * 3600
+
+NICENESS = 10
+# Linux ioprio_set(IOPRIO_WHO_PROCESS, 0, best-effort class, lowest level)
+IOPRIO_SET = {'x86_64': 251, 'aarch64': 30, 'i686': 289, 'i386': 289}
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_BEST_EFFORT_LOWEST = (2 << 13) | 7
+PROCESS_MODE_BACKGROUND_BEGIN = 0x00100000
+
+
+def lower_priority():
+    # Lowers CPU and I/O priority for the calling thread and every thread it
+    # starts afterwards, so it has to run before the pipeline starts. Returns
+    # what was changed; a platform that refuses is logged and scanned anyway.
+    changed = []
+    if sys.platform == 'win32':
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        # Background mode lowers CPU, I/O and memory priority in one call
+        if kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), PROCESS_MODE_BACKGROUND_BEGIN):
+            changed.append('background mode')
+        return changed
+
+    try:
+        current = os.nice(0)
+        if current < NICENESS:
+            os.nice(NICENESS - current)
+        changed.append(f"nice {max(current, NICENESS)}")
+    except OSError as e:
+        log.warning('Could not lower CPU priority: %s', e)
+
+    if sys.platform.startswith('linux'):
+        import ctypes
+        import platform
+        number = IOPRIO_SET.get(platform.machine())
+        if number is not None:
+            libc = ctypes.CDLL(None, use_errno=True)
+            if libc.syscall(number, IOPRIO_WHO_PROCESS, 0, IOPRIO_BEST_EFFORT_LOWEST) == 0:
+                changed.append('best-effort I/O, lowest level')
+            else:
+                log.warning('Could not lower I/O priority: %s', os.strerror(ctypes.get_errno()))
+    return changed
+
+
+def _read_bytes_linux():
+    # rchar counts every byte read through a system call, page cache hits included
+    with open('/proc/self/io', 'rb') as f:
+        for line in f:
+            if line.startswith(b'rchar:'):
+                return int(line.split()[1])
+    return 0
+
+
+def _windows_read_bytes():
+    # Returns a function reading the process's ReadTransferCount
+    import ctypes
+    from ctypes import wintypes
+
+    class IO_COUNTERS(ctypes.Structure):
+        _fields_ = [(name, ctypes.c_ulonglong) for name in (
+            'ReadOperationCount', 'WriteOperationCount', 'OtherOperationCount',
+            'ReadTransferCount', 'WriteTransferCount', 'OtherTransferCount',
+        )]
+
+    kernel32 = ctypes.windll.kernel32
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    process = kernel32.GetCurrentProcess()
+
+    def read_bytes():
+        counters = IO_COUNTERS()
+        kernel32.GetProcessIoCounters(process, ctypes.byref(counters))
+        return counters.ReadTransferCount
+    return read_bytes
+
+
+def _read_bytes_telemetry():
+    # Elsewhere, what the scan itself counted: sniffed and hashed bytes
+    counters = telemetry.counters
+    return sum(value for name, value in list(counters.items())
+               if name.startswith('bytes.sniffed.') or name == 'bytes.hashed')
+
+
+def read_bytes_counter():
+    if sys.platform == 'win32':
+        return _windows_read_bytes()
+    if os.path.exists('/proc/self/io'):
+        return _read_bytes_linux
+    return _read_bytes_telemetry
+
+
+class ScanWindow:
+    # The hours the scan may run in, 'HH:MM-HH:MM' in local time; a window that
+    # ends before it starts runs past midnight
+
+    def __init__(self, spec):
+        start, _, end = spec.partition('-')
+        self.spec = spec
+        self.start = self._minutes(start)
+        self.end = self._minutes(end)
+
+    @staticmethod
+    def _minutes(value):
+        hours, _, minutes = value.strip().partition(':')
+        hours, minutes = int(hours), int(minutes or 0)
+        if not (0 <= hours < 24 and 0 <= minutes < 60):
+            raise ValueError(f"not a time of day: {value}")
+        return hours * 60 + minutes
+
+    def open(self, now=None):
+        now = datetime.now() if now is None else now
+        minute = now.hour * 60 + now.minute
+        if self.start <= self.end:
+            return self.start <= minute < self.end
+        return minute >= self.start or minute < self.end
+
+
+class Governor:
+    # Keeps the scan under a CPU and a read budget by making the scan threads
+    # sleep between files. Consumption is this process's CPU time and reads,
+    # so hashing and uploads count against the budget even though only the
+    # scan loop pauses (the pipeline's bounded queues carry the pause to the
+    # rest), plus what sniff worker processes report through charge(): their
+    # CPU time and the bytes they read classifying each file. max_cpu_percent
+    # is a share of one core. With a window, the scan is told to stop once the
+    # window closes.
+
+    def __init__(self, max_cpu_percent=None, max_read_bytes_per_second=None, window=None,
+                 sample_seconds=SAMPLE_SECONDS, window_seconds=WINDOW_SECONDS, read_bytes=None):
+        self.cpu_budget = max_cpu_percent / 100 if max_cpu_percent else None
+        self.read_budget = max_read_bytes_per_second or None
+        self.window = window
+        self.sample_seconds = sample_seconds
+        self.window_seconds = window_seconds
+        self._read_bytes = read_bytes_counter() if read_bytes is None else read_bytes
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._resume_at = 0.0
+        self._sampled = 0.0
+        self._child_cpu = 0.0
+        self._child_read = 0
+        self._start_window(time.monotonic())
+
+    def charge(self, cpu_seconds, read_bytes):
+        # Use by another process on the scan's behalf
+        with self._lock:
+            self._child_cpu += cpu_seconds
+            self._child_read += read_bytes
+
+    def _cpu(self):
+        return time.process_time() + self._child_cpu
+
+    def _reads(self):
+        # The telemetry fallback already sees the workers' bytes, merged into its counters
+        if self._read_bytes is _read_bytes_telemetry:
+            return self._read_bytes()
+        return self._read_bytes() + self._child_read
+
+    def _start_window(self, now):
+        self._window_start = now
+        self._cpu_start = self._cpu()
+        self._read_start = self._reads() if self.read_budget else 0
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    def stop(self):
+        self._stop.set()
+
+    def _sample(self, now):
+        # Returns how long consumption since the window started is ahead of the budget
+        elapsed = now - self._window_start
+        ahead = 0.0
+        if self.cpu_budget:
+            ahead = max(ahead, (self._cpu() - self._cpu_start) / self.cpu_budget - elapsed)
+        if self.read_budget:
+            ahead = max(ahead, (self._reads() - self._read_start) / self.read_budget - elapsed)
+        return ahead
+
+    def pace(self):
+        # Called by the scan threads between files. Returns False once the scan
+        # should stop: the window closed or stop() was called.
+        now = time.monotonic()
+        if now - self._sampled >= self.sample_seconds:
+            with self._lock:
+                if now - self._sampled >= self.sample_seconds:
+                    self._sampled = now
+                    if self.window is not None and not self.window.open():
+                        if not self._stop.is_set():
+                            log.info('Scan window %s closed, stopping', self.window.spec)
+                        self._stop.set()
+                    ahead = self._sample(now)
+                    if ahead > 0:
+                        self._resume_at = max(self._resume_at, now + ahead)
+                    if now - self._window_start >= self.window_seconds:
+                        # The pause still owed belongs to the window it was earned in
+                        self._start_window(max(now, self._resume_at))
+        wait = self._resume_at - now
+        if wait > 0:
+            telemetry.count('governor.pauses')
+            telemetry.observe('seconds.throttled', wait)
+            time.sleep(wait)
+        return not self._stop.is_set()
+
+
+class ScanCheckpoint:
+    # The jobs, (user, directory) pairs, a sweep has finished, so a run that was
+    # stopped by its window, or never finished because the machine went down,
+    # carries on with the rest instead of walking everything again. The file is
+    # removed when a sweep completes. A checkpoint from another configuration or
+    # older than max_age is ignored.
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_PATH, key=None, max_age=CHECKPOINT_MAX_AGE_SECONDS):
+        self.path = path
+        self.key = key
+        self.max_age = max_age
+        self.started = time.time()
+        self.done = set()
+        self._lock = threading.Lock()
+        prepare_data_path(path)
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        if saved.get('key') != self.key or time.time() - saved.get('started', 0) > self.max_age:
+            log.info('Ignoring the scan checkpoint in %s, it belongs to another sweep', self.path)
+            return
+        self.started = saved['started']
+        self.done = {tuple(job) for job in saved.get('done', [])}
+
+    def remaining(self, jobs):
+        return [job for job in jobs if tuple(job) not in self.done]
+
+    def job_done(self, job):
+        with self._lock:
+            self.done.add(tuple(job))
+
+    def save(self):
+        # Written under a temporary name first, so a crash mid-write leaves the old one
+        with self._lock:
+            saved = {'key': self.key, 'started': self.started, 'done': sorted(self.done)}
+        prepare_data_path(self.path)
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(saved, f)
+        os.replace(self.path + '.tmp', self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def add_governor_arguments(parser):
+    parser.add_argument('--governed', action='store_true',
+                        help='background mode: lower CPU and I/O priority and scan within a CPU and read budget')
+    parser.add_argument('--max-cpu-percent', type=float, default=None,
+                        help=f"CPU budget as a share of one core (governed default {GOVERNED_CPU_PERCENT:g})")
+    parser.add_argument('--max-read-mb-per-sec', type=float, default=None,
+                        help=f"read budget in megabytes per second (governed default {GOVERNED_READ_MB_PER_SEC:g})")
+    parser.add_argument('--scan-window', type=ScanWindow, default=None, metavar='HH:MM-HH:MM',
+                        help='only scan between these local times; a run stopped by the window resumes next time')
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT_PATH,
+                        help='progress of an unfinished sweep, used to resume it')
+
+
+def governor_from_arguments(args):
+    # None when nothing is to be governed; budgets given explicitly apply
+    # without --governed as well
+    cpu, read = args.max_cpu_percent, args.max_read_mb_per_sec
+    if args.governed:
+        cpu = GOVERNED_CPU_PERCENT if cpu is None else cpu
+        read = GOVERNED_READ_MB_PER_SEC if read is None else read
+    if not cpu and not read and args.scan_window is None:
+        return None
+    return Governor(cpu, read * 1024 * 1024 if read else None, args.scan_window)
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from .columns import Hit, Miss, SniffBudgetExceeded
+from .config import data_path, prepare_data_path
+from .telemetry import telemetry
+
+DEFAULT_INDEX_PATH = data_path('scan_index.sqlite3')
+
+# Entries not seen for this many runs belong to folders that are no longer scanned
+STALE_AFTER_RUNS = 8
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    matched INTEGER NOT NULL,
+    missing TEXT,
+    error TEXT,
+    config TEXT,
+    uploaded INTEGER NOT NULL DEFAULT 0,
+    last_run INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL NOT NULL,
+    finished REAL
+);
+'''
+# Columns added since the first release, with their types, for indexes
+# created before them
+ADDED_COLUMNS = (('files', 'error', 'TEXT'), ('files', 'config', 'TEXT'))
+
+
+class ScanIndex:
+    # Remembers every classified file by (path, size, mtime, file id) so a repeat
+    # sweep only opens files that are new or changed. The table is loaded into
+    # memory when a run starts and written back in one transaction when it ends,
+    # which keeps per-file cost to a dict lookup on trees with 100k+ files.
+    # fingerprint stands for the classifier settings (see classifier_fingerprint);
+    # a file that did not match under other settings is classified again.
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, full_rescan=False, fingerprint=None):
+        prepare_data_path(path)
+        self.path = path
+        self.full_rescan = full_rescan
+        self.fingerprint = fingerprint
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._migrate()
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._seen = set()
+        # Found again unchanged, or kept, since the last write; their last_run moves up
+        self._touched = set()
+        self._changed = {}
+        self._uploaded = set()
+        self.run_id = None
+
+    def _migrate(self):
+        for table, column, kind in ADDED_COLUMNS:
+            if column not in {row[1] for row in self._db.execute(f"PRAGMA table_info({table})")}:
+                with self._db:
+                    self._db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+
+    def __enter__(self):
+        self.begin_run()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def begin_run(self):
+        with self._db:
+            self.run_id = self._db.execute('INSERT INTO runs (started) VALUES (?)', (time.time(),)).lastrowid
+        self._entries = {
+            row[0]: row[1:]
+            for row in self._db.execute((
+                'SELECT path, size, mtime_ns, file_id, matched, uploaded, error, config, last_run FROM files'
+            ))
+        }
+
+    def check(self, file_path, classify, file_stat=None):
+        # Returns a Hit when the file is a roster that still has to be uploaded,
+        # None otherwise. classify(file_path) is only called when the file is
+        # new, has changed or could not be read last time; a Miss it returns
+        # has its missing columns recorded. An error classify raises is
+        # recorded and raised again, and the file still counts as found.
+        # SniffBudgetExceeded leaves the entry as it was, so a later run
+        # looks at the file again.
+        if file_stat is None:
+            file_stat = os.stat(file_path)
+        key = (file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino)
+
+        entry = self._entries.get(file_path)
+        # The file id is only compared when both sides have one: a stat taken
+        # from a Windows directory listing reports 0
+        if (entry is not None and not self.full_rescan and entry[5] is None and entry[:2] == key[:2]
+                and (entry[2] == key[2] or not entry[2] or not key[2])
+                and (entry[3] or entry[6] == self.fingerprint)):
+            with self._lock:
+                self._seen.add(file_path)
+                self._touched.add(file_path)
+            telemetry.count('index.unchanged')
+            matched, uploaded = entry[3], entry[4]
+            return Hit(file_path, 'indexed') if matched and not uploaded else None
+
+        telemetry.count('index.classified')
+        try:
+            result = classify(file_path)
+        except SniffBudgetExceeded:
+            self.keep(file_path)
+            raise
+        except Exception as e:
+            with self._lock:
+                self._seen.add(file_path)
+                self._changed[file_path] = (*key, 0, None, f"{type(e).__name__}: {e}")
+            raise
+        missing = result.missing if isinstance(result, Miss) else None
+        with self._lock:
+            self._seen.add(file_path)
+            self._changed[file_path] = (*key, int(bool(result)), missing, None)
+        return result or None
+
+    def keep(self, file_path):
+        # For a file that was found but deliberately not classified this run:
+        # its entry stays as it is instead of being reported as deleted
+        with self._lock:
+            self._seen.add(file_path)
+            if file_path in self._entries:
+                self._touched.add(file_path)
+
+    def mark_uploaded(self, file_path):
+        with self._lock:
+            self._uploaded.add(file_path)
+
+    def _write(self):
+        # Caller holds the lock and a transaction
+        self._db.executemany(
+            'UPDATE files SET last_run = ? WHERE path = ?',
+            ((self.run_id, path) for path in self._touched if path not in self._changed),
+        )
+        self._db.executemany(
+            'INSERT OR REPLACE INTO files '
+            '(path, size, mtime_ns, file_id, matched, missing, error, config, uploaded, last_run) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, ?)',
+            (
+                (path, size, mtime_ns, file_id, matched, json.dumps(sorted(missing)) if missing else None, error,
+                 self.fingerprint, self.run_id)
+                for path, (size, mtime_ns, file_id, matched, missing, error) in self._changed.items()
+            ),
+        )
+        self._db.executemany('UPDATE files SET uploaded = 1 WHERE path = ?', ((path,) for path in self._uploaded))
+        self._changed.clear()
+        self._touched.clear()
+        self._uploaded.clear()
+
+    def flush(self):
+        # Writes what this run has classified, found unchanged and uploaded so far
+        # without ending it, so a run that is stopped or dies keeps that work and
+        # the files it found are not taken for stale by compact
+        with self._lock, self._db:
+            self._write()
+
+    def finish_run(self, roots, since=None):
+        # Writes this run back to disk and returns the indexed files under roots
+        # that were not found again, i.e. deleted or moved since the last sweep.
+        # since is when the sweep began: a sweep split over runs by a scan
+        # window passes every root, and a file an earlier of those runs found
+        # counts as found.
+        first_run = self._first_run(since)
+        prefixes = tuple(os.path.join(root, '') for root in roots)
+        deleted = [
+            path for path, entry in self._entries.items()
+            if path.startswith(prefixes) and path not in self._seen and entry[7] < first_run
+        ]
+
+        with self._lock, self._db:
+            self._write()
+            self._db.executemany('DELETE FROM files WHERE path = ?', ((path,) for path in deleted))
+            self._db.execute('UPDATE runs SET finished = ? WHERE id = ?', (time.time(), self.run_id))
+
+        self._seen.clear()
+        return deleted
+
+    def _first_run(self, since):
+        # The earliest run of the sweep that began at since, this one without it
+        if since is None:
+            return self.run_id
+        (first_run,) = self._db.execute('SELECT MIN(id) FROM runs WHERE started >= ?', (since,)).fetchone()
+        return min(first_run or self.run_id, self.run_id)
+
+    def compact(self, stale_after_runs=STALE_AFTER_RUNS, since=None):
+        # Evicts entries no run has found for stale_after_runs runs. With since,
+        # as for finish_run, nothing a run of the current sweep found is evicted
+        # however many windows the sweep took.
+        last_stale = min(self.run_id - stale_after_runs, self._first_run(since) - 1)
+        with self._db:
+            evicted = self._db.execute('DELETE FROM files WHERE last_run <= ?', (last_stale,)).rowcount
+            self._db.execute('DELETE FROM runs WHERE id <= ?', (last_stale,))
+        # Rewriting the file is only worth it once a sizeable share of it is dead space
+        if evicted and evicted * 3 >= len(self._entries):
+            self._db.execute('VACUUM')
+        return evicted
+
+    def close(self):
+        self._db.close()
+
+
+def classifier_fingerprint(**settings):
+    # A short digest of everything that decides whether a file is a roster:
+    # formats, required columns, content scoring, archive limits
+    encoded = json.dumps(settings, sort_keys=True, default=sorted).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def add_index_arguments(parser):
+    parser.add_argument('--index', default=DEFAULT_INDEX_PATH,
+                        help='local scan index used to skip unchanged files')
+    parser.add_argument('--full-rescan', action='store_true',
+                        help='re-classify every file even if the index says it is unchanged')
@@ -0,0 +1,155 @@
+import csv
+import gzip
+import importlib.util
+import json
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from .telemetry import telemetry
+
+# One row per hit. Times are epoch seconds as stat returned them; formatting is
+# left to whoever reads the manifest.
+COLUMNS = (
+    ('run_started', str),
+    ('hostname', str),
+    ('username', str),
+    ('path', str),
+    ('size', int),
+    ('created', float),
+    ('modified', float),
+    ('accessed', float),
+    ('hash_name', str),
+    ('hash', str),
+    ('object', str),
+    ('uploaded', bool),
+    ('verdict', str),
+    ('member', str),
+    ('sheet', str),
+    ('row', int),
+    ('confidence', float),
+)
+COLUMN_NAMES = tuple(name for name, _ in COLUMNS)
+
+MANIFEST_FOLDER = 'manifests'
+FORMATS = ('auto', 'parquet', 'jsonl', 'csv')
+EXTENSIONS = {'parquet': '.parquet', 'jsonl': '.jsonl.gz', 'csv': '.csv.gz'}
+
+
+def parquet_available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def manifest_format(path):
+    for fmt, extension in EXTENSIONS.items():
+        if path.endswith(extension):
+            return fmt
+    return None
+
+
+def _write_jsonl(path, rows):
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(row, separators=(',', ':')) + '\n')
+
+
+def _write_csv(path, rows):
+    with gzip.open(path, 'wt', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, COLUMN_NAMES)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _write_parquet(path, rows):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    types = {str: pa.string(), int: pa.int64(), float: pa.float64(), bool: pa.bool_()}
+    schema = pa.schema([(name, types[kind]) for name, kind in COLUMNS])
+    pq.write_table(pa.Table.from_pylist(rows, schema=schema), path, compression='zstd')
+
+
+WRITERS = {'parquet': _write_parquet, 'jsonl': _write_jsonl, 'csv': _write_csv}
+
+
+class ManifestWriter:
+    # Collects one row per hit during a run and writes them all as one file,
+    # <share>/manifests/<host>-<start>.<format>, when the run is closed. A host
+    # therefore adds a single file to the share per run, however many hits it
+    # has. Parquet needs pyarrow; without it 'auto' falls back to gzipped JSONL.
+
+    def __init__(self, share_root, hostname=None, fmt='auto', started=None):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown manifest format: {fmt}")
+        if fmt == 'auto':
+            fmt = 'parquet' if parquet_available() else 'jsonl'
+        self.folder = os.path.join(share_root, MANIFEST_FOLDER)
+        self.hostname = hostname or socket.gethostname()
+        self.format = fmt
+        self.started = time.time() if started is None else started
+        self.run_started = datetime.fromtimestamp(self.started).isoformat(timespec='seconds')
+        self.rows = []
+        self._lock = threading.Lock()
+
+    def add(self, row):
+        row = {name: row.get(name) for name in COLUMN_NAMES}
+        row['run_started'] = self.run_started
+        row['hostname'] = row['hostname'] or self.hostname
+        with self._lock:
+            self.rows.append(row)
+
+    def close(self):
+        # Returns the manifest's path. It is written under a temporary name
+        # first, so the merge never picks up half a file. A run resumed within
+        # the same second as the one it continues gets a numbered name.
+        stamp = datetime.fromtimestamp(self.started).strftime('%Y%m%dT%H%M%S')
+        base = os.path.join(self.folder, f"{self.hostname}-{stamp}")
+        path = base + EXTENSIONS[self.format]
+        os.makedirs(self.folder, exist_ok=True)
+        number = 1
+        while os.path.exists(path):
+            path = f"{base}-{number}{EXTENSIONS[self.format]}"
+            number += 1
+        with self._lock, telemetry.timer('seconds.manifest'):
+            WRITERS[self.format](path + '.part', self.rows)
+            os.replace(path + '.part', path)
+        telemetry.count('manifest.rows', len(self.rows))
+        return path
+
+
+def _typed(row):
+    # CSV hands back text; empty cells were None when written
+    typed = {}
+    for name, kind in COLUMNS:
+        value = row.get(name)
+        if value == '' or value is None:
+            typed[name] = None
+        elif kind is bool:
+            typed[name] = value if isinstance(value, bool) else value == 'True'
+        else:
+            typed[name] = kind(value)
+    return typed
+
+
+def read_manifest(path):
+    # Yields the rows of a manifest in any of the formats as dicts
+    fmt = manifest_format(path)
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        yield from pq.read_table(path).to_pylist()
+    elif fmt == 'jsonl':
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif fmt == 'csv':
+        with gzip.open(path, 'rt', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                yield _typed(row)
+    else:
+        raise ValueError(f"Not a manifest: {path}")
+
+
+def add_manifest_arguments(parser):
+    parser.add_argument('--manifest-format', choices=FORMATS, default='auto',
+                        help='format of the per-run manifest; auto is parquet when pyarrow is installed, else jsonl')
@@ -0,0 +1,223 @@
+import itertools
+import json
+import ntpath
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from .manifest import manifest_format, read_manifest
+from .store import HASH_NAME, hash_file
+
+CHUNK_SIZE = 500
+MAX_WORKERS = 16
+
+DELETED = 'deleted'
+MISSING = 'missing'
+CHANGED = 'changed'
+FAILED = 'failed'
+
+# size and sha256 are optional; when present the file is only deleted if it still matches
+PurgeItem = namedtuple('PurgeItem', 'host path size sha256', defaults=(None, None))
+PurgeResult = namedtuple('PurgeResult', 'host path status detail')
+
+
+def _split_drive(path):
+    # 'D:\Users\x\file.csv' -> ('D', 'Users\x\file.csv'), addressed through the D$
+    # share. A path without a drive letter (relative, UNC) has no share to go
+    # through and is refused rather than guessed at.
+    drive, rest = ntpath.splitdrive(path.replace('/', '\\'))
+    if len(drive) != 2 or not drive[0].isalpha():
+        raise ValueError(f"no drive letter in {path!r}")
+    return drive[0].upper(), rest.lstrip('\\')
+
+
+RESOURCETYPE_DISK = 1
+CONNECT_TEMPORARY = 4
+
+
+def _add_connection(remote, username, password):
+    # WNetAddConnection2W, the call behind `net use`: the password is handed
+    # over in memory and never appears on a command line
+    import ctypes
+    from ctypes import wintypes
+
+    class NETRESOURCE(ctypes.Structure):
+        _fields_ = [
+            ('dwScope', wintypes.DWORD),
+            ('dwType', wintypes.DWORD),
+            ('dwDisplayType', wintypes.DWORD),
+            ('dwUsage', wintypes.DWORD),
+            ('lpLocalName', wintypes.LPWSTR),
+            ('lpRemoteName', wintypes.LPWSTR),
+            ('lpComment', wintypes.LPWSTR),
+            ('lpProvider', wintypes.LPWSTR),
+        ]
+
+    resource = NETRESOURCE(dwType=RESOURCETYPE_DISK, lpRemoteName=remote)
+    error = ctypes.WinDLL('mpr').WNetAddConnection2W(ctypes.byref(resource), password, username, CONNECT_TEMPORARY)
+    if error:
+        raise ctypes.WinError(error)
+
+
+def _cancel_connection(remote):
+    import ctypes
+    ctypes.WinDLL('mpr').WNetCancelConnection2W(remote, 0, True)
+
+
+class UncTransport:
+    # Deletes through the administrative share of each file's own drive,
+    # \\<host>\<drive>$, connecting with the given credentials first. Shares
+    # connect independently: a host that does not answer only holds up the
+    # chunks addressed to it.
+
+    def __init__(self, username=None, password=None, add_connection=_add_connection,
+                 cancel_connection=_cancel_connection):
+        self.username = username
+        self.password = password
+        self.add_connection = add_connection
+        self.cancel_connection = cancel_connection
+        self._connected = set()
+        self._connecting = {}
+        self._lock = threading.Lock()
+
+    def _share(self, host, drive):
+        return f"\\\\{host}\\{drive}$"
+
+    def connect(self, host, drive='C'):
+        if not self.username:
+            return
+        share = (host, drive)
+        with self._lock:
+            if share in self._connected:
+                return
+            share_lock = self._connecting.setdefault(share, threading.Lock())
+        # Only chunks for the same share wait here, and only the first connects
+        with share_lock:
+            with self._lock:
+                if share in self._connected:
+                    return
+            self.add_connection(self._share(host, drive), self.username, self.password)
+            with self._lock:
+                self._connected.add(share)
+
+    def resolve(self, host, path):
+        drive, relative = _split_drive(path)
+        return f"{self._share(host, drive)}\\{relative}"
+
+    def close(self):
+        with self._lock:
+            connected = list(self._connected)
+            self._connected.clear()
+            self._connecting.clear()
+        for host, drive in connected:
+            self.cancel_connection(self._share(host, drive))
+
+
+class LocalTransport:
+    # Maps \\<host>\<drive>$\<path> to <root>/<host>/<drive>$/<path> for tests and benchmarks
+
+    def __init__(self, root):
+        self.root = root
+
+    def connect(self, host, drive='C'):
+        pass
+
+    def resolve(self, host, path):
+        drive, relative = _split_drive(path)
+        return os.path.join(self.root, host, f"{drive}$", *relative.split('\\'))
+
+    def close(self):
+        pass
+
+
+def _purge_one(transport, item, verify_hash):
+    target = transport.resolve(item.host, item.path)
+    try:
+        if item.size is not None and os.path.getsize(target) != item.size:
+            return PurgeResult(item.host, item.path, CHANGED, 'size differs from the reviewed copy')
+        if verify_hash and item.sha256 and hash_file(target, HASH_NAME)[0] != item.sha256:
+            return PurgeResult(item.host, item.path, CHANGED, 'hash differs from the reviewed copy')
+        os.remove(target)
+    except FileNotFoundError:
+        return PurgeResult(item.host, item.path, MISSING, None)
+    except OSError as e:
+        return PurgeResult(item.host, item.path, FAILED, str(e))
+    return PurgeResult(item.host, item.path, DELETED, None)
+
+
+def _purge_chunk(transport, host, chunk, verify_hash):
+    # Connects to each drive's share the first time a file on it comes up;
+    # a share that refuses only fails the files on that drive
+    refused = {}
+    results = []
+    for item in chunk:
+        try:
+            drive = _split_drive(item.path)[0]
+        except ValueError as e:
+            results.append(PurgeResult(item.host, item.path, FAILED, str(e)))
+            continue
+        if drive not in refused:
+            try:
+                transport.connect(host, drive)
+                refused[drive] = None
+            except Exception as e:
+                refused[drive] = f"cannot connect: {e}"
+        if refused[drive]:
+            results.append(PurgeResult(item.host, item.path, FAILED, refused[drive]))
+        else:
+            results.append(_purge_one(transport, item, verify_hash))
+    return results
+
+
+def purge(items, transport, max_workers=MAX_WORKERS, chunk_size=CHUNK_SIZE, verify_hash=False):
+    # Deletes every (host, path) in items and returns one PurgeResult per item.
+    # Each host's list is cut into chunks and the chunks of all hosts are
+    # interleaved, so a bounded pool keeps many hosts busy at once.
+    by_host = {}
+    for item in items:
+        item = PurgeItem(*item)
+        by_host.setdefault(item.host, []).append(item)
+
+    chunks = [
+        [(host, files[start:start + chunk_size]) for start in range(0, len(files), chunk_size)]
+        for host, files in by_host.items()
+    ]
+    interleaved = [chunk for round_ in itertools.zip_longest(*chunks) for chunk in round_ if chunk]
+
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers) as executor:
+            futures = [
+                executor.submit(_purge_chunk, transport, host, chunk, verify_hash)
+                for host, chunk in interleaved
+            ]
+            for future in futures:
+                results.extend(future.result())
+    finally:
+        transport.close()
+    return results
+
+
+def load_manifest(manifest_path):
+    # Reads a run manifest written by globalfinder.manifest, or an older
+    # per-user manifest.jsonl, into PurgeItems
+    if manifest_format(manifest_path):
+        return [
+            PurgeItem(row['hostname'], row['path'], row['size'], row['hash'] if row['hash_name'] == HASH_NAME else None)
+            for row in read_manifest(manifest_path)
+        ]
+    items = []
+    with open(manifest_path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                items.append(PurgeItem(entry['hostname'], entry['path'], entry.get('size'), entry.get('sha256')))
+    return items
+
+
+def purge_files(ip, files_to_purge, username, password):
+    results = purge([(ip, file_path) for file_path in files_to_purge], UncTransport(username, password))
+    failed = [result for result in results if result.status in (FAILED, CHANGED)]
+    for result in failed:
+        print(f"Error purging {result.path} on {ip}: {result.detail}")
+    return 1 if failed else 0
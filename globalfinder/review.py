@@ -0,0 +1,460 @@
+import argparse
+import csv
+import gzip
+import ntpath
+import os
+import re
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from .archive import ArchiveScanner
+from .columns import DEFAULT_MATCHER, normalize_column
+from .content import CONFIDENCE_THRESHOLD, EMAIL, EMPLOYEE_ID, ContentClassifier
+from .detectors import find_header, sample_sheets
+from .manifest import MANIFEST_FOLDER, manifest_format, parquet_available, read_manifest
+from .store import hash_file, object_name
+from .telemetry import add_telemetry_arguments, configure_logging, log
+
+# Server-side review of everything the endpoints copied to the share. Rosters
+# are read in full by a process pool, with the header and content classifiers
+# the scan uses, and their rows go into one SQLite store with one row per
+# distinct employee, so the exposure per host is a query rather than a
+# fortnight of opening spreadsheets. Two layouts are read: the <host>.<user>
+# folders the old scripts copied into, and the manifests and content-addressed
+# objects of the current client. A body is extracted once however many hosts
+# hold it, and a run only reads host folders and manifests it has not
+# reviewed before.
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS sources (
+    name TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    mtime_ns INTEGER,
+    files INTEGER NOT NULL,
+    reviewed REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS copies (
+    source TEXT NOT NULL,
+    hostname TEXT NOT NULL,
+    username TEXT,
+    path TEXT NOT NULL,
+    file TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (source, path, digest)
+);
+CREATE INDEX IF NOT EXISTS copies_digest ON copies (digest);
+CREATE INDEX IF NOT EXISTS copies_hostname ON copies (hostname);
+CREATE TABLE IF NOT EXISTS bodies (
+    digest TEXT PRIMARY KEY,
+    verdict TEXT,
+    member TEXT,
+    sheet TEXT,
+    records INTEGER NOT NULL,
+    error TEXT,
+    extracted REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS employees (
+    key TEXT PRIMARY KEY,
+    employee_number TEXT,
+    employee_name TEXT,
+    email_address TEXT,
+    current_hire_date TEXT,
+    work_country TEXT,
+    business_title TEXT,
+    business_group TEXT
+);
+CREATE TABLE IF NOT EXISTS exposures (
+    digest TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (digest, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS exposures_key ON exposures (key);
+'''
+
+# The roster columns kept per employee, in the order of the employees table
+RECORD_COLUMNS = (
+    'Employee Number',
+    'Employee Name',
+    'Email Address',
+    'Current Hire Date',
+    'Work Country',
+    'Business Title',
+    'Business Group',
+)
+FIELD_NAMES = tuple(normalize_column(column).replace(' ', '_') for column in RECORD_COLUMNS)
+_RECORD_KEYS = {normalize_column(column): column for column in RECORD_COLUMNS}
+
+# A first seen value is kept; a later file only fills columns still empty
+UPSERT_EMPLOYEE = (
+    f"INSERT INTO employees (key, {', '.join(FIELD_NAMES)}) VALUES ({', '.join('?' * (len(FIELD_NAMES) + 1))}) "
+    f"ON CONFLICT (key) DO UPDATE SET "
+    + ', '.join(f"{name} = COALESCE({name}, excluded.{name})" for name in FIELD_NAMES)
+)
+
+# Rows read from one sheet and bytes from one file; Excel's own row limit, and
+# far more than any roster on the share
+MAX_ROWS = 1048576
+MAX_BYTES = 1024 * 1024 * 1024
+# Bodies written per transaction
+BATCH = 200
+# What the old scripts wrote next to every copy, and share folders that are not a host's
+INFO_SUFFIX = '_info.txt'
+SHARE_FOLDERS = (MANIFEST_FOLDER, object_name('').split('/')[0])
+EXPORT_TABLES = ('employees', 'exposures', 'copies', 'bodies')
+
+# Bodies listed on the share that have not been extracted, or failed last time
+PENDING = '''
+SELECT c.digest, MIN(c.file), MIN(c.path) FROM copies c LEFT JOIN bodies b ON b.digest = c.digest
+WHERE b.digest IS NULL OR b.error IS NOT NULL GROUP BY c.digest
+'''
+# Distinct (host, body) pairs first, so a body copied to many profiles of one
+# host is joined with its employees once
+HOST_STATS = '''
+WITH host_bodies AS (SELECT DISTINCT hostname, digest FROM copies),
+exposed AS (
+    SELECT h.hostname, COUNT(DISTINCT e.key) AS employees
+    FROM host_bodies h JOIN exposures e ON e.digest = h.digest GROUP BY h.hostname
+)
+SELECT c.hostname, COUNT(DISTINCT c.username), COUNT(DISTINCT c.path),
+       COUNT(DISTINCT CASE WHEN b.records > 0 THEN c.digest END), COALESCE(MAX(x.employees), 0)
+FROM copies c LEFT JOIN bodies b ON b.digest = c.digest LEFT JOIN exposed x ON x.hostname = c.hostname
+GROUP BY c.hostname ORDER BY 5 DESC, 1
+'''
+MOST_EXPOSED = '''
+WITH host_bodies AS (SELECT DISTINCT hostname, digest FROM copies)
+SELECT e.key, m.employee_name, COUNT(DISTINCT h.hostname), COUNT(DISTINCT e.digest)
+FROM exposures e JOIN host_bodies h ON h.digest = e.digest JOIN employees m ON m.key = e.key
+GROUP BY e.key ORDER BY 3 DESC, 4 DESC, 1 LIMIT ?
+'''
+
+_employee_id = re.compile(EMPLOYEE_ID)
+_email = re.compile(EMAIL)
+
+# One hit on the share. source is the host folder or manifest it was listed
+# in, path where the endpoint had it and file where its body is on the share.
+Copy = namedtuple('Copy', 'source hostname username path file digest')
+ReviewResult = namedtuple('ReviewResult', 'sources copies unreadable bodies records errors')
+HostStats = namedtuple('HostStats', 'hostname users files rosters employees')
+Spread = namedtuple('Spread', 'key name hosts files')
+
+
+def employee_key(number, email):
+    # Rows are the same employee when their employee numbers are, or, without
+    # a usable number, their email addresses
+    if number and _employee_id.fullmatch(number):
+        return 'id:' + number.upper()
+    if email and _email.fullmatch(email):
+        return 'email:' + email.casefold()
+    return None
+
+
+def _record(values, mapping):
+    # (key, values in RECORD_COLUMNS order) for a data row, None for a row
+    # that names nobody: totals, blank lines, a repeated header
+    record = [None] * len(RECORD_COLUMNS)
+    for position, column in enumerate(RECORD_COLUMNS):
+        index = mapping.get(column)
+        if index is not None and index < len(values):
+            record[position] = str(values[index]).strip() or None
+    key = employee_key(record[0], record[2])
+    return None if key is None else (key, *record)
+
+
+def extract_records(name, source, content=None, matcher=DEFAULT_MATCHER):
+    # Returns (verdict, sheet, records) for a file or archive member that
+    # source holds open, seekable; verdict is None when it is not a roster.
+    # The header decides like it does in the scan; content, a
+    # ContentClassifier, is asked when it does not match.
+    match = find_header(name, source, matcher)
+    if match is None:
+        return None, None, []
+    dialect = None
+    if match.matched:
+        verdict, sheet, header_row, mapping, dialect = 'header', match.sheet, match.row, {}, match.dialect
+    else:
+        if content is None:
+            return None, None, []
+        source.seek(0)
+        found = content.classify(name, source)
+        if not found.matched:
+            return None, None, []
+        verdict, sheet, header_row, mapping = 'content', found.sheet, None, found.mapping
+
+    records = []
+    source.seek(0)
+    # Rows are split the way the header was; the content classifier's
+    # mapping was taken from a sample split the way this one is without it
+    for sheet_name, rows in sample_sheets(name, source, MAX_ROWS, MAX_BYTES, dialect):
+        if sheet_name != sheet:
+            continue
+        for row, values in rows:
+            if header_row is not None and row <= header_row:
+                if row == header_row:
+                    # Taken from the positional row, so the indices are the data's
+                    mapping = {
+                        _RECORD_KEYS[key]: index for index, key in enumerate(map(normalize_column, values))
+                        if key in _RECORD_KEYS
+                    }
+                continue
+            record = _record(values, mapping)
+            if record is not None:
+                records.append(record)
+        break
+    return verdict, sheet, records
+
+
+def extract_file(path, name, content=None):
+    # Returns (verdict, member, sheet, records); name carries the extension,
+    # which an object on the share does not have. An archive is read up to
+    # its first member holding a roster.
+    if name.lower().endswith('.zip'):
+        found = []
+
+        def classify_member(member_name, member):
+            verdict, sheet, records = extract_records(member_name, member, content)
+            if verdict is not None:
+                found.append((sheet, records))
+            return verdict is not None
+
+        with open(path, 'rb') as f:
+            member = ArchiveScanner(classify_member).scan(f)
+        if member is None:
+            return None, None, None, []
+        return 'archive', member, *found[-1]
+    with open(path, 'rb') as f:
+        verdict, sheet, records = extract_records(name, f, content)
+    return verdict, None, sheet, records
+
+
+# Set in each worker process by _start_worker, so the classifier is built once
+# per process rather than once per file
+_content = None
+
+
+def _start_worker(threshold):
+    global _content
+    _content = ContentClassifier(threshold) if threshold else None
+
+
+def _identify(path):
+    # Runs in a worker: (digest, where the endpoint had the file) for a file in
+    # a host folder, the location read from the info file copied next to it
+    try:
+        digest = hash_file(path)[0]
+    except OSError:
+        return None, None
+    try:
+        with open(path + INFO_SUFFIX, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if line.startswith('File location:'):
+                    return digest, line.partition(':')[2].strip()
+    except OSError:
+        pass
+    return digest, path
+
+
+def _extract(task):
+    # Runs in a worker: (digest, verdict, member, sheet, records, error)
+    digest, path, name = task
+    try:
+        return (digest, *extract_file(path, name, _content), None)
+    except Exception as e:
+        return digest, None, None, None, [], f"{type(e).__name__}: {e}"
+
+
+def _host_folders(share_root):
+    # The <host>.<user> folders the old scripts copied into
+    for entry in os.scandir(share_root):
+        if entry.is_dir() and entry.name not in SHARE_FOLDERS and '.' in entry.name:
+            yield entry
+
+
+def _folder_copies(entry):
+    # Without digests; those are taken in the pool
+    hostname, _, username = entry.name.partition('.')
+    copies = []
+    for root, _, files in os.walk(entry.path):
+        for file_name in files:
+            if not file_name.endswith(INFO_SUFFIX):
+                path = os.path.join(root, file_name)
+                copies.append(Copy(entry.name, hostname, username, path, path, None))
+    return copies
+
+
+def _manifest_copies(share_root, name):
+    copies = []
+    for row in read_manifest(os.path.join(share_root, MANIFEST_FOLDER, name)):
+        if row.get('hash'):
+            stored = row.get('object') or object_name(row['hash'])
+            copies.append(Copy(name, row['hostname'], row.get('username'), row['path'],
+                               os.path.join(share_root, *stored.split('/')), row['hash']))
+    return copies
+
+
+def _chunksize(tasks, workers):
+    # Big enough to keep the pool's pickling off the critical path, small
+    # enough that one slow workbook does not hold back a long tail
+    return max(1, min(64, len(tasks) // (workers * 8)))
+
+
+def review_share(share_root, database_path, workers=None, threshold=CONFIDENCE_THRESHOLD):
+    # Returns a ReviewResult. Host folders are read again when they changed
+    # since they were reviewed, manifests only once; bodies that could not be
+    # read are retried on the next run.
+    workers = workers or os.cpu_count() or 1
+    db = sqlite3.connect(database_path)
+    try:
+        db.executescript(SCHEMA)
+        reviewed = dict(db.execute('SELECT name, mtime_ns FROM sources'))
+        folders = [entry for entry in _host_folders(share_root)
+                   if reviewed.get(entry.name, -1) != entry.stat().st_mtime_ns]
+        manifest_folder = os.path.join(share_root, MANIFEST_FOLDER)
+        manifests = []
+        if os.path.isdir(manifest_folder):
+            manifests = sorted(name for name in os.listdir(manifest_folder)
+                               if manifest_format(name) and name not in reviewed)
+
+        with ProcessPoolExecutor(workers, initializer=_start_worker, initargs=(threshold,)) as pool:
+            listed = [copy for entry in folders for copy in _folder_copies(entry)]
+            identified = pool.map(_identify, [copy.file for copy in listed], chunksize=_chunksize(listed, workers))
+            copies = [copy._replace(digest=digest, path=path)
+                      for copy, (digest, path) in zip(listed, identified) if digest is not None]
+            unreadable = len(listed) - len(copies)
+            for name in manifests:
+                copies.extend(_manifest_copies(share_root, name))
+
+            now = time.time()
+            with db:
+                for entry in folders:
+                    db.execute('DELETE FROM copies WHERE source = ?', (entry.name,))
+                db.executemany('INSERT OR IGNORE INTO copies VALUES (?, ?, ?, ?, ?, ?)', copies)
+                per_source = {}
+                for copy in copies:
+                    per_source[copy.source] = per_source.get(copy.source, 0) + 1
+                db.executemany('INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?)', [
+                    (entry.name, 'folder', entry.stat().st_mtime_ns, per_source.get(entry.name, 0), now)
+                    for entry in folders
+                ] + [(name, 'manifest', None, per_source.get(name, 0), now) for name in manifests])
+
+            # One task per distinct body not extracted yet, whichever run listed it
+            tasks = [(digest, file, ntpath.basename(path)) for digest, file, path in db.execute(PENDING)]
+            bodies = records = errors = 0
+            batch = []
+            for result in pool.map(_extract, tasks, chunksize=_chunksize(tasks, workers)):
+                batch.append(result)
+                if len(batch) >= BATCH:
+                    records_written, errors_written = _write_bodies(db, batch)
+                    bodies, records, errors = bodies + len(batch), records + records_written, errors + errors_written
+                    batch = []
+            if batch:
+                records_written, errors_written = _write_bodies(db, batch)
+                bodies, records, errors = bodies + len(batch), records + records_written, errors + errors_written
+    finally:
+        db.close()
+    return ReviewResult(len(folders) + len(manifests), len(copies), unreadable, bodies, records, errors)
+
+
+def _write_bodies(db, results):
+    # Returns (records, errors) written
+    now = time.time()
+    records = errors = 0
+    with db:
+        for digest, verdict, member, sheet, rows, error in results:
+            if error is not None:
+                log.warning('Could not read body %s: %s', digest, error)
+                errors += 1
+            db.execute('INSERT OR REPLACE INTO bodies VALUES (?, ?, ?, ?, ?, ?, ?)',
+                       (digest, verdict, member, sheet, len(rows), error, now))
+            db.executemany(UPSERT_EMPLOYEE, rows)
+            db.executemany('INSERT OR IGNORE INTO exposures VALUES (?, ?)', ((digest, row[0]) for row in rows))
+            records += len(rows)
+    return records, errors
+
+
+def host_statistics(db):
+    # Per host: profiles, files, distinct roster bodies and distinct employees
+    # they expose, most exposed first
+    return [HostStats(*row) for row in db.execute(HOST_STATS)]
+
+
+def most_exposed(db, limit):
+    # Employees whose records sit on the most hosts
+    return [Spread(*row) for row in db.execute(MOST_EXPOSED, (limit,))]
+
+
+def export_store(database_path, folder, fmt='auto'):
+    # Writes every table as one columnar file: parquet with pyarrow, gzipped
+    # CSV without. Returns the paths written.
+    if fmt == 'auto':
+        fmt = 'parquet' if parquet_available() else 'csv'
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    db = sqlite3.connect(database_path)
+    try:
+        for table in EXPORT_TABLES:
+            cursor = db.execute(f"SELECT * FROM {table}")
+            names = [column[0] for column in cursor.description]
+            rows = cursor.fetchall()
+            if fmt == 'parquet':
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                path = os.path.join(folder, f"{table}.parquet")
+                columns = list(zip(*rows)) or [()] * len(names)
+                pq.write_table(pa.table(dict(zip(names, map(list, columns)))), path, compression='zstd')
+            else:
+                path = os.path.join(folder, f"{table}.csv.gz")
+                with gzip.open(path, 'wt', encoding='utf-8', newline='') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(names)
+                    writer.writerows(rows)
+            paths.append(path)
+    finally:
+        db.close()
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='globalfinder.review',
+                                     description='Extract the rosters on the share into one employee store')
+    parser.add_argument('share', help='share root holding the host folders and the manifests')
+    parser.add_argument('--database', default='review.sqlite3', help='SQLite store to create or update')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per core)')
+    parser.add_argument('--content-threshold', type=float, default=CONFIDENCE_THRESHOLD,
+                        help='confidence at which a file without the known header counts by content; 0 turns it off')
+    parser.add_argument('--top', type=int, default=20, help='hosts and employees listed in the summary')
+    parser.add_argument('--export', metavar='FOLDER', help='also write the tables to FOLDER')
+    parser.add_argument('--export-format', choices=('auto', 'parquet', 'csv'), default='auto',
+                        help='auto is parquet when pyarrow is installed, else gzipped CSV')
+    add_telemetry_arguments(parser)
+    args = parser.parse_args(argv)
+    configure_logging(args.log_level or 'WARNING')
+
+    started = time.perf_counter()
+    result = review_share(args.share, args.database, args.workers, args.content_threshold)
+    print(f"Reviewed {result.sources} new host folders and manifests: {result.copies} files, "
+          f"{result.bodies} new bodies, {result.records} roster rows, {result.errors + result.unreadable} unreadable "
+          f"in {time.perf_counter() - started:.1f} s")
+
+    db = sqlite3.connect(args.database)
+    try:
+        (employees,) = db.execute('SELECT COUNT(*) FROM employees').fetchone()
+        print(f"{employees} distinct employees exposed in total")
+        print(f"  {'host':<24}{'users':>7}{'files':>7}{'rosters':>9}{'employees':>11}")
+        for stats in host_statistics(db)[:args.top]:
+            print(f"  {stats.hostname:<24}{stats.users:>7}{stats.files:>7}{stats.rosters:>9}{stats.employees:>11}")
+        print(f"  {'employee':<24}{'name':<28}{'hosts':>7}{'files':>7}")
+        for spread in most_exposed(db, args.top):
+            print(f"  {spread.key:<24}{spread.name or '':<28}{spread.hosts:>7}{spread.files:>7}")
+    finally:
+        db.close()
+
+    if args.export:
+        for path in export_store(args.database, args.export, args.export_format):
+            print(f"Exported {path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import os
+from functools import partial
+from .archive import ArchiveScanner
+from .cloud import SKIP
+from .columns import Hit, Miss, SniffBudgetExceeded
+from .detectors import find_header, has_required_columns
+from .telemetry import CountingReader, file_format, log, telemetry
+from .walk import Walker
+
+
+def find_matching_files(target_directory, extensions, index=None, archive_scanner=None, walker=None, cloud=None,
+                        content=None, governor=None):
+    if walker is None:
+        walker = Walker(extensions)
+    matching_files = []
+    for entry in walker.walk(target_directory):
+        if governor is not None and not governor.pace():
+            break
+        read_limit = None if cloud is None else cloud.read_limit(entry)
+        if read_limit is SKIP:
+            if index is not None:
+                index.keep(entry.path)
+            continue
+        classify = partial(classify_file, extensions=extensions, archive_scanner=archive_scanner,
+                           read_limit=read_limit, content=content)
+        try:
+            if index is None:
+                matching_file = classify(entry.path)
+            else:
+                matching_file = index.check(entry.path, classify, entry.stat())
+        except SniffBudgetExceeded:
+            telemetry.count('cloud.inconclusive')
+            continue
+        except Exception as e:
+            telemetry.error(e, 'Error reading file %s, skipping it', entry.path)
+            continue
+        if matching_file:
+            matching_files.append(matching_file)
+
+    return matching_files
+
+
+def classify_file(file_path, extensions, archive_scanner=None, read_limit=None, content=None):
+    # Errors propagate so the caller can report them and the scan index does not
+    # remember an unreadable file as a non-match. With read_limit set, a file
+    # that could not be ruled out within it raises SniffBudgetExceeded.
+    # content is a ContentClassifier consulted when the header does not match.
+    # A workbook or CSV that is not a roster comes back as a Miss.
+    name = file_path.lower()
+    if not name.endswith(extensions):
+        return None
+    if name.endswith('.zip'):
+        return process_archive(file_path, archive_scanner, read_limit)
+    return process_matching_file(file_path, read_limit, content)
+
+
+def process_archive(file_path, archive_scanner=None, read_limit=None):
+    if archive_scanner is None:
+        archive_scanner = ArchiveScanner(has_required_columns)
+    with CountingReader(file_path, 'zip', read_limit) as f:
+        member = archive_scanner.scan(f)
+    if member:
+        return Hit(file_path, 'archive', member=member)
+    return None
+
+
+def process_matching_file(file_path, read_limit=None, content=None):
+    with CountingReader(file_path, file_format(file_path), read_limit) as f:
+        match = find_header(file_path, f)
+        if match is not None and not match.matched and content is not None and not f.exhausted:
+            f.seek(0)
+            with telemetry.timer('seconds.content'):
+                content_match = content.classify(file_path, f)
+            if content_match.matched:
+                log.info('Found matching file by content: %s (sheet %r, confidence %.2f, columns %s)',
+                         file_path, content_match.sheet, content_match.confidence, content_match.mapping)
+                telemetry.count('files.matched.content')
+                return Hit(file_path, 'content', content_match.sheet, confidence=content_match.confidence)
+    if match is None or not match.matched:
+        # The workbook readers stop quietly at their budget; only a miss that
+        # fitted in the read limit is a real one
+        if f.exhausted:
+            raise SniffBudgetExceeded()
+        return None if match is None else Miss(file_path, match.missing)
+    if match.sheet is None:
+        log.info('Found matching file: %s (header on row %d)', file_path, match.row)
+    else:
+        log.info('Found matching file: %s (sheet %r, header on row %d)', file_path, match.sheet, match.row)
+    if match.row:
+        telemetry.count('files.matched.offset_header')
+    return Hit(file_path, 'header', match.sheet, match.row)
+
+
+def list_jobs(users_path, user_folders):
+    # One (user, directory) job per existing folder under each profile
+    jobs = []
+    for user in os.listdir(users_path):
+        user_path = os.path.join(users_path, user)
+        if os.path.isdir(user_path):
+            for user_folder in user_folders:
+                target_directory = os.path.join(user_path, user_folder)
+                if os.path.exists(target_directory):
+                    jobs.append((user, target_directory))
+    return jobs
@@ -0,0 +1,249 @@
+import os
+import queue
+import threading
+import time
+from functools import partial
+from .cloud import SKIP
+from .columns import SniffBudgetExceeded
+from .telemetry import file_format, telemetry
+from .walk import Walker
+
+# Marks the end of a stage's input; each consumer thread takes exactly one
+_DONE = object()
+
+# How often on_checkpoint is called while the pipeline runs
+CHECKPOINT_SECONDS = 60.0
+
+
+def _start(count, target, *args):
+    threads = [threading.Thread(target=target, args=args, daemon=True) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def _start_worker():
+    # A forked worker starts with a copy of the parent's counters; only what
+    # it records itself is to be sent back
+    telemetry.take()
+
+
+def _classify_in_worker(classify, file_path):
+    # Runs in a sniff worker process. The counters and timings the classifier
+    # records there, and the CPU time it took, go back with the result; an
+    # error is returned rather than raised so they are not lost with it.
+    started = time.process_time()
+    try:
+        result, error = classify(file_path), None
+    except Exception as e:
+        result, error = None, e
+    return result, error, *telemetry.take(), time.process_time() - started
+
+
+def _finish(threads, next_queue, consumers):
+    for thread in threads:
+        thread.join()
+    for _ in range(consumers):
+        next_queue.put(_DONE)
+
+
+class ScanPipeline:
+    # Three bounded stages connected by queues: walk -> sniff -> copy.
+    # A full queue blocks the stage feeding it, so a slow share throttles the
+    # sniffers and a slow sniffer throttles the walkers instead of buffering
+    # the whole tree in memory.
+    #
+    # A job, one (user, directory) pair, is done once every file found in it has
+    # been classified and every hit handed to upload; on_job_done(job) is called
+    # then. With a governor, the walk and sniff threads pace themselves between
+    # files, and stop taking work when it says so; jobs cut short that way are
+    # never reported done. on_checkpoint() is called every checkpoint_seconds.
+
+    def __init__(self, accept, classify, upload, walk_workers=2, sniff_workers=4,
+                 copy_workers=4, queue_size=256, sniff_processes=False, index=None, walker=None, cloud=None,
+                 governor=None, on_job_done=None, on_checkpoint=None, checkpoint_seconds=CHECKPOINT_SECONDS):
+        self.accept = accept
+        self.walker = Walker() if walker is None else walker
+        self.classify = classify
+        self.upload = upload
+        self.walk_workers = max(1, walk_workers)
+        self.sniff_workers = max(1, sniff_workers)
+        self.copy_workers = max(1, copy_workers)
+        self.queue_size = queue_size
+        self.sniff_processes = sniff_processes
+        self.index = index
+        self.cloud = cloud
+        self.governor = governor
+        self.on_job_done = on_job_done
+        self.on_checkpoint = on_checkpoint
+        self.checkpoint_seconds = checkpoint_seconds
+        self.uploaded = 0
+        self._lock = threading.Lock()
+        # Per job: files in flight, plus one while the job is being walked
+        self._outstanding = {}
+        self._cut_short = set()
+        self._checkpoint_due = time.monotonic() + checkpoint_seconds
+
+    def _running(self):
+        return self.governor is None or self.governor.pace()
+
+    def _release(self, job, finished=True):
+        with self._lock:
+            if not finished:
+                self._cut_short.add(job)
+            self._outstanding[job] -= 1
+            done = not self._outstanding[job] and job not in self._cut_short
+            if not self._outstanding[job]:
+                del self._outstanding[job]
+        if done and self.on_job_done is not None:
+            self.on_job_done(job)
+
+    def _checkpoint(self):
+        if self.on_checkpoint is None or time.monotonic() < self._checkpoint_due:
+            return
+        with self._lock:
+            if time.monotonic() < self._checkpoint_due:
+                return
+            self._checkpoint_due = time.monotonic() + self.checkpoint_seconds
+        self.on_checkpoint()
+
+    def _walk(self, jobs, sniff_queue):
+        while True:
+            job = jobs.get()
+            if job is _DONE:
+                return
+            job = tuple(job)
+            with self._lock:
+                self._outstanding[job] = 1
+            finished = True
+            with telemetry.timer('seconds.walk'):
+                for entry in self.walker.walk(job[1]):
+                    if not self._running():
+                        finished = False
+                        break
+                    telemetry.count(f"files.seen.{file_format(entry.name)}")
+                    if self.accept(entry.name):
+                        with self._lock:
+                            self._outstanding[job] += 1
+                        sniff_queue.put((job, entry))
+            self._release(job, finished)
+
+    def _classify(self, file_path, executor, read_limit=None):
+        classify = self.classify if read_limit is None else partial(self.classify, read_limit=read_limit)
+        with telemetry.timer(f"seconds.sniff.{file_format(file_path)}"):
+            if executor is None:
+                return classify(file_path)
+            result, error, counters, histograms, cpu_seconds = executor.submit(
+                _classify_in_worker, classify, file_path,
+            ).result()
+        telemetry.merge(counters, histograms)
+        if self.governor is not None:
+            # The worker's use counts against the budget like the threads' does
+            self.governor.charge(cpu_seconds, sum(
+                amount for name, amount in counters.items() if name.startswith('bytes.sniffed.')
+            ))
+        if error is not None:
+            raise error
+        return result
+
+    def _sniff(self, sniff_queue, copy_queue, executor):
+        while True:
+            item = sniff_queue.get()
+            if item is _DONE:
+                return
+            job, entry = item
+            self._checkpoint()
+            if not self._running():
+                # Left for the run that resumes the job
+                self._release(job, finished=False)
+                continue
+            hit = self._sniff_entry(entry, executor)
+            if hit:
+                telemetry.count('files.matched')
+                copy_queue.put((job, hit))
+            else:
+                self._release(job)
+
+    def _sniff_entry(self, entry, executor):
+        file_path = entry.path
+        read_limit = None if self.cloud is None else self.cloud.read_limit(entry)
+        if read_limit is SKIP:
+            if self.index is not None:
+                self.index.keep(file_path)
+            return None
+        try:
+            if self.index is None:
+                return self._classify(file_path, executor, read_limit)
+            return self.index.check(
+                file_path, lambda path: self._classify(path, executor, read_limit), entry.stat(),
+            )
+        except SniffBudgetExceeded:
+            # A placeholder that could not be ruled out within the range; it
+            # stays out of the index so a later run looks at it again
+            telemetry.count('cloud.inconclusive')
+        except Exception as e:
+            telemetry.error(e, 'Error reading file %s, skipping it', file_path)
+        return None
+
+    def _copy(self, copy_queue):
+        while True:
+            item = copy_queue.get()
+            if item is _DONE:
+                return
+            job, hit = item
+            try:
+                with telemetry.timer('seconds.copy'):
+                    self.upload(job[0], hit)
+            except Exception as e:
+                telemetry.error(e, 'Error copying file %s', hit.path)
+                self._release(job)
+                continue
+            telemetry.count('files.uploaded')
+            if self.index is not None:
+                self.index.mark_uploaded(hit.path)
+            with self._lock:
+                self.uploaded += 1
+            self._release(job)
+
+    def run(self, jobs):
+        # jobs is an iterable of (user, directory) pairs
+        job_queue = queue.Queue()
+        for job in jobs:
+            job_queue.put(job)
+        for _ in range(self.walk_workers):
+            job_queue.put(_DONE)
+
+        sniff_queue = queue.Queue(self.queue_size)
+        copy_queue = queue.Queue(self.queue_size)
+
+        executor = None
+        if self.sniff_processes:
+            # Imported here: multiprocessing is a noticeable share of startup otherwise
+            from concurrent.futures import ProcessPoolExecutor
+            executor = ProcessPoolExecutor(self.sniff_workers, initializer=_start_worker)
+        try:
+            walkers = _start(self.walk_workers, self._walk, job_queue, sniff_queue)
+            sniffers = _start(self.sniff_workers, self._sniff, sniff_queue, copy_queue, executor)
+            copiers = _start(self.copy_workers, self._copy, copy_queue)
+
+            _finish(walkers, sniff_queue, self.sniff_workers)
+            _finish(sniffers, copy_queue, self.copy_workers)
+            for thread in copiers:
+                thread.join()
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return self.uploaded
+
+
+def add_pipeline_arguments(parser):
+    parser.add_argument('--walk-workers', type=int, default=2,
+                        help='directory trees enumerated in parallel')
+    parser.add_argument('--sniff-workers', type=int, default=os.cpu_count() or 4,
+                        help='files classified in parallel')
+    parser.add_argument('--copy-workers', type=int, default=4,
+                        help='threads handing hits to the uploader')
+    parser.add_argument('--queue-size', type=int, default=256,
+                        help='items buffered between stages before the producer blocks')
+    parser.add_argument('--sniff-processes', action='store_true',
+                        help='classify in worker processes instead of threads')
@@ -0,0 +1,42 @@
+import hashlib
+
+HASH_NAME = 'sha256'
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path, hash_name=HASH_NAME):
+    digest = hashlib.new(hash_name)
+    size = 0
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def object_name(digest):
+    # Where a body lives relative to the share root, with forward slashes
+    return f"objects/{digest[:2]}/{digest}"
+
+
+def hit_row(src, file_stat, hostname, username, hash_name, digest, size, stored, hit=None):
+    # The manifest row for one stored hit; hit is the scanner's Hit, if there is one
+    row = {
+        'path': src,
+        'hostname': hostname,
+        'username': username,
+        'size': size,
+        'created': file_stat.st_ctime,
+        'modified': file_stat.st_mtime,
+        'accessed': file_stat.st_atime,
+        'hash_name': hash_name,
+        'hash': digest,
+        'object': object_name(digest),
+        'uploaded': stored,
+    }
+    if hit is not None:
+        row.update(verdict=hit.verdict, sheet=hit.sheet, row=hit.row, member=hit.member, confidence=hit.confidence)
+    return row
@@ -0,0 +1,262 @@
+import json
+import logging
+import math
+import os
+import platform
+import socket
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from .columns import SniffBudgetExceeded
+
+log = logging.getLogger('globalfinder')
+
+# Below ERROR, a message template is logged for its first SAMPLE_BURST occurrences
+# and then once every SAMPLE_EVERY, so per-file chatter cannot dominate a big tree
+SAMPLE_BURST = 20
+SAMPLE_EVERY = 1000
+
+
+class Histogram:
+    # Power-of-two buckets: constant memory and a cheap observe() whatever the range
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = defaultdict(int)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.buckets[math.frexp(value)[1] if value > 0 else 0] += 1
+
+    def merge(self, other):
+        if not other.count:
+            return
+        self.count += other.count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        for exponent, count in other.buckets.items():
+            self.buckets[exponent] += count
+
+    def _quantile(self, q):
+        rank = q * self.count
+        seen = 0
+        for exponent in sorted(self.buckets):
+            seen += self.buckets[exponent]
+            if seen >= rank:
+                return min(math.ldexp(1, exponent), self.max)
+        return self.max
+
+    def to_dict(self):
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count,
+            'min': self.min,
+            'max': self.max,
+            'p50': self._quantile(0.5),
+            'p95': self._quantile(0.95),
+        }
+
+
+class Telemetry:
+
+    def __init__(self):
+        self.started = time.time()
+        self.counters = defaultdict(int)
+        self.histograms = defaultdict(Histogram)
+        self._lock = threading.Lock()
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def observe(self, name, value):
+        with self._lock:
+            self.histograms[name].observe(value)
+
+    @contextmanager
+    def timer(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def take(self):
+        # Returns (counters, histograms) recorded since the last take and starts
+        # afresh; a worker process hands them to the parent, which merges them
+        with self._lock:
+            taken = dict(self.counters), dict(self.histograms)
+            self.counters.clear()
+            self.histograms.clear()
+        return taken
+
+    def merge(self, counters, histograms):
+        with self._lock:
+            for name, amount in counters.items():
+                self.counters[name] += amount
+            for name, histogram in histograms.items():
+                self.histograms[name].merge(histogram)
+
+    def error(self, exc, context, *args):
+        # context is a %-style template, with args, naming what failed: log
+        # sampling goes by the template, so each kind of failure keeps its own
+        # budget however many files it hits
+        self.count(f"errors.{type(exc).__name__}")
+        log.warning(context + ': %s', *args, exc)
+
+    def report(self):
+        with self._lock:
+            counters = dict(sorted(self.counters.items()))
+            histograms = {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())}
+
+        # Throughput is derived here rather than tracked, to keep the hot path to one add
+        # With the upload client, seconds.copy is only the hand-over to it
+        copy_seconds = histograms.get('seconds.upload', histograms.get('seconds.copy', {})).get('total')
+        if copy_seconds:
+            counters['copy.bytes_per_second'] = counters.get('bytes.copied', 0) / copy_seconds
+
+        finished = time.time()
+        return {
+            'hostname': socket.gethostname(),
+            'python': platform.python_version(),
+            'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+            'finished': datetime.fromtimestamp(finished).isoformat(timespec='seconds'),
+            'duration_seconds': finished - self.started,
+            'counters': counters,
+            'histograms': histograms,
+        }
+
+    def write_report(self, share_folder):
+        # One JSON file per run under <share>/reports, named so a fleet's reports
+        # sort by host then time. The name is claimed with an exclusive create,
+        # and a run that finds it taken (one started in the same second) gets
+        # a numbered name like the manifests do.
+        report = self.report()
+        folder = os.path.join(share_folder, 'reports')
+        os.makedirs(folder, exist_ok=True)
+        stamp = datetime.fromtimestamp(self.started).strftime('%Y%m%dT%H%M%S')
+        base = os.path.join(folder, f"{report['hostname']}-{stamp}")
+        path = base + '.json'
+        number = 1
+        while True:
+            try:
+                f = open(path, 'x', encoding='utf-8')
+                break
+            except FileExistsError:
+                path = f"{base}-{number}.json"
+                number += 1
+        with f:
+            json.dump(report, f, indent=2)
+        return path
+
+
+# Shared by every module in the process, like the logging module's loggers
+telemetry = Telemetry()
+
+
+class CountingReader:
+    # Wraps a binary file and adds every byte read to bytes.sniffed.<format>.
+    # With max_bytes set, a read that would go past it raises SniffBudgetExceeded
+    # and leaves exhausted set.
+
+    def __init__(self, file_path, fmt, max_bytes=None):
+        self._file = open(file_path, 'rb')
+        self.name = file_path
+        self.format = fmt
+        self.bytes_read = 0
+        self.max_bytes = max_bytes
+        self.exhausted = False
+
+    def read(self, size=-1):
+        if self.max_bytes is not None and (size is None or size < 0 or self.bytes_read + size > self.max_bytes):
+            # One byte past the limit tells a file that ends within it from one that does not
+            size = self.max_bytes - self.bytes_read + 1
+        data = self._file.read(size)
+        self.bytes_read += len(data)
+        if self.max_bytes is not None and self.bytes_read > self.max_bytes:
+            self.exhausted = True
+            raise SniffBudgetExceeded()
+        return data
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def seekable(self):
+        return True
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+            telemetry.count(f"bytes.sniffed.{self.format}", self.bytes_read)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def file_format(file_path):
+    return os.path.splitext(file_path)[1].lower().lstrip('.') or 'none'
+
+
+class SampledFilter(logging.Filter):
+
+    def __init__(self, burst=SAMPLE_BURST, every=SAMPLE_EVERY):
+        super().__init__()
+        self.burst = burst
+        self.every = every
+        self._seen = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR:
+            return True
+        with self._lock:
+            self._seen[record.msg] += 1
+            seen = self._seen[record.msg]
+        if seen <= self.burst:
+            return True
+        if (seen - self.burst) % self.every:
+            telemetry.count('log.suppressed')
+            return False
+        record.msg = f"{record.msg} [{seen - 1} similar messages so far]"
+        return True
+
+
+# The handler configure_logging installed, replaced by the next call
+_handler = None
+
+
+def configure_logging(level='INFO'):
+    # Called by every main(); a process running more than one, like the tests
+    # and the benchmark suite, gets one handler with a fresh sample count
+    global _handler
+    if _handler is not None:
+        log.removeHandler(_handler)
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+    _handler.addFilter(SampledFilter())
+    log.addHandler(_handler)
+    log.setLevel(level)
+    log.propagate = False
+
+
+def add_telemetry_arguments(parser):
+    parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help="Defaults to the preset's level")
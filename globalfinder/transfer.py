@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from .store import HASH_NAME, hash_file
+
+CHUNK_SIZE = 8 * 1024 * 1024
+# With a timeout, chunks are cut to this size so the deadline is checked at
+# least this often however slow the link is
+TIMED_CHUNK_SIZE = 1024 * 1024
+
+
+class CopyTimeout(Exception):
+    pass
+
+
+class CopyVerifyError(Exception):
+    pass
+
+
+class BandwidthLimiter:
+    # Token bucket shared by every copy in the process, so the cap holds however
+    # many uploads are in flight
+
+    def __init__(self, bytes_per_second, burst=None):
+        self.rate = bytes_per_second
+        self.capacity = burst or bytes_per_second
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount, deadline=None):
+        # Sleeps until amount bytes may be sent. Raises CopyTimeout, without
+        # taking the bytes, when that would be after deadline (a monotonic time).
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = (amount - self._tokens) / self.rate if self._tokens < amount else 0
+            if deadline is not None and now + wait > deadline:
+                raise CopyTimeout(f"the bandwidth cap would hold the copy {now + wait - deadline:.1f} s past its deadline")
+            self._tokens -= amount
+        if wait:
+            time.sleep(wait)
+
+
+def _load_checkpoint(checkpoint_path, part_path, source_stat):
+    try:
+        with open(checkpoint_path, encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        part_size = os.path.getsize(part_path)
+    except (OSError, ValueError):
+        return 0
+    if checkpoint.get('size') != source_stat.st_size or checkpoint.get('mtime_ns') != source_stat.st_mtime_ns:
+        return 0
+    # Bytes past the checkpoint may be a torn write from an interrupted run
+    return min(checkpoint.get('offset', 0), part_size)
+
+
+def _save_checkpoint(checkpoint_path, source_stat, offset):
+    with open(checkpoint_path, 'w', encoding='utf-8') as f:
+        json.dump({'size': source_stat.st_size, 'mtime_ns': source_stat.st_mtime_ns, 'offset': offset}, f)
+
+
+def _remove_checkpoint(checkpoint_path):
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+
+def resumable_copy(src, dest, part_path=None, limiter=None, timeout=None, chunk_size=CHUNK_SIZE,
+                   verify=True, expected_digest=None, hash_name=HASH_NAME):
+    # Copies src to dest through <part_path> in large chunks, checkpointing the
+    # offset after each one. A copy that is interrupted or runs past timeout
+    # seconds raises (CopyTimeout for the latter) and the next call resumes
+    # where it stopped. The bytes are hashed as they are written, and the copy
+    # is renamed onto dest only once that hash matches expected_digest or,
+    # with verify and no expected digest, a hash of the local source taken
+    # afterwards. Nothing is read back from dest. Returns (digest, size).
+    if part_path is None:
+        part_path = dest + '.part'
+    checkpoint_path = part_path + '.json'
+    deadline = None if timeout is None else time.monotonic() + timeout
+    if deadline is not None:
+        chunk_size = min(chunk_size, TIMED_CHUNK_SIZE)
+
+    source_stat = os.stat(src)
+    offset = _load_checkpoint(checkpoint_path, part_path, source_stat)
+    digest = hashlib.new(hash_name)
+
+    with open(src, 'rb') as source, open(part_path, 'r+b' if offset else 'wb') as part:
+        # The copied prefix is re-hashed from the local source, not read back over the network
+        remaining = offset
+        while remaining:
+            chunk = source.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+        part.seek(offset)
+        part.truncate()
+
+        while True:
+            if deadline is not None and time.monotonic() > deadline:
+                raise CopyTimeout(f"copy of {src} timed out after {offset} bytes")
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            if limiter is not None:
+                limiter.consume(len(chunk), deadline)
+            part.write(chunk)
+            part.flush()
+            digest.update(chunk)
+            offset += len(chunk)
+            _save_checkpoint(checkpoint_path, source_stat, offset)
+        os.fsync(part.fileno())
+
+    digest = digest.hexdigest()
+    if expected_digest is None and verify:
+        expected_digest = hash_file(src, hash_name)[0]
+        if deadline is not None and time.monotonic() > deadline:
+            # The part and its checkpoint stay; the next call only verifies
+            raise CopyTimeout(f"copy of {src} timed out while it was verified")
+    if expected_digest is not None and digest != expected_digest:
+        os.remove(part_path)
+        _remove_checkpoint(checkpoint_path)
+        raise CopyVerifyError(f"{src} changed while it was being copied")
+
+    os.replace(part_path, dest)
+    _remove_checkpoint(checkpoint_path)
+    return digest, offset
+
+
+def add_copy_arguments(parser):
+    parser.add_argument('--max-upload-mbps', type=float, default=None,
+                        help='bandwidth cap shared by all uploads, in megabits per second')
+    parser.add_argument('--copy-timeout', type=float, default=None,
+                        help='seconds one upload may take before it is checkpointed and retried next run')
+
+
+def limiter_from_arguments(args):
+    if not args.max_upload_mbps:
+        return None
+    return BandwidthLimiter(args.max_upload_mbps * 1000 * 1000 / 8)
@@ -0,0 +1,391 @@
+import asyncio
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+from .columns import Hit
+from .config import data_path, prepare_data_path
+from .store import HASH_NAME, hash_file, hit_row, object_name
+from .telemetry import log, telemetry
+from .transfer import resumable_copy
+
+DEFAULT_SPOOL_PATH = data_path('upload_spool.sqlite3')
+
+CONCURRENCY = 16
+RETRIES = 5
+# Retry n waits a random time between 0 and BACKOFF_SECONDS * 2 ** (n - 1),
+# capped at BACKOFF_MAX_SECONDS, so hosts that lost the share together do not
+# come back to it together
+BACKOFF_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30.0
+# Hits handed over but not finished, per slot, before submit blocks the scan
+PENDING_PER_SLOT = 16
+
+SPOOL_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS pending (
+    path TEXT PRIMARY KEY,
+    username TEXT NOT NULL,
+    hit TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    stored INTEGER NOT NULL DEFAULT 0,
+    added REAL NOT NULL
+);
+'''
+
+
+class TransientUploadError(Exception):
+    pass
+
+
+class LocalBackend:
+    # The share, or a local directory standing in for it, through the file
+    # system. Every call blocks, so each one runs on the client's threads.
+
+    def __init__(self, root, limiter=None, timeout=None, part_suffix=None):
+        self.root = root
+        self.limiter = limiter
+        self.timeout = timeout
+        self.part_suffix = part_suffix or socket.gethostname()
+
+    def _path(self, name):
+        return os.path.join(self.root, *name.split('/'))
+
+    async def exists(self, name):
+        return await asyncio.to_thread(os.path.exists, self._path(name))
+
+    async def makedirs(self, name):
+        await asyncio.to_thread(os.makedirs, self._path(name), exist_ok=True)
+
+    async def put(self, src, name, digest, hash_name):
+        # Same partial-file naming as the old ContentStore, so an upload interrupted by
+        # either one resumes in the other
+        dest = self._path(name)
+        await asyncio.to_thread(
+            resumable_copy, src, dest,
+            part_path=f"{dest}.{self.part_suffix}.part",
+            limiter=self.limiter,
+            timeout=self.timeout,
+            expected_digest=digest,
+            hash_name=hash_name,
+        )
+
+
+class FakeBackend:
+    # An in-process share for benchmarks and failure injection. Every call costs
+    # latency seconds, a body also size / bytes_per_second, and failure_rate of
+    # the calls raise TransientUploadError. Like the real share, a body can only
+    # be put into a directory that was created first. Nothing is written.
+
+    def __init__(self, latency=0.01, bytes_per_second=None, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.bytes_per_second = bytes_per_second
+        self.failure_rate = failure_rate
+        self.objects = {}
+        self.directories = set()
+        self.calls = Counter()
+        self._random = random.Random(seed)
+
+    async def _call(self, kind, size=0):
+        self.calls[kind] += 1
+        await asyncio.sleep(self.latency + (size / self.bytes_per_second if self.bytes_per_second else 0))
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            self.calls['failed'] += 1
+            raise TransientUploadError(f"injected {kind} failure")
+
+    async def exists(self, name):
+        await self._call('exists')
+        return name in self.objects
+
+    async def makedirs(self, name):
+        await self._call('makedirs')
+        self.directories.add(name)
+
+    async def put(self, src, name, digest, hash_name):
+        size = os.path.getsize(src)
+        await self._call('put', size)
+        if name.rpartition('/')[0] not in self.directories:
+            raise FileNotFoundError(f"no such directory on the share: {name}")
+        self.objects[name] = size
+
+
+class UploadSpool:
+    # Hits handed to the uploader that are not on the share yet. A hit is written
+    # here before its upload starts, marked stored once it is, and deleted when
+    # the manifest listing it has been written, so whatever a crash, a reboot or
+    # an unreachable share leaves behind is uploaded, or listed, by the next run.
+
+    def __init__(self, path=DEFAULT_SPOOL_PATH):
+        prepare_data_path(path)
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # A commit per hit: with WAL and synchronous=NORMAL that survives the
+        # process dying without an fsync each time, only power loss can undo it
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SPOOL_SCHEMA)
+        self._lock = threading.Lock()
+
+    def add(self, username, hit):
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO pending (path, username, hit, added) VALUES (?, ?, ?, ?)',
+                (hit.path, username, json.dumps(hit._asdict()), time.time()),
+            )
+
+    def attempted(self, path):
+        with self._lock, self._db:
+            self._db.execute('UPDATE pending SET attempts = attempts + 1 WHERE path = ?', (path,))
+
+    def stored(self, path):
+        with self._lock, self._db:
+            self._db.execute('UPDATE pending SET stored = 1 WHERE path = ?', (path,))
+
+    def remove(self, path):
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM pending WHERE path = ?', (path,))
+
+    def forget_stored(self):
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM pending WHERE stored = 1')
+
+    def pending(self):
+        # (username, hit, attempts so far), oldest first. Hits stored by a run
+        # that died before writing its manifest are included: uploading them
+        # again finds the body on the share and only lists them.
+        with self._lock:
+            rows = self._db.execute('SELECT username, hit, attempts FROM pending ORDER BY added').fetchall()
+        return [(username, Hit(**json.loads(hit)), attempts) for username, hit, attempts in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM pending').fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+
+class DirectoryCache:
+    # Directories known to exist on the share. The first upload into a directory
+    # creates it and every upload after that, or waiting on it, skips the round
+    # trip. A creation that failed is forgotten so the next attempt tries again.
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._created = {}
+
+    async def ensure(self, name):
+        task = self._created.get(name)
+        if task is None:
+            task = self._created[name] = asyncio.ensure_future(self.backend.makedirs(name))
+            telemetry.count('upload.makedirs')
+        try:
+            await task
+        except Exception:
+            if self._created.get(name) is task:
+                del self._created[name]
+            raise
+
+
+class UploadClient:
+    # Stores hits in the share's content store from an asyncio loop on its own
+    # thread: submit() records the hit in the spool and returns, so the scan
+    # never waits on a share round trip. Up to concurrency uploads are in flight
+    # at once, each directory is created once per run, and a failed upload is
+    # retried with jittered exponential backoff. A hit that still fails stays in
+    # the spool; start() hands whatever earlier runs left there over first.
+    # close() writes the manifest, and only then lets the spool forget the hits.
+
+    def __init__(self, backend, spool, manifest, hostname, concurrency=CONCURRENCY, retries=RETRIES,
+                 backoff=BACKOFF_SECONDS, backoff_max=BACKOFF_MAX_SECONDS, hash_name=HASH_NAME, seed=None):
+        self.backend = backend
+        self.spool = spool
+        self.manifest = manifest
+        self.hostname = hostname
+        self.concurrency = max(1, concurrency)
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.hash_name = hash_name
+        self.manifest_path = None
+        self.drained = 0
+        self.completed = 0
+        self.deferred = 0
+        self.directories = DirectoryCache(backend)
+        self._random = random.Random(seed)
+        self._known = set()
+        self._uploading = {}
+        self._queued = set()
+        self._futures = set()
+        self._room = threading.BoundedSemaphore(self.concurrency * PENDING_PER_SLOT)
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._slots = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start(self):
+        # Returns how many hits earlier runs left in the spool
+        self._loop = asyncio.new_event_loop()
+        self._loop.set_default_executor(ThreadPoolExecutor(self.concurrency, thread_name_prefix='upload'))
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+        left_over = self.spool.pending()
+        self.drained = len(left_over)
+        telemetry.count('upload.drained', self.drained)
+        for username, hit, _ in left_over:
+            self._schedule(username, hit)
+        return self.drained
+
+    def submit(self, username, hit):
+        # Called from any thread. Returns once the hit is spooled; it blocks only
+        # while the uploads already handed over fill every pending place.
+        with self._lock:
+            if hit.path in self._queued:
+                return
+        self.spool.add(username, hit)
+        self._schedule(username, hit)
+
+    def _schedule(self, username, hit):
+        self._room.acquire()
+        with self._lock:
+            if hit.path in self._queued:
+                self._room.release()
+                return
+            self._queued.add(hit.path)
+            future = asyncio.run_coroutine_threadsafe(self._send(username, hit), self._loop)
+            self._futures.add(future)
+        future.add_done_callback(self._finished)
+
+    def _finished(self, future):
+        with self._lock:
+            self._futures.discard(future)
+        self._room.release()
+        if not future.cancelled() and future.exception() is not None:
+            telemetry.error(future.exception(), 'Upload failed unexpectedly')
+
+    def _delay(self, attempt):
+        return self._random.uniform(0, min(self.backoff_max, self.backoff * 2 ** (attempt - 1)))
+
+    async def _send(self, username, hit):
+        for attempt in range(self.retries + 1):
+            if attempt:
+                telemetry.count('upload.retried')
+                await asyncio.sleep(self._delay(attempt))
+            try:
+                async with self._slots:
+                    with telemetry.timer('seconds.upload'):
+                        file_stat, digest, size = await self._hash(hit.path)
+                        stored = await self._put(hit.path, digest)
+            except FileNotFoundError as e:
+                if not os.path.exists(hit.path):
+                    # The hit itself is gone; no retry brings it back
+                    telemetry.error(e, 'Hit %s disappeared before it was uploaded', hit.path)
+                    self.spool.remove(hit.path)
+                    return False
+                error = e
+            except Exception as e:
+                error = e
+            else:
+                self.manifest.add(hit_row(hit.path, file_stat, self.hostname, username, self.hash_name,
+                                          digest, size, stored, hit))
+                self.spool.stored(hit.path)
+                telemetry.count('bytes.copied' if stored else 'bytes.deduplicated', size)
+                telemetry.count('upload.completed')
+                with self._lock:
+                    self.completed += 1
+                return True
+            self.spool.attempted(hit.path)
+            telemetry.error(error, 'Error uploading %s (attempt %d of %d)', hit.path, attempt + 1, self.retries + 1)
+
+        telemetry.count('upload.deferred')
+        log.warning('Giving up on %s for this run, it stays spooled for the next one', hit.path)
+        with self._lock:
+            self.deferred += 1
+        return False
+
+    async def _hash(self, src):
+        # Hashed on every attempt: a file that changed since the last one has a new body
+        loop = asyncio.get_running_loop()
+        file_stat = os.stat(src)
+        digest, size = await loop.run_in_executor(None, hash_file, src, self.hash_name)
+        telemetry.count('bytes.hashed', size)
+        return file_stat, digest, size
+
+    async def _put(self, src, digest):
+        # Returns False for a body the share already had. Uploads of the same
+        # new body queue up behind the first one instead of racing it.
+        # The lock is dropped once nobody holds or waits for it, whether the body
+        # was already there, was stored, or the put failed.
+        name = object_name(digest)
+        entry = self._uploading.setdefault(digest, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                if digest in self._known:
+                    return False
+                if await self.backend.exists(name):
+                    self._known.add(digest)
+                    return False
+                await self.directories.ensure(name.rpartition('/')[0])
+                await self.backend.put(src, name, digest, self.hash_name)
+                self._known.add(digest)
+                return True
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._uploading[digest]
+
+    def join(self):
+        # Waits for every upload handed over so far
+        while True:
+            with self._lock:
+                futures = list(self._futures)
+            if not futures:
+                return
+            wait(futures)
+
+    def close(self):
+        if self._loop is None:
+            return
+        self.join()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.run_until_complete(self._loop.shutdown_default_executor())
+        self._loop.close()
+        self._loop = None
+        self.manifest_path = self.manifest.close()
+        self.spool.forget_stored()
+        self.spool.close()
+
+
+def add_upload_arguments(parser):
+    parser.add_argument('--upload-concurrency', type=int, default=CONCURRENCY,
+                        help='uploads to the share in flight at once')
+    parser.add_argument('--upload-retries', type=int, default=RETRIES,
+                        help='retries of a failed upload before it is left in the spool for the next run')
+    parser.add_argument('--upload-backoff', type=float, default=BACKOFF_SECONDS,
+                        help='seconds before the first retry; doubles, with jitter, for each one after')
+    parser.add_argument('--upload-spool', default=DEFAULT_SPOOL_PATH,
+                        help='local list of hits not uploaded yet, kept across runs')
+
+
+def upload_client_from_arguments(args, backend, manifest, hostname):
+    return UploadClient(
+        backend, UploadSpool(args.upload_spool), manifest, hostname,
+        concurrency=args.upload_concurrency,
+        retries=args.upload_retries,
+        backoff=args.upload_backoff,
+    )
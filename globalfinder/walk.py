@@ -0,0 +1,147 @@
+import fnmatch
+import os
+import re
+from .telemetry import log, telemetry
+
+# Folders owned by Windows or by developer tools, which users do not save
+# documents into. Matched case-insensitively against folder names.
+DEFAULT_PRUNE = (
+    'AppData', 'Application Data', 'Local Settings', '$RECYCLE.BIN', 'System Volume Information',
+    'node_modules', '.git', '.svn', '.hg', '__pycache__', '.venv', 'venv', '.cache', '.npm', '.nuget',
+)
+# Temp and media folders a user can still drop an export into; skipped only
+# with --prune-temp-and-media
+TEMP_AND_MEDIA_PRUNE = (
+    'Temp', 'tmp', 'Pictures', 'Photos', 'Camera Roll', 'Screenshots', 'Videos', 'Music',
+)
+# Every candidate is opened by default. A header alone is longer than
+# HEADER_MIN_SIZE bytes, which makes it a safe --min-size for faster sweeps.
+MIN_SIZE = 0
+HEADER_MIN_SIZE = 64
+
+# IO_REPARSE_TAG_SYMLINK and IO_REPARSE_TAG_MOUNT_POINT (junctions)
+LINK_REPARSE_TAGS = (0xA000000C, 0xA0000003)
+
+
+def _compile(patterns):
+    # Patterns without a separator match a folder's name, the others its whole path
+    names = [fnmatch.translate(pattern) for pattern in patterns if not re.search(r'[\\/]', pattern)]
+    paths = [fnmatch.translate(pattern.replace('\\', '/')) for pattern in patterns if re.search(r'[\\/]', pattern)]
+    as_regex = lambda translated: re.compile('|'.join(translated), re.IGNORECASE).match if translated else None
+    return as_regex(names), as_regex(paths)
+
+
+def _is_link(entry):
+    if entry.is_symlink():
+        return True
+    if os.name != 'nt':
+        return False
+    # Junctions are not symlinks to DirEntry; the reparse tag comes with the
+    # directory listing. OneDrive folders are reparse points too and are walked.
+    return entry.stat(follow_symlinks=False).st_reparse_tag in LINK_REPARSE_TAGS
+
+
+class Walker:
+    # os.scandir-based replacement for os.walk. Folders matching a prune glob are
+    # never listed, files are filtered by extension and then by the size the
+    # listing already returned, and links are only followed on request, with
+    # every followed folder remembered so a junction loop is entered once.
+
+    def __init__(self, extensions=None, prune=DEFAULT_PRUNE, min_size=MIN_SIZE, max_size=None,
+                 max_depth=None, follow_links=False):
+        self.extensions = tuple(extensions) if extensions else None
+        self.prune = tuple(prune)
+        self._prune_name, self._prune_path = _compile(self.prune)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_depth = max_depth
+        self.follow_links = follow_links
+
+    def _pruned(self, entry):
+        if self._prune_name is not None and self._prune_name(entry.name):
+            return True
+        return self._prune_path is not None and self._prune_path(entry.path.replace('\\', '/'))
+
+    def walk(self, top):
+        # Yields an os.DirEntry per accepted file; entry.stat() is cached and,
+        # on Windows, free
+        stack = [(top, 0)]
+        visited = set()
+        if self.follow_links:
+            top_stat = os.stat(top)
+            visited.add((top_stat.st_dev, top_stat.st_ino))
+        directories = files = pruned = 0
+
+        while stack:
+            directory, depth = stack.pop()
+            try:
+                # Listed up front so no directory handle stays open while the
+                # consumer of this generator is blocked on a full queue
+                with os.scandir(directory) as entries:
+                    entries = list(entries)
+            except OSError as e:
+                telemetry.count('walk.unreadable_dirs')
+                log.debug('Cannot list %s: %s', directory, e)
+                continue
+            directories += 1
+
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        if self.max_depth is not None and depth >= self.max_depth:
+                            continue
+                        if self._pruned(entry):
+                            pruned += 1
+                            continue
+                        if _is_link(entry):
+                            if not self.follow_links:
+                                continue
+                            # DirEntry does not carry a file id on Windows, so ask the target
+                            target = os.stat(entry.path)
+                            if (target.st_dev, target.st_ino) in visited:
+                                continue
+                            visited.add((target.st_dev, target.st_ino))
+                        stack.append((entry.path, depth + 1))
+                        continue
+
+                    files += 1
+                    if self.extensions is not None and not entry.name.lower().endswith(self.extensions):
+                        continue
+                    if not entry.is_file(follow_symlinks=self.follow_links):
+                        continue
+                    size = entry.stat(follow_symlinks=self.follow_links).st_size
+                    if size < self.min_size or (self.max_size is not None and size > self.max_size):
+                        continue
+                    yield entry
+                except OSError as e:
+                    log.debug('Cannot inspect %s: %s', entry.path, e)
+
+        telemetry.count('walk.dirs', directories)
+        telemetry.count('walk.files', files)
+        telemetry.count('walk.pruned_dirs', pruned)
+
+
+def add_walk_arguments(parser):
+    parser.add_argument('--prune', action='append', default=[], metavar='GLOB',
+                        help='Folder name or path glob to skip; may be repeated')
+    parser.add_argument('--no-default-prune', action='store_true',
+                        help='Do not skip the built-in list of app-data, recycle-bin and tool folders')
+    parser.add_argument('--prune-temp-and-media', action='store_true',
+                        help='Also skip Temp, tmp, Pictures, Photos, Screenshots, Videos and Music folders')
+    parser.add_argument('--min-size', type=int, default=MIN_SIZE,
+                        help=f"Files smaller than this many bytes are not opened; {HEADER_MIN_SIZE} "
+                             'cannot hold a header')
+    parser.add_argument('--max-size-mb', type=float, default=None,
+                        help='Files larger than this are not opened')
+    parser.add_argument('--max-depth', type=int, default=None,
+                        help='Folder levels to descend below each scanned folder')
+    parser.add_argument('--follow-links', action='store_true',
+                        help='Descend into symlinked folders and junctions, entering each target once')
+
+
+def walker_from_arguments(args, extensions=None):
+    prune = tuple(args.prune) + (() if args.no_default_prune else DEFAULT_PRUNE)
+    if args.prune_temp_and_media:
+        prune += TEMP_AND_MEDIA_PRUNE
+    max_size = None if args.max_size_mb is None else int(args.max_size_mb * 1024 * 1024)
+    return Walker(extensions, prune, args.min_size, max_size, args.max_depth, args.follow_links)
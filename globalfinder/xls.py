@@ -0,0 +1,566 @@
+import struct
+import sys
+from array import array
+from .columns import REQUIRED_COLUMNS, ColumnMatcher, HeaderMatch, SniffBudgetExceeded
+from .telemetry import telemetry
+
+OLE_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+MAXREGSECT = 0xFFFFFFFA
+ENDOFCHAIN = 0xFFFFFFFE
+STREAM_ENTRY = 2
+ROOT_ENTRY = 5
+WORKBOOK_STREAMS = ('workbook', 'book')
+
+BIFF8 = 0x0600
+BOF_WORKSHEET = 0x0010
+
+# BIFF record types this reader looks at
+BOF = 0x0809
+EOF = 0x000A
+FILEPASS = 0x002F
+CONTINUE = 0x003C
+BOUNDSHEET = 0x0085
+SST = 0x00FC
+LABELSST = 0x00FD
+LABEL = 0x0204
+RSTRING = 0x00D6
+NUMBER = 0x0203
+RK = 0x027E
+MULRK = 0x00BD
+FORMULA = 0x0006
+STRING = 0x0207
+WINDOW2 = 0x023E
+
+# Row indices examined per worksheet. A sheet's cell records come in row
+# order, so the read of its substream stops at the first cell past this row;
+# every sheet is still visited, since BOUNDSHEET gives each one's offset.
+MAX_ROWS = 50
+# Bytes read from the Workbook stream before giving up on a file
+MAX_BYTES = 16 * 1024 * 1024
+# Small records would otherwise cost a sector read each
+READ_AHEAD = 8 * 1024
+# Caps the directory walk, which would otherwise loop on a cyclic sector chain
+MAX_DIRECTORY_ENTRIES = 4096
+
+
+class XlsFormatError(Exception):
+    pass
+
+
+def _uint32_array(data):
+    values = array('I')
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+class _Stream:
+    # Read-only view of one sector chain. The chain is followed only as far as
+    # the reads go, so a seek into the middle of a big stream touches just the
+    # FAT sectors on the way there.
+
+    def __init__(self, start, size, sector_size, extend_chain, read_sectors):
+        self.size = size
+        self.sector_size = sector_size
+        self._extend_chain = extend_chain
+        self._read_sectors = read_sectors
+        self._chain = [] if start == ENDOFCHAIN else [start]
+        self._pos = 0
+        # When set, reading more than this many bytes raises SniffBudgetExceeded
+        self.max_bytes = None
+        self.bytes_read = 0
+        self._buffer = b''
+        self._buffer_pos = 0
+
+    def _sector(self, index):
+        if index >= len(self._chain):
+            if index * self.sector_size >= self.size or not self._chain:
+                raise XlsFormatError('sector chain is longer than its stream')
+            self._extend_chain(self._chain, index + 1)
+        return self._chain[index]
+
+    def seek(self, pos):
+        self._pos = pos
+
+    def tell(self):
+        return self._pos
+
+    def _fill(self, size):
+        # Buffers at least READ_AHEAD bytes from the current position, reading
+        # runs of consecutive sectors in one go
+        needed = size
+        size = min(max(size, READ_AHEAD), self.size - self._pos)
+        self._buffer_pos = self._pos
+        pos = self._pos
+        parts = []
+        while size:
+            index, offset = divmod(pos, self.sector_size)
+            try:
+                first = self._sector(index)
+            except XlsFormatError:
+                # Read-ahead may run into the end of a chain whose size is not known
+                if pos - self._buffer_pos >= needed:
+                    break
+                raise
+            count = 1
+            while count * self.sector_size - offset < size:
+                try:
+                    if self._sector(index + count) != first + count:
+                        break
+                except XlsFormatError:
+                    break
+                count += 1
+            data = self._read_sectors(first, count)[offset:offset + size]
+            if not data:
+                raise XlsFormatError('sector lies beyond the end of the file')
+            parts.append(data)
+            pos += len(data)
+            size -= len(data)
+        self._buffer = b''.join(parts)
+
+    def read(self, size):
+        size = max(0, min(size, self.size - self._pos))
+        self.bytes_read += size
+        if self.max_bytes is not None and self.bytes_read > self.max_bytes:
+            raise SniffBudgetExceeded()
+        start = self._pos - self._buffer_pos
+        if start < 0 or start + size > len(self._buffer):
+            self._fill(size)
+            start = 0
+        self._pos += size
+        return self._buffer[start:start + size]
+
+
+class _CompoundFile:
+    # Just enough of the OLE2 compound document format to open one stream
+
+    def __init__(self, f):
+        self._f = f
+        f.seek(0)
+        header = f.read(512)
+        if len(header) < 512 or header[:8] != OLE_SIGNATURE:
+            raise XlsFormatError('not an OLE2 compound document')
+        sector_shift, mini_shift = struct.unpack_from('<HH', header, 0x1E)
+        if not 7 <= sector_shift <= 16 or mini_shift >= sector_shift:
+            raise XlsFormatError('invalid sector size')
+        self.sector_size = 1 << sector_shift
+        self.mini_sector_size = 1 << mini_shift
+        (fat_count, self.dir_start, _, self.mini_cutoff, self.minifat_start,
+         _, difat_sector, difat_count) = struct.unpack_from('<8I', header, 0x2C)
+
+        per_sector = self.sector_size // 4
+        self._fat_sectors = [s for s in _uint32_array(header[0x4C:0x200]) if s <= MAXREGSECT]
+        for _ in range(difat_count):
+            if difat_sector > MAXREGSECT:
+                break
+            entries = _uint32_array(self._read_sectors(difat_sector, 1))
+            self._fat_sectors.extend(s for s in entries[:-1] if s <= MAXREGSECT)
+            difat_sector = entries[-1]
+        del self._fat_sectors[fat_count:]
+        self._per_sector = per_sector
+        self._fat = {}
+        self._mini_stream = None
+        self._minifat = None
+
+    def _read_sectors(self, sector, count):
+        self._f.seek((sector + 1) * self.sector_size)
+        return self._f.read(count * self.sector_size)
+
+    def _fat_table(self, fat_index):
+        if fat_index not in self._fat:
+            if fat_index >= len(self._fat_sectors):
+                raise XlsFormatError('sector outside the FAT')
+            self._fat[fat_index] = _uint32_array(self._read_sectors(self._fat_sectors[fat_index], 1))
+        return self._fat[fat_index]
+
+    def _extend(self, chain, length):
+        # Files are mostly written front to back, so when the rest of a FAT
+        # sector just points each sector at the next one it is taken in one step
+        per_sector = self._per_sector
+        while len(chain) < length:
+            sector = chain[-1]
+            fat_index, entry = divmod(sector, per_sector)
+            fat = self._fat_table(fat_index)
+            end = (fat_index + 1) * per_sector
+            if fat[entry:] == array('I', range(sector + 1, end + 1)):
+                chain.extend(range(sector + 1, min(end + 1, sector + 1 + length - len(chain))))
+                continue
+            sector = fat[entry]
+            if sector > MAXREGSECT:
+                raise XlsFormatError('sector chain ends before its stream')
+            chain.append(sector)
+
+    def _stream(self, start, size):
+        return _Stream(start, size, self.sector_size, self._extend, self._read_sectors)
+
+    def _extend_mini(self, chain, length):
+        while len(chain) < length:
+            self._minifat.seek(chain[-1] * 4)
+            data = self._minifat.read(4)
+            if len(data) < 4:
+                raise XlsFormatError('sector outside the mini FAT')
+            sector = struct.unpack('<I', data)[0]
+            if sector > MAXREGSECT:
+                raise XlsFormatError('sector chain ends before its stream')
+            chain.append(sector)
+
+    def _read_mini_sectors(self, sector, count):
+        self._mini_stream.seek(sector * self.mini_sector_size)
+        return self._mini_stream.read(count * self.mini_sector_size)
+
+    def open(self, names):
+        # Returns the first stream whose name is in names, or None
+        directory = self._stream(self.dir_start, 1 << 62)
+        root = None
+        for _ in range(MAX_DIRECTORY_ENTRIES):
+            try:
+                entry = directory.read(128)
+            except XlsFormatError:
+                return None
+            if len(entry) < 128:
+                return None
+            name_length, entry_type = struct.unpack_from('<HB', entry, 64)
+            start, size = struct.unpack_from('<IQ', entry, 116)
+            if self.sector_size == 512:
+                # Version 3 files may leave garbage in the high half of the size
+                size &= 0xFFFFFFFF
+            if entry_type == ROOT_ENTRY and root is None:
+                root = (start, size)
+                continue
+            if entry_type != STREAM_ENTRY:
+                continue
+            name = entry[:max(0, name_length - 2)].decode('utf-16-le', 'replace')
+            if name.lower() not in names:
+                continue
+            if size >= self.mini_cutoff:
+                return self._stream(start, size)
+            if root is None:
+                raise XlsFormatError('mini stream without a root entry')
+            self._mini_stream = self._stream(*root)
+            self._minifat = self._stream(self.minifat_start, 1 << 62)
+            return _Stream(start, size, self.mini_sector_size, self._extend_mini, self._read_mini_sectors)
+        return None
+
+
+def _records(stream, offset):
+    # Yields (offset, type, length) and leaves the stream at the record data.
+    # The position is kept here rather than in the stream, so a sheet reader
+    # and the string table reader can take turns on the same stream.
+    while True:
+        stream.seek(offset)
+        header = stream.read(4)
+        if len(header) < 4:
+            return
+        record_type, length = struct.unpack('<HH', header)
+        yield offset, record_type, length
+        offset += 4 + length
+
+
+def _chars(data, pos, count, high_byte):
+    # BIFF8 stores a string either as UTF-16 or "compressed" to its low bytes
+    if high_byte:
+        end = pos + 2 * count
+        return data[pos:end].decode('utf-16-le', 'replace'), end
+    end = pos + count
+    return data[pos:end].decode('latin-1'), end
+
+
+def _unicode_string(data, pos):
+    # XLUnicodeString: 16-bit length, flags, characters
+    count, flags = struct.unpack_from('<HB', data, pos)
+    return _chars(data, pos + 3, count, flags & 1)[0]
+
+
+def _short_unicode_string(data, pos):
+    count, flags = data[pos], data[pos + 1]
+    return _chars(data, pos + 2, count, flags & 1)[0]
+
+
+def _rk(value):
+    if value & 2:
+        number = struct.unpack('<i', struct.pack('<I', value))[0] >> 2
+    else:
+        number = struct.unpack('<d', struct.pack('<Q', (value & 0xFFFFFFFC) << 32))[0]
+    return number / 100 if value & 1 else number
+
+
+def _number(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _workbook_globals(stream):
+    # Returns ([(name, offset)] of the worksheets, offset of the SST record or None)
+    records = _records(stream, 0)
+    _, record_type, length = next(records, (0, None, 0))
+    if record_type != BOF:
+        raise XlsFormatError('workbook stream does not start with BOF')
+    version = struct.unpack('<H', stream.read(length)[:2])[0]
+    if version != BIFF8:
+        raise XlsFormatError(f"BIFF version {version:#06x} is not supported")
+
+    sheets = []
+    for offset, record_type, length in records:
+        if record_type == BOUNDSHEET:
+            data = stream.read(length)
+            sheet_offset, sheet_type = struct.unpack_from('<IxB', data)
+            if sheet_type == 0:
+                sheets.append((_short_unicode_string(data, 6), sheet_offset))
+        elif record_type == SST:
+            # The sheet list precedes the string table, so nothing further is needed
+            return sheets, offset
+        elif record_type == FILEPASS:
+            raise XlsFormatError('workbook is encrypted')
+        elif record_type == EOF:
+            break
+    return sheets, None
+
+
+def _ordered(cells, positional):
+    if positional:
+        return [cells.get(column) for column in range(max(cells) + 1)]
+    return [cells[column] for column in sorted(cells)]
+
+
+def _rows(stream, offset, max_rows, positional=False):
+    # Yields (row index, cells) for the non-empty rows among the first max_rows,
+    # cells being ('s', sst index), ('v', text) or ('n', number as text) in
+    # column order. Cell records come grouped by row and in row order. With
+    # positional set, cells keeps None for empty columns so indices line up.
+    records = _records(stream, offset)
+    _, record_type, length = next(records, (0, None, 0))
+    if record_type != BOF:
+        raise XlsFormatError('worksheet does not start with BOF')
+    if struct.unpack('<HH', stream.read(length)[:4])[1] != BOF_WORKSHEET:
+        return
+
+    row = None
+    cells = {}
+    pending_formula = None
+    for _, record_type, length in records:
+        if record_type in (EOF, WINDOW2):
+            break
+        if record_type == STRING and pending_formula is not None:
+            cells[pending_formula] = ('v', _unicode_string(stream.read(length), 0))
+            pending_formula = None
+            continue
+        if record_type not in (LABELSST, LABEL, RSTRING, NUMBER, RK, MULRK, FORMULA):
+            continue
+
+        data = stream.read(length)
+        cell_row, column = struct.unpack_from('<HH', data)
+        if cell_row != row:
+            if cells:
+                yield row, _ordered(cells, positional)
+            if cell_row >= max_rows:
+                return
+            row = cell_row
+            cells = {}
+            pending_formula = None
+        if record_type == LABELSST:
+            cells[column] = ('s', struct.unpack_from('<I', data, 6)[0])
+        elif record_type in (LABEL, RSTRING):
+            cells[column] = ('v', _unicode_string(data, 6))
+        elif record_type == NUMBER:
+            cells[column] = ('n', _number(struct.unpack_from('<d', data, 6)[0]))
+        elif record_type == RK:
+            cells[column] = ('n', _number(_rk(struct.unpack_from('<I', data, 6)[0])))
+        elif record_type == MULRK:
+            for index in range((length - 6) // 6):
+                rk = struct.unpack_from('<I', data, 4 + 6 * index + 2)[0]
+                cells[column + index] = ('n', _number(_rk(rk)))
+        elif record_type == FORMULA:
+            if data[12:14] != b'\xff\xff':
+                cells[column] = ('n', _number(struct.unpack_from('<d', data, 6)[0]))
+            elif data[6] == 0:
+                # String result, carried by the STRING record that follows
+                pending_formula = column
+    if cells:
+        yield row, _ordered(cells, positional)
+
+
+_STRING_HEADER = struct.Struct('<HB')
+
+
+class _Continued:
+    # Walks a record and its CONTINUE records as one byte sequence
+
+    def __init__(self, stream, offset):
+        self._records = _records(stream, offset)
+        self._stream = stream
+        _, _, length = next(self._records)
+        self.data = stream.read(length)
+        self.pos = 0
+
+    def next_fragment(self):
+        _, record_type, length = next(self._records, (0, None, 0))
+        if record_type != CONTINUE:
+            raise XlsFormatError('string table ends early')
+        self.data = self._stream.read(length)
+        self.pos = 0
+
+    def take(self, size):
+        parts = []
+        while size:
+            if self.pos >= len(self.data):
+                self.next_fragment()
+            part = self.data[self.pos:self.pos + size]
+            self.pos += len(part)
+            size -= len(part)
+            parts.append(part)
+        return b''.join(parts)
+
+    def skip(self, size):
+        while size:
+            if self.pos >= len(self.data):
+                self.next_fragment()
+            step = min(size, len(self.data) - self.pos)
+            self.pos += step
+            size -= step
+
+    def string(self, decode=True):
+        # One XLUnicodeRichExtendedString; returns None when decode is false.
+        # Plain strings that sit inside the current fragment, which is nearly
+        # all of them, are handled without the general path's copying.
+        data, pos = self.data, self.pos
+        if pos + 3 <= len(data):
+            count, flags = _STRING_HEADER.unpack_from(data, pos)
+            end = pos + 3 + (count << (flags & 1))
+            if not flags & 12 and end <= len(data):
+                self.pos = end
+                return _chars(data, pos + 3, count, flags & 1)[0] if decode else None
+
+        count, flags = _STRING_HEADER.unpack(self.take(3))
+        runs = struct.unpack('<H', self.take(2))[0] if flags & 8 else 0
+        extra = struct.unpack('<I', self.take(4))[0] if flags & 4 else 0
+        text = self.chars(count, flags & 1)
+        self.skip(4 * runs + extra)
+        return text if decode else None
+
+    def chars(self, count, high_byte):
+        # A string cut by a CONTINUE resumes with a fresh flags byte, so the
+        # two halves may use different widths
+        parts = []
+        while count:
+            if self.pos >= len(self.data):
+                self.next_fragment()
+                high_byte = self.data[0] & 1
+                self.pos = 1
+            width = 2 if high_byte else 1
+            available = min(count, (len(self.data) - self.pos) // width)
+            if not available:
+                raise XlsFormatError('string cut inside a character')
+            text, self.pos = _chars(self.data, self.pos, available, high_byte)
+            parts.append(text)
+            count -= available
+        return ''.join(parts)
+
+
+class _SharedStrings:
+    # Text for LABELSST cells, which hold only an index into the SST record.
+    # The SST has no per-string offsets and runs on through CONTINUE records,
+    # so it is decoded from its start; the decoder stays where it stopped and
+    # steps over the strings no cell has asked for without building them. It
+    # goes back to the SST record only for an index behind that point.
+
+    def __init__(self, stream, offset):
+        self._stream = stream
+        self._offset = offset
+        self._found = {}
+        self._table = None
+        self._index = 0
+        self._unique = 0
+
+    def _restart(self):
+        self._table = _Continued(self._stream, self._offset)
+        _, self._unique = struct.unpack('<II', self._table.take(8))
+        self._index = 0
+
+    def resolve(self, cells):
+        wanted = {value for kind, value in cells if kind == 's'} - self._found.keys()
+        if wanted and self._offset is not None:
+            if self._table is None or min(wanted) < self._index:
+                self._restart()
+            last = min(max(wanted), self._unique - 1)
+            table = self._table
+            while self._index <= last:
+                text = table.string(self._index in wanted)
+                if text is not None:
+                    self._found[self._index] = text
+                self._index += 1
+        return [self._found.get(value, '') if kind == 's' else value for kind, value in cells]
+
+
+def find_xls_header(source, required_columns=REQUIRED_COLUMNS, max_rows=MAX_ROWS, max_bytes=MAX_BYTES):
+    # Looks through the first max_rows rows of every worksheet, in workbook
+    # order, and stops at the first row holding all the required columns.
+    # source is a path or a seekable binary file object. Returns a HeaderMatch;
+    # without a match it describes the row that came closest.
+    if isinstance(source, (str, bytes)) or hasattr(source, '__fspath__'):
+        with open(source, 'rb') as f:
+            return find_xls_header(f, required_columns, max_rows, max_bytes)
+
+    matcher = ColumnMatcher(required_columns)
+    best = HeaderMatch(False, None, None, [], matcher.required_columns)
+    workbook = _CompoundFile(source).open(WORKBOOK_STREAMS)
+    if workbook is None:
+        raise XlsFormatError('no Workbook stream')
+    workbook.max_bytes = max_bytes
+    try:
+        sheets, sst_offset = _workbook_globals(workbook)
+        strings = _SharedStrings(workbook, sst_offset)
+        for name, offset in sheets:
+            for row, cells in _rows(workbook, offset, max_rows):
+                # A row with fewer text cells than required columns cannot be the header
+                if sum(kind != 'n' for kind, _ in cells) < len(matcher.required_columns):
+                    continue
+                header = strings.resolve(cells)
+                missing = matcher.missing(header)
+                if not missing:
+                    return HeaderMatch(True, name, row, header, frozenset())
+                if len(missing) < len(best.missing):
+                    best = HeaderMatch(False, name, row, header, missing)
+    except SniffBudgetExceeded:
+        telemetry.count('sniff.budget_exceeded.xls')
+    return best
+
+
+def iter_xls_sheets(source, max_rows=MAX_ROWS, max_bytes=MAX_BYTES):
+    # Yields (sheet name, rows) in BOUNDSHEET order, rows yielding (row index,
+    # values) for the non-empty rows among the first max_rows, values being text
+    # in column order with '' for empty cells. Every sheet's rows are read from
+    # the one Workbook stream, seeking to the sheet's BOF, so a sheet's rows can
+    # be abandoned part way but must not be read after the next sheet's start.
+    if isinstance(source, (str, bytes)) or hasattr(source, '__fspath__'):
+        with open(source, 'rb') as f:
+            yield from iter_xls_sheets(f, max_rows, max_bytes)
+        return
+
+    workbook = _CompoundFile(source).open(WORKBOOK_STREAMS)
+    if workbook is None:
+        raise XlsFormatError('no Workbook stream')
+    workbook.max_bytes = max_bytes
+    try:
+        sheets, sst_offset = _workbook_globals(workbook)
+    except SniffBudgetExceeded:
+        telemetry.count('sniff.budget_exceeded.xls')
+        return
+    strings = _SharedStrings(workbook, sst_offset)
+    for name, offset in sheets:
+        if workbook.bytes_read > max_bytes:
+            break
+        yield name, _sheet_values(workbook, offset, max_rows, strings)
+
+
+def _sheet_values(workbook, offset, max_rows, strings):
+    try:
+        for row, cells in _rows(workbook, offset, max_rows, positional=True):
+            resolved = iter(strings.resolve([cell for cell in cells if cell is not None]))
+            yield row, [next(resolved) if cell is not None else '' for cell in cells]
+    except SniffBudgetExceeded:
+        telemetry.count('sniff.budget_exceeded.xls')
+
+
+def xls_contains_columns(source, required_columns):
+    return find_xls_header(source, required_columns).matched
@@ -0,0 +1,290 @@
+import posixpath
+import zipfile
+from xml.etree.ElementTree import XMLPullParser
+from .columns import REQUIRED_COLUMNS, ColumnMatcher, HeaderMatch, SniffBudgetExceeded
+from .telemetry import telemetry
+
+# Reads start small and double up to CHUNK_SIZE: the header row is usually in the
+# first few KB and every byte fed to the parser is turned into tree nodes
+FIRST_CHUNK_SIZE = 4 * 1024
+CHUNK_SIZE = 64 * 1024
+# Rows examined per sheet, so a roster below a title block or on a later tab still matches
+MAX_ROWS = 50
+# Decompressed XML read from one workbook before giving up on it
+MAX_BYTES = 16 * 1024 * 1024
+
+# Transitional and strict OOXML use different namespaces for the r:id attribute
+REL_ID_ATTRS = (
+    '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id',
+    '{http://purl.oclc.org/ooxml/officeDocument/relationships}id',
+)
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+class _Budget:
+    # Decompressed bytes one workbook may still feed to the parser, across all its parts
+
+    def __init__(self, max_bytes):
+        self.remaining = max_bytes
+
+    def spend(self, size):
+        self.remaining -= size
+        if self.remaining < 0:
+            raise SniffBudgetExceeded()
+
+
+def _iter_events(stream, events=('end',), budget=None):
+    parser = XMLPullParser(events)
+    size = FIRST_CHUNK_SIZE
+    while True:
+        chunk = stream.read(size)
+        if not chunk:
+            break
+        if budget is not None:
+            budget.spend(len(chunk))
+        size = min(size * 2, CHUNK_SIZE)
+        parser.feed(chunk)
+        yield from parser.read_events()
+    parser.close()
+    yield from parser.read_events()
+
+
+def _resolve_target(target):
+    if target.startswith('/'):
+        return target.lstrip('/')
+    return posixpath.normpath(posixpath.join('xl', target))
+
+
+def _workbook_parts(archive):
+    names = set(archive.namelist())
+
+    worksheets = {}
+    shared_strings_part = 'xl/sharedStrings.xml'
+    if 'xl/_rels/workbook.xml.rels' in names:
+        with archive.open('xl/_rels/workbook.xml.rels') as f:
+            for _, elem in _iter_events(f):
+                if _local(elem.tag) != 'Relationship':
+                    continue
+                rel_type = elem.get('Type', '')
+                if rel_type.endswith('/worksheet'):
+                    worksheets[elem.get('Id')] = _resolve_target(elem.get('Target', ''))
+                elif rel_type.endswith('/sharedStrings'):
+                    shared_strings_part = _resolve_target(elem.get('Target', ''))
+
+    sheets = []
+    if 'xl/workbook.xml' in names:
+        with archive.open('xl/workbook.xml') as f:
+            for _, elem in _iter_events(f):
+                if _local(elem.tag) != 'sheet':
+                    continue
+                rel_id = next((elem.get(attr) for attr in REL_ID_ATTRS if elem.get(attr)), None)
+                part = worksheets.get(rel_id)
+                if part in names:
+                    sheets.append((elem.get('name'), part))
+
+    # Fall back to the conventional layout when the workbook part is missing or unreadable
+    if not sheets:
+        sheets = [
+            (posixpath.splitext(posixpath.basename(name))[0], name)
+            for name in sorted(names)
+            if name.startswith('xl/worksheets/') and name.endswith('.xml')
+        ]
+
+    if shared_strings_part not in names:
+        shared_strings_part = None
+    return sheets, shared_strings_part
+
+
+def _text(elem):
+    # Rich text keeps its runs in <r><t>; phonetic hints in <rPh> are not part of the value
+    parts = []
+    for child in elem:
+        tag = _local(child.tag)
+        if tag == 't':
+            parts.append(child.text or '')
+        elif tag == 'r':
+            parts.extend(t.text or '' for t in child if _local(t.tag) == 't')
+    return ''.join(parts)
+
+
+def _cell(elem):
+    cell_type = elem.get('t')
+    if cell_type == 'inlineStr':
+        for child in elem:
+            if _local(child.tag) == 'is':
+                return 'v', _text(child)
+        return None
+
+    value = None
+    for child in elem:
+        if _local(child.tag) == 'v':
+            value = child.text
+            break
+    if value is None or value == '':
+        return None
+    if cell_type == 's':
+        return 's', int(value)
+    if cell_type == 'str':
+        return 'v', value
+    # Numbers, dates, booleans and errors can never be a column name
+    return 'n', value
+
+
+def _column(ref):
+    # 0-based column of a cell reference such as 'AB12'
+    column = 0
+    for char in ref:
+        if not char.isalpha():
+            break
+        column = column * 26 + ord(char.upper()) - 64
+    return column - 1
+
+
+def _placed(elem):
+    # The row's cells at their column positions, None where a cell is missing
+    cells = []
+    for child in elem:
+        if _local(child.tag) != 'c':
+            continue
+        ref = child.get('r')
+        column = _column(ref) if ref else len(cells)
+        cells.extend([None] * (column - len(cells)))
+        if column == len(cells):
+            cells.append(_cell(child))
+    return cells
+
+
+def _rows(archive, part, max_rows, budget, positional=False):
+    # Yields (row index, cells) for the non-empty rows among the first max_rows.
+    # With positional set, cells keeps None for empty columns so indices line up.
+    with archive.open(part) as f:
+        position = 0
+        for _, elem in _iter_events(f, budget=budget):
+            tag = _local(elem.tag)
+            if tag == 'row':
+                number = elem.get('r', '')
+                index = int(number) - 1 if number.isdigit() else position
+                position = index + 1
+                if index >= max_rows:
+                    return
+                if positional:
+                    cells = _placed(elem)
+                else:
+                    cells = [_cell(child) for child in elem if _local(child.tag) == 'c']
+                    cells = [cell for cell in cells if cell is not None]
+                elem.clear()
+                if any(cells):
+                    yield index, cells
+            elif tag == 'sheetData':
+                return
+
+
+class _SharedStrings:
+    # Resolves shared-string indices with one forward pass over the table,
+    # keeping only the strings asked for. Excel numbers strings in sheet order,
+    # so later sheets ask for later indices and the pass rarely restarts.
+
+    def __init__(self, archive, part, budget):
+        self._archive = archive
+        self._part = part
+        self._budget = budget
+        self._found = {}
+        self._events = None
+        self._index = 0
+
+    def _restart(self):
+        self.close()
+        self._file = self._archive.open(self._part)
+        self._events = _iter_events(self._file, ('start', 'end'), self._budget)
+        self._root = None
+        self._index = 0
+
+    def close(self):
+        if self._events is not None:
+            self._events.close()
+            self._file.close()
+            self._events = None
+
+    def resolve(self, cells):
+        wanted = {value for kind, value in cells if kind == 's'} - self._found.keys()
+        if wanted and self._part is not None:
+            if self._events is None or min(wanted) < self._index:
+                self._restart()
+            last = max(wanted)
+            for event, elem in self._events:
+                if self._root is None:
+                    self._root = elem
+                if event != 'end' or _local(elem.tag) != 'si':
+                    continue
+                if self._index in wanted:
+                    self._found[self._index] = _text(elem)
+                self._index += 1
+                # Drop every string seen so far so memory stays flat on huge tables
+                self._root.clear()
+                if self._index > last:
+                    break
+        return [self._found.get(value, '') if kind == 's' else value for kind, value in cells]
+
+
+def find_xlsx_header(source, required_columns=REQUIRED_COLUMNS, max_rows=MAX_ROWS, max_bytes=MAX_BYTES):
+    # Looks through the first max_rows rows of every sheet, in workbook order,
+    # and stops at the first row holding all the required columns. source is a
+    # path or a seekable binary file object. Returns a HeaderMatch; without a
+    # match it describes the row that came closest.
+    matcher = ColumnMatcher(required_columns)
+    best = HeaderMatch(False, None, None, [], matcher.required_columns)
+    budget = _Budget(max_bytes)
+    with zipfile.ZipFile(source) as archive:
+        sheets, shared_strings_part = _workbook_parts(archive)
+        strings = _SharedStrings(archive, shared_strings_part, budget)
+        try:
+            for name, part in sheets:
+                for row, cells in _rows(archive, part, max_rows, budget):
+                    # A row with fewer text cells than required columns cannot be the header
+                    if sum(kind != 'n' for kind, _ in cells) < len(matcher.required_columns):
+                        continue
+                    header = strings.resolve(cells)
+                    missing = matcher.missing(header)
+                    if not missing:
+                        return HeaderMatch(True, name, row, header, frozenset())
+                    if len(missing) < len(best.missing):
+                        best = HeaderMatch(False, name, row, header, missing)
+        except SniffBudgetExceeded:
+            telemetry.count('sniff.budget_exceeded.xlsx')
+        finally:
+            strings.close()
+    return best
+
+
+def iter_xlsx_sheets(source, max_rows=MAX_ROWS, max_bytes=MAX_BYTES):
+    # Yields (sheet name, rows) in workbook order, rows yielding (row index,
+    # values) for the non-empty rows among the first max_rows, values being text
+    # in column order with '' for empty cells. A sheet's rows can be abandoned
+    # part way; they must not be read after moving on to the next sheet.
+    budget = _Budget(max_bytes)
+    with zipfile.ZipFile(source) as archive:
+        sheets, shared_strings_part = _workbook_parts(archive)
+        strings = _SharedStrings(archive, shared_strings_part, budget)
+        try:
+            for name, part in sheets:
+                if budget.remaining < 0:
+                    break
+                yield name, _sheet_values(archive, part, max_rows, budget, strings)
+        finally:
+            strings.close()
+
+
+def _sheet_values(archive, part, max_rows, budget, strings):
+    try:
+        for row, cells in _rows(archive, part, max_rows, budget, positional=True):
+            resolved = iter(strings.resolve([cell for cell in cells if cell is not None]))
+            yield row, [next(resolved) if cell is not None else '' for cell in cells]
+    except SniffBudgetExceeded:
+        telemetry.count('sniff.budget_exceeded.xlsx')
+
+
+def xlsx_contains_columns(source, required_columns):
+    return find_xlsx_header(source, required_columns).matched
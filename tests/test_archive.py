@@ -0,0 +1,111 @@
+import io
+import os
+import tempfile
+import zipfile
+
+import pytest
+
+from benchmarks.synth import ROSTER_HEADER, roster_rows, write_roster_xlsx
+from globalfinder.archive import ArchiveScanner, ZipLimitExceeded
+from globalfinder.detectors import has_required_columns
+from globalfinder.scanner import process_archive
+
+ROSTER_CSV = ('\r\n'.join(','.join(row) for row in [ROSTER_HEADER] + [
+    [str(value) for value in row] for row in roster_rows(20)
+]) + '\r\n').encode('utf-8')
+
+
+def zip_bytes(members, compression=zipfile.ZIP_DEFLATED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression) as archive:
+        for name, body in members:
+            archive.writestr(name, body)
+    return buffer.getvalue()
+
+
+def write_zip(path, members):
+    with open(path, 'wb') as f:
+        f.write(zip_bytes(members))
+    return str(path)
+
+
+def recording_scanner(**limits):
+    seen = []
+
+    def classify(name, member):
+        seen.append(name)
+        return has_required_columns(name, member)
+    return ArchiveScanner(classify, **limits), seen
+
+
+def test_members_are_classified_without_temp_files(tmp_path, monkeypatch):
+    workbook = tmp_path / 'roster.xlsx'
+    write_roster_xlsx(str(workbook), rows=50)
+    source = write_zip(tmp_path / 'export.zip', [
+        ('readme.txt', b'not a roster'),
+        ('other.csv', b'Order,Amount\r\n1,2\r\n'),
+        ('reports/roster.xlsx', workbook.read_bytes()),
+    ])
+    os.remove(workbook)
+
+    scratch = tmp_path / 'tmp'
+    scratch.mkdir()
+    monkeypatch.setattr(tempfile, 'tempdir', str(scratch))
+
+    def refuse(*args, **kwargs):
+        raise AssertionError('the zip scan created a temporary file')
+    for name in ('mkstemp', 'mkdtemp', 'NamedTemporaryFile', 'TemporaryFile', 'SpooledTemporaryFile',
+                 'TemporaryDirectory'):
+        monkeypatch.setattr(tempfile, name, refuse)
+    monkeypatch.setattr(zipfile.ZipFile, 'extract', refuse)
+    monkeypatch.setattr(zipfile.ZipFile, 'extractall', refuse)
+
+    hit = process_archive(source)
+    assert hit.member == 'reports/roster.xlsx'
+    assert os.listdir(scratch) == []
+    assert sorted(os.listdir(tmp_path)) == ['export.zip', 'tmp']
+
+
+def test_members_that_cannot_hold_a_roster_are_not_read(tmp_path):
+    source = write_zip(tmp_path / 'mixed.zip', [
+        ('photo.jpg', os.urandom(1024)),
+        ('notes.txt', b'Employee Number'),
+        ('budget.csv', b'Date,Amount\r\n'),
+    ])
+    scanner, seen = recording_scanner()
+    assert scanner.scan(source) is None
+    assert seen == ['budget.csv']
+
+
+def test_nested_archives_follow_the_depth_limit(tmp_path):
+    inner = zip_bytes([('roster.csv', ROSTER_CSV)])
+    source = write_zip(tmp_path / 'outer.zip', [('inner.zip', zip_bytes([('deeper.zip', inner)]))])
+    scanner, _ = recording_scanner(max_depth=2)
+    assert scanner.scan(source) == 'inner.zip/deeper.zip/roster.csv'
+    scanner, seen = recording_scanner(max_depth=1)
+    assert scanner.scan(source) is None
+    assert seen == []
+
+
+def test_oversized_member_is_refused_before_it_is_read(tmp_path):
+    source = write_zip(tmp_path / 'big.zip', [('roster.csv', ROSTER_CSV + os.urandom(4096))])
+    scanner, seen = recording_scanner(max_member_size=1024)
+    with pytest.raises(ZipLimitExceeded, match='expands to'):
+        scanner.scan(source)
+    assert seen == []
+
+
+def test_zip_bomb_is_refused_by_ratio(tmp_path):
+    source = write_zip(tmp_path / 'bomb.zip', [('roster.csv', b'\0' * (8 * 1024 * 1024))])
+    scanner, seen = recording_scanner()
+    with pytest.raises(ZipLimitExceeded, match='compression ratio'):
+        scanner.scan(source)
+    assert seen == []
+
+
+def test_total_expansion_is_bounded_across_members(tmp_path):
+    source = write_zip(tmp_path / 'many.zip', [(f"part{n}.csv", os.urandom(2048)) for n in range(4)])
+    scanner, seen = recording_scanner(max_total_size=5000)
+    with pytest.raises(ZipLimitExceeded, match='archive expands'):
+        scanner.scan(source)
+    assert seen == ['part0.csv', 'part1.csv']
@@ -0,0 +1,64 @@
+import csv
+import json
+import os
+
+from globalfinder.cli import main
+from globalfinder.manifest import MANIFEST_FOLDER, read_manifest
+from globalfinder.telemetry import telemetry
+
+ROSTER = ['Employee Number', 'Employee Name', 'Current Hire Date', 'Work Country', 'Business Title',
+          'Email Address', 'Business Group']
+RENAMED = ['Emp #', 'Name', 'Start Date', 'Country', 'Job Title', 'E-mail', 'Department']
+
+
+def write_roster(path, header):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for number in range(40):
+            writer.writerow([f"E{100000 + number}", f"Ann Smith{'abcdefghij'[number % 10]}", '2019-03-01',
+                             'Germany', 'Analyst', f"ann{number}@example.com", 'Sales'])
+
+
+def run(tmp_path, users, *extra):
+    share = tmp_path / 'share'
+    main([
+        '--users-path', str(users),
+        '--user-folders', 'Documents',
+        '--formats', 'csv',
+        '--share', str(share),
+        '--index', str(tmp_path / 'index.sqlite3'),
+        '--upload-spool', str(tmp_path / 'spool.sqlite3'),
+        '--checkpoint', str(tmp_path / 'checkpoint.json'),
+        '--manifest-format', 'jsonl',
+        '--log-level', 'ERROR',
+        *extra,
+    ])
+    folder = share / MANIFEST_FOLDER
+    latest = max((folder / name for name in os.listdir(folder)), key=os.path.getmtime)
+    return sorted(os.path.basename(row['path']) for row in read_manifest(str(latest)))
+
+
+def test_content_scan_reclassifies_files_the_index_remembers_as_misses(tmp_path):
+    documents = tmp_path / 'Users' / 'ann' / 'Documents'
+    documents.mkdir(parents=True)
+    write_roster(documents / 'roster.csv', ROSTER)
+    write_roster(documents / 'renamed.csv', RENAMED)
+
+    assert run(tmp_path, tmp_path / 'Users') == ['roster.csv']
+    assert run(tmp_path, tmp_path / 'Users', '--content-scan') == ['renamed.csv']
+
+
+def test_report_counts_what_worker_processes_read(tmp_path):
+    documents = tmp_path / 'Users' / 'ann' / 'Documents'
+    documents.mkdir(parents=True)
+    write_roster(documents / 'roster.csv', ROSTER)
+    write_roster(documents / 'renamed.csv', RENAMED)
+    telemetry.counters.clear()
+
+    assert run(tmp_path, tmp_path / 'Users', '--sniff-processes', '--full-rescan') == ['roster.csv']
+    reports = tmp_path / 'share' / 'reports'
+    (name,) = os.listdir(reports)
+    with open(reports / name, encoding='utf-8') as f:
+        counters = json.load(f)['counters']
+    assert counters['bytes.sniffed.csv'] == sum(os.path.getsize(documents / file) for file in os.listdir(documents))
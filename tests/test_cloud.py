@@ -0,0 +1,90 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.synth import ROSTER_HEADER, roster_rows, write_roster_xlsx
+from globalfinder.cloud import SKIP, CloudPolicy, SimulatedAttributes
+from globalfinder.scanner import find_matching_files
+from globalfinder.telemetry import telemetry
+
+EXTENSIONS = ('.csv', '.xlsx')
+
+
+def write_csv(path, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(','.join(ROSTER_HEADER) + '\r\n')
+        for row in roster_rows(rows):
+            f.write(','.join(str(value) for value in row) + '\r\n')
+
+
+@pytest.fixture
+def profile(tmp_path):
+    for folder in ('Documents', 'OneDrive'):
+        os.makedirs(tmp_path / folder)
+        write_csv(tmp_path / folder / 'roster.csv', 50)
+        write_roster_xlsx(str(tmp_path / folder / 'roster.xlsx'), 2000)
+    return tmp_path
+
+
+def scan(profile, policy, **options):
+    telemetry.counters.clear()
+    cloud = CloudPolicy(policy, provider=SimulatedAttributes(['*/OneDrive/*']), **options)
+    found = find_matching_files(str(profile), EXTENSIONS, cloud=cloud)
+    in_cloud = sorted(os.path.basename(hit.path) for hit in found if f"{os.sep}OneDrive{os.sep}" in hit.path)
+    return len(found), in_cloud, dict(telemetry.counters)
+
+
+def cloud_size(profile, *names):
+    return sum(os.path.getsize(profile / 'OneDrive' / name) for name in names)
+
+
+def test_simulated_attributes_match_the_globs(tmp_path):
+    provider = SimulatedAttributes(['*\\OneDrive\\*'])
+    assert provider.attributes(SimpleNamespace(path='C:/Users/a/OneDrive/x.csv'))
+    assert not provider.attributes(SimpleNamespace(path='C:/Users/a/Documents/x.csv'))
+    assert not SimulatedAttributes([]).attributes(SimpleNamespace(path='C:/Users/a/OneDrive/x.csv'))
+
+
+def test_skip_never_opens_a_placeholder(profile):
+    total, in_cloud, counters = scan(profile, 'skip')
+    assert (total, in_cloud) == (2, [])
+    assert counters['cloud.skipped'] == 2
+    assert counters.get('cloud.hydrated_bytes', 0) == 0
+
+
+def test_ranged_counts_the_whole_file_as_hydrated(profile):
+    total, in_cloud, counters = scan(profile, 'ranged')
+    assert in_cloud == ['roster.csv', 'roster.xlsx']
+    assert counters['cloud.ranged'] == 2
+    assert counters['cloud.hydrated_bytes'] == cloud_size(profile, 'roster.csv', 'roster.xlsx')
+    assert counters['bytes.sniffed.xlsx'] < cloud_size(profile, 'roster.xlsx')
+
+    # A range too small to settle either file still downloads both whole
+    total, in_cloud, counters = scan(profile, 'ranged', range_bytes=1024)
+    assert in_cloud == []
+    assert counters['cloud.inconclusive'] == 2
+    assert counters['cloud.hydrated_bytes'] == cloud_size(profile, 'roster.csv', 'roster.xlsx')
+
+
+def test_hydrate_opens_placeholders_whole(profile):
+    total, in_cloud, counters = scan(profile, 'hydrate')
+    assert (total, in_cloud) == (4, ['roster.csv', 'roster.xlsx'])
+    assert counters['cloud.hydrated'] == 2
+    assert counters['cloud.hydrated_bytes'] == cloud_size(profile, 'roster.csv', 'roster.xlsx')
+
+
+@pytest.mark.parametrize('policy', ['ranged', 'hydrate'])
+def test_placeholders_over_the_cap_are_skipped(profile, policy):
+    cap = os.path.getsize(profile / 'OneDrive' / 'roster.csv')
+    total, in_cloud, counters = scan(profile, policy, hydrate_max_bytes=cap)
+    assert in_cloud == ['roster.csv']
+    assert counters['cloud.skipped'] == 1
+    assert counters['cloud.hydrated_bytes'] == cap
+
+
+def test_local_files_are_read_without_limit(profile):
+    entry = next(entry for entry in os.scandir(profile / 'Documents') if entry.name == 'roster.xlsx')
+    assert CloudPolicy('ranged', provider=SimulatedAttributes(['*/OneDrive/*'])).read_limit(entry) is None
+    cloud_entry = next(entry for entry in os.scandir(profile / 'OneDrive') if entry.name == 'roster.xlsx')
+    assert CloudPolicy('skip', provider=SimulatedAttributes(['*/OneDrive/*'])).read_limit(cloud_entry) is SKIP
@@ -0,0 +1,49 @@
+import os
+import stat
+import sys
+
+import pytest
+
+from globalfinder.config import data_dir, data_path, prepare_data_path
+from globalfinder.index import ScanIndex
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason='checks POSIX owners and modes')
+
+
+@pytest.fixture
+def programdata(tmp_path, monkeypatch):
+    monkeypatch.setenv('PROGRAMDATA', str(tmp_path))
+    return tmp_path
+
+
+def test_data_dir_is_created_for_this_user_only(programdata):
+    prepare_data_path(data_path('scan_index.sqlite3'))
+    assert stat.S_IMODE(os.stat(data_dir()).st_mode) == 0o700
+
+
+def test_data_dir_others_can_write_to_is_refused(programdata):
+    os.mkdir(data_dir())
+    os.chmod(data_dir(), 0o777)
+    with pytest.raises(PermissionError, match='writable by other users'):
+        ScanIndex(data_path('scan_index.sqlite3'))
+
+
+@pytest.mark.skipif(not hasattr(os, 'geteuid') or os.geteuid() != 0, reason='needs root to hand files to another user')
+def test_data_dir_or_file_of_another_user_is_refused(programdata):
+    os.mkdir(data_dir(), 0o700)
+    os.chown(data_dir(), 12345, 12345)
+    with pytest.raises(PermissionError, match='owned by uid 12345'):
+        prepare_data_path(data_path('scan_index.sqlite3'))
+
+    os.chown(data_dir(), 0, 0)
+    with open(data_path('scan_index.sqlite3'), 'wb'):
+        pass
+    os.chown(data_path('scan_index.sqlite3'), 12345, 12345)
+    with pytest.raises(PermissionError, match='owned by uid 12345'):
+        prepare_data_path(data_path('scan_index.sqlite3'))
+
+
+def test_paths_given_on_the_command_line_are_only_created(programdata):
+    path = programdata / 'elsewhere' / 'index.sqlite3'
+    prepare_data_path(str(path))
+    assert path.parent.is_dir()
@@ -0,0 +1,92 @@
+import csv
+import io
+
+import pytest
+
+from benchmarks.synth import write_xlsx
+from globalfinder.content import ContentClassifier, _matching, EMAIL
+from globalfinder.scanner import process_matching_file
+
+PEOPLE = [
+    (f"E{104000 + number}", f"{first} {last}", f"2015-0{number % 9 + 1}-1{number % 10}", country,
+     'Analyst', f"{first.lower()}.{last.lower()}{number}@example.com", 'Finance')
+    for number, (first, last, country) in enumerate(
+        [('Ann', 'Smith', 'Germany'), ('Raj', 'Patel', 'India'), ('Li', 'Wang', 'China'), ('Eva', 'Novak', 'Czechia'),
+         ('Tom', 'Brown', 'United States'), ('Ana', 'Silva', 'Brazil'), ('Ola', 'Berg', 'Norway'),
+         ('Kim', 'Park', 'South Korea'), ('Joe', 'Walsh', 'Ireland'), ('Mia', 'Rossi', 'Italy')] * 3
+    )
+]
+
+
+def csv_bytes(rows, delimiter=','):
+    buffer = io.StringIO()
+    csv.writer(buffer, delimiter=delimiter, lineterminator='\r\n').writerows(rows)
+    return buffer.getvalue().encode('utf-8')
+
+
+# (file name, rows, is a roster)
+LABELED = [
+    ('renamed.csv', [['Emp #', 'Name', 'Start Date', 'Country', 'Job Title', 'E-mail', 'Department']] + PEOPLE, True),
+    ('headerless.csv', PEOPLE, True),
+    ('reordered.csv', [[row[5], row[0], row[1]] for row in PEOPLE], True),
+    ('semicolons.csv', [['Staff ID', 'Full Name', 'E-mail', 'Hire Date']]
+     + [[row[0], row[1], row[5], row[2]] for row in PEOPLE], True),
+    ('template.csv', [['Emp #', 'Name', 'E-mail', 'Start Date', 'Country']], False),
+    ('orders.csv', [['Order', 'Ordered', 'Ship Country', 'Amount']]
+     + [[f"SO-{n}", '2023-01-05', 'Germany', f"{n * 3.5:.2f}"] for n in range(30)], False),
+    ('budget.csv', [['Date', 'Amount', 'Memo']] + [['2024-02-01', f"{n}.00", f"line {n}"] for n in range(30)], False),
+    ('projects.csv', [['Project', 'Owner', 'Status']] + [[f"P{n}", 'Ann Smith', 'Open'] for n in range(30)], False),
+    ('notes.csv', [['Note']] + [[f"call back {n}"] for n in range(30)], False),
+]
+
+
+def classify(name, data):
+    if name.endswith('.xlsx'):
+        buffer = io.BytesIO()
+        write_xlsx(buffer, [('Sheet1', data)])
+        data = buffer.getvalue()
+    return ContentClassifier().classify(name, io.BytesIO(data))
+
+
+@pytest.fixture(scope='module')
+def outcomes():
+    results = []
+    for name, rows, label in LABELED:
+        delimiter = ';' if name.startswith('semicolons') else ','
+        results.append((name, classify(name, csv_bytes(rows, delimiter)).matched, label))
+        xlsx = name.replace('.csv', '.xlsx')
+        results.append((xlsx, classify(xlsx, rows).matched, label))
+    return results
+
+
+def test_precision_and_recall_on_the_labeled_corpus(outcomes):
+    found = {name for name, matched, _ in outcomes if matched}
+    rosters = {name for name, _, label in outcomes if label}
+    assert len(found & rosters) / len(found) == 1.0, sorted(found - rosters)
+    assert len(found & rosters) / len(rosters) == 1.0, sorted(rosters - found)
+
+
+def test_mapping_names_the_columns():
+    match = classify('reordered.csv', csv_bytes([[row[5], row[0], row[1]] for row in PEOPLE]))
+    assert match.mapping['Email Address'] == 0
+    assert match.mapping['Employee Number'] == 1
+    assert match.confidence >= 0.6
+
+
+def test_header_without_data_is_not_a_roster():
+    header = ['Email', 'Employee ID', 'Name', 'Hire Date', 'Country', 'Title', 'Department']
+    assert not classify('template.csv', csv_bytes([header, [''] * 7, [''] * 7])).matched
+
+
+def test_value_with_line_breaks_counts_once():
+    count = _matching(EMAIL)
+    assert count(['a@example.com\nb@example.com\nc@example.com', 'not an address']) == 0
+    assert count(['a@example.com', 'b@example.com']) == 2
+
+
+def test_scanner_reports_content_hits(tmp_path):
+    path = tmp_path / 'renamed.csv'
+    path.write_bytes(csv_bytes(LABELED[0][1]))
+    assert not process_matching_file(str(path))
+    hit = process_matching_file(str(path), content=ContentClassifier())
+    assert hit.verdict == 'content' and hit.confidence >= 0.6
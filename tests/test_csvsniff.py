@@ -0,0 +1,73 @@
+import io
+
+import pytest
+
+from benchmarks.synth import ROSTER_HEADER, csv_variants, roster_rows
+from globalfinder.columns import DEFAULT_MATCHER
+from globalfinder.csvsniff import SNIFF_BYTES, sniff_csv
+from globalfinder.detectors import detect_csv
+
+VARIANTS = {name: (data, expected) for name, data, expected in csv_variants()}
+
+# (variant, encoding, delimiter, header line)
+LAYOUTS = [
+    ('utf8', 'utf-8', ',', 0),
+    ('utf8_bom', 'utf-8', ',', 0),
+    ('utf16_bom_tab', 'utf-16-le', '\t', 0),
+    ('utf16be_bom', 'utf-16-be', ',', 0),
+    ('utf16_no_bom', 'utf-16-le', ',', 0),
+    ('cp1252', 'cp1252', ',', 0),
+    ('semicolon', 'utf-8', ';', 0),
+    ('tab', 'utf-8', '\t', 0),
+    ('pipe', 'utf-8', '|', 0),
+    ('lf_newlines', 'utf-8', ',', 0),
+    ('preamble', 'utf-8', ',', 3),
+    ('preamble_semicolon', 'utf-8', ';', 3),
+    ('messy_header', 'utf-8', ',', 0),
+]
+
+
+@pytest.mark.parametrize('name', sorted(VARIANTS))
+def test_variant_is_classified(name, tmp_path):
+    data, expected = VARIANTS[name]
+    path = tmp_path / f"{name}.csv"
+    path.write_bytes(data)
+    assert sniff_csv(str(path), ROSTER_HEADER).matched is expected
+    assert sniff_csv(io.BytesIO(data), ROSTER_HEADER).matched is expected
+    assert sniff_csv(data, ROSTER_HEADER).matched is expected
+
+
+@pytest.mark.parametrize('name, encoding, delimiter, line_number', LAYOUTS)
+def test_variant_layout_is_detected(name, encoding, delimiter, line_number):
+    result = sniff_csv(VARIANTS[name][0], ROSTER_HEADER)
+    assert (result.encoding, result.delimiter, result.line_number) == (encoding, delimiter, line_number)
+    assert result.missing == frozenset()
+
+
+def test_missing_keeps_the_configured_spelling():
+    result = sniff_csv(VARIANTS['partial_header'][0], ROSTER_HEADER)
+    assert result.missing == frozenset(ROSTER_HEADER[4:])
+    assert isinstance(result.missing, frozenset)
+    match = detect_csv(io.BytesIO(VARIANTS['partial_header'][0]), DEFAULT_MATCHER)
+    assert match.missing == DEFAULT_MATCHER.missing(ROSTER_HEADER[:4])
+
+
+def test_empty_file_misses_every_column():
+    assert sniff_csv(b'', ROSTER_HEADER).missing == frozenset(ROSTER_HEADER)
+
+
+class CountingStream(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.requested = 0
+
+    def read(self, size=-1):
+        self.requested += size if size >= 0 else len(self.getvalue())
+        return super().read(size)
+
+
+def test_large_file_is_read_only_up_to_the_budget():
+    line = (','.join(next(roster_rows(1))) + '\r\n').encode()
+    stream = CountingStream((','.join(ROSTER_HEADER) + '\r\n').encode() + line * 50000)
+    assert sniff_csv(stream, ROSTER_HEADER).matched
+    assert stream.requested <= SNIFF_BYTES
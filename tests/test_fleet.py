@@ -0,0 +1,37 @@
+import os
+import sqlite3
+
+from globalfinder.fleet import merge_manifests
+from globalfinder.manifest import ManifestWriter
+
+
+def write_run(share, hostname, started, size, fmt='jsonl'):
+    manifest = ManifestWriter(str(share), hostname, fmt, started=started)
+    manifest.add({'path': 'C:\\Users\\a\\roster.csv', 'size': size, 'hash': 'abc'})
+    return os.path.basename(manifest.close())
+
+
+def test_later_runs_win_within_the_same_second(tmp_path):
+    # Twelve runs resumed within one second: host-STAMP, host-STAMP-1 .. -11.
+    # By name, -1 sorts before the first run and -10 before -2.
+    started = 1700000000
+    names = [write_run(tmp_path, 'WS-001', started, size) for size in range(12)]
+    assert sorted(names)[0] != names[0]
+    database = str(tmp_path / 'fleet.sqlite3')
+
+    assert merge_manifests(str(tmp_path), database) == (12, 12)
+    db = sqlite3.connect(database)
+    assert db.execute('SELECT size, manifest FROM hits').fetchall() == [(11, names[-1])]
+    db.close()
+
+
+def test_merge_only_reads_new_manifests(tmp_path):
+    write_run(tmp_path, 'WS001', 1700000000, 1)
+    database = str(tmp_path / 'fleet.sqlite3')
+    assert merge_manifests(str(tmp_path), database) == (1, 1)
+    write_run(tmp_path, 'WS001', 1700000100, 2)
+    write_run(tmp_path, 'WS002', 1700000000, 3)
+    assert merge_manifests(str(tmp_path), database) == (2, 2)
+    db = sqlite3.connect(database)
+    assert db.execute('SELECT hostname, size FROM hits ORDER BY hostname').fetchall() == [('WS001', 2), ('WS002', 3)]
+    db.close()
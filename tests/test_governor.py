@@ -0,0 +1,37 @@
+import time
+
+import pytest
+
+from globalfinder import governor as governor_module
+from globalfinder.governor import Governor
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(governor_module.time, 'sleep', slept.append)
+    return slept
+
+
+def test_worker_reads_count_against_the_read_budget(sleeps):
+    governor = Governor(max_read_bytes_per_second=1000000, read_bytes=lambda: 0, sample_seconds=0)
+    assert governor.pace() and sleeps == []
+    governor.charge(0.0, 500000)
+    assert governor.pace()
+    assert 0.4 < sleeps[0] <= 0.5
+
+
+def test_worker_cpu_counts_against_the_cpu_budget(sleeps):
+    governor = Governor(max_cpu_percent=10, read_bytes=lambda: 0, sample_seconds=0)
+    governor.charge(0.05, 0)
+    governor.pace()
+    # The test's own CPU time counts too
+    assert 0.4 < sleeps[0] < 0.6
+
+
+def test_unbounded_budgets_do_not_pause(sleeps):
+    governor = Governor(100000, 1024 ** 4, read_bytes=lambda: 0, sample_seconds=0)
+    governor.charge(0.0, 1024 ** 2)
+    started = time.monotonic()
+    assert governor.pace()
+    assert sleeps == [] and time.monotonic() - started < 0.1
@@ -0,0 +1,151 @@
+import json
+import os
+import sqlite3
+import time
+
+import pytest
+
+from globalfinder.columns import Hit, Miss
+from globalfinder.index import STALE_AFTER_RUNS, ScanIndex
+
+
+def write(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return path
+
+
+def classify(path):
+    with open(path, encoding='utf-8') as f:
+        header = f.readline().strip()
+    if header == 'roster':
+        return Hit(path, 'header')
+    if header == 'broken':
+        raise ValueError('unreadable')
+    return Miss(path, frozenset({'Email Address'}))
+
+
+def sweep(index_path, root, classify=classify):
+    calls = []
+
+    def counting(path):
+        calls.append(path)
+        return classify(path)
+
+    hits, errors = [], []
+    with ScanIndex(index_path) as index:
+        for name in sorted(os.listdir(root)):
+            path = os.path.join(root, name)
+            try:
+                hit = index.check(path, counting)
+            except ValueError:
+                errors.append(path)
+                continue
+            if hit:
+                hits.append(hit)
+                index.mark_uploaded(path)
+        deleted = index.finish_run([root])
+    return calls, hits, errors, deleted
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / 'Users'
+    root.mkdir()
+    write(root / 'roster.csv', 'roster\n')
+    write(root / 'other.csv', 'other\n')
+    return root
+
+
+def test_unchanged_files_are_not_classified_again(tmp_path, tree):
+    index_path = str(tmp_path / 'index.sqlite3')
+    calls, hits, _, _ = sweep(index_path, str(tree))
+    assert len(calls) == 2 and len(hits) == 1
+    calls, hits, _, deleted = sweep(index_path, str(tree))
+    assert calls == [] and hits == [] and deleted == []
+
+
+def test_missing_columns_are_recorded(tmp_path, tree):
+    index_path = str(tmp_path / 'index.sqlite3')
+    sweep(index_path, str(tree))
+    db = sqlite3.connect(index_path)
+    rows = dict(db.execute('SELECT path, missing FROM files'))
+    db.close()
+    assert json.loads(rows[str(tree / 'other.csv')]) == ['Email Address']
+    assert rows[str(tree / 'roster.csv')] is None
+
+
+def test_unreadable_file_is_kept_and_retried(tmp_path, tree):
+    index_path = str(tmp_path / 'index.sqlite3')
+    broken = write(tree / 'broken.csv', 'broken\n')
+    calls, _, errors, deleted = sweep(index_path, str(tree))
+    assert errors == [str(broken)] and deleted == []
+
+    db = sqlite3.connect(index_path)
+    (error,) = db.execute('SELECT error FROM files WHERE path = ?', (str(broken),)).fetchone()
+    db.close()
+    assert error == 'ValueError: unreadable'
+
+    calls, _, errors, deleted = sweep(index_path, str(tree))
+    assert calls == [str(broken)] and deleted == []
+
+
+def test_deleted_files_are_reported(tmp_path, tree):
+    index_path = str(tmp_path / 'index.sqlite3')
+    sweep(index_path, str(tree))
+    os.remove(tree / 'other.csv')
+    _, _, _, deleted = sweep(index_path, str(tree))
+    assert deleted == [str(tree / 'other.csv')]
+
+
+def test_misses_are_classified_again_under_other_settings(tmp_path, tree):
+    index_path = str(tmp_path / 'index.sqlite3')
+    with ScanIndex(index_path, fingerprint='headers') as index:
+        for name in ('roster.csv', 'other.csv'):
+            index.check(str(tree / name), classify)
+        index.finish_run([str(tree)])
+
+    calls = []
+    with ScanIndex(index_path, fingerprint='content') as index:
+        for name in ('roster.csv', 'other.csv'):
+            index.check(str(tree / name), lambda path: calls.append(path) or classify(path))
+        index.finish_run([str(tree)])
+    assert calls == [str(tree / 'other.csv')]
+
+
+def test_sweep_stopped_by_windows_keeps_and_reports_earlier_folders(tmp_path):
+    index_path = str(tmp_path / 'index.sqlite3')
+    folders = [str(tmp_path / name) for name in ('a', 'b')]
+    for folder in folders:
+        os.makedirs(folder)
+        for number in range(3):
+            write(os.path.join(folder, f"{number}.csv"), 'ledger')
+    gone = write(os.path.join(folders[0], 'gone.csv'), 'ledger')
+    for folder in folders:
+        sweep(index_path, folder)
+
+    def check_folder(index, folder, calls):
+        for name in sorted(os.listdir(folder)):
+            index.check(os.path.join(folder, name), lambda path: calls.append(path) or classify(path))
+
+    # The next sweep: the first window finishes folder a and stops, then more
+    # windows than STALE_AFTER_RUNS pass without finishing b
+    os.remove(gone)
+    since = time.time()
+    calls = []
+    with ScanIndex(index_path) as index:
+        check_folder(index, folders[0], calls)
+        index.flush()
+    for _ in range(STALE_AFTER_RUNS + 2):
+        with ScanIndex(index_path) as index:
+            index.flush()
+    with ScanIndex(index_path) as index:
+        check_folder(index, folders[1], calls)
+        deleted = index.finish_run(folders, since=since)
+        evicted = index.compact(since=since)
+
+    assert calls == []
+    assert deleted == [gone]
+    assert evicted == 0
+    calls, _, _, deleted = sweep(index_path, folders[0])
+    assert (calls, deleted) == ([], [])
@@ -0,0 +1,131 @@
+import os
+import threading
+
+from globalfinder.purge import (
+    CHANGED, DELETED, FAILED, MISSING, LocalTransport, PurgeItem, UncTransport, purge,
+)
+from globalfinder.store import hash_file
+
+
+def place(root, host, path, body=b'Employee ID,Name\n1,A\n'):
+    target = LocalTransport(str(root)).resolve(host, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as f:
+        f.write(body)
+    return target
+
+
+def test_purge_reports_every_item(tmp_path):
+    deleted = place(tmp_path, 'WS001', 'C:\\Users\\a\\Desktop\\roster.csv')
+    resized = place(tmp_path, 'WS001', 'C:\\Users\\a\\Desktop\\resized.csv')
+    edited = place(tmp_path, 'WS002', 'D:\\Users\\b\\edited.csv')
+    items = [
+        PurgeItem('WS001', 'C:\\Users\\a\\Desktop\\roster.csv', os.path.getsize(deleted), hash_file(deleted)[0]),
+        PurgeItem('WS001', 'C:\\Users\\a\\Desktop\\resized.csv', 1),
+        PurgeItem('WS002', 'D:\\Users\\b\\edited.csv', os.path.getsize(edited), '0' * 64),
+        PurgeItem('WS002', 'D:\\Users\\b\\gone.csv'),
+    ]
+    results = purge(items, LocalTransport(str(tmp_path)), verify_hash=True)
+    assert [result.status for result in results] == [DELETED, CHANGED, CHANGED, MISSING]
+    assert not os.path.exists(deleted)
+    assert os.path.exists(resized) and os.path.exists(edited)
+
+
+def test_purge_covers_every_chunk(tmp_path):
+    items = []
+    for host in ('WS001', 'WS002', 'WS003'):
+        for number in range(7):
+            path = f"C:\\Users\\u\\roster_{number}.csv"
+            place(tmp_path, host, path)
+            items.append((host, path))
+    results = purge(items, LocalTransport(str(tmp_path)), max_workers=4, chunk_size=2)
+    assert sorted((result.host, result.path) for result in results) == sorted(items)
+    assert {result.status for result in results} == {DELETED}
+
+
+class Connections:
+    # Stands in for WNetAddConnection2W: records every call and holds the
+    # connection to `slow` until released
+
+    def __init__(self, slow=None, refuse=()):
+        self.slow = slow
+        self.refuse = refuse
+        self.release = threading.Event()
+        self.calls = []
+        self.cancelled = []
+
+    def add(self, remote, username, password):
+        self.calls.append((remote, username, password))
+        if self.slow and self.slow in remote:
+            assert self.release.wait(5)
+        if any(host in remote for host in self.refuse):
+            raise OSError(53, 'The network path was not found')
+
+    def cancel(self, remote):
+        self.cancelled.append(remote)
+
+
+def test_slow_host_does_not_hold_up_the_others(tmp_path):
+    connections = Connections(slow='SLOW')
+    transport = UncTransport('admin', 's3cret', connections.add, connections.cancel)
+    waiting = threading.Thread(target=transport.connect, args=('SLOW', 'C'))
+    waiting.start()
+    try:
+        done = threading.Thread(target=transport.connect, args=('FAST', 'C'))
+        done.start()
+        done.join(2)
+        assert not done.is_alive()
+    finally:
+        connections.release.set()
+        waiting.join()
+    transport.close()
+    assert sorted(connections.cancelled) == ['\\\\FAST\\C$', '\\\\SLOW\\C$']
+
+
+def test_each_host_connects_once(tmp_path):
+    connections = Connections(slow='WS001')
+    transport = UncTransport('admin', 's3cret', connections.add, connections.cancel)
+    threads = [threading.Thread(target=transport.connect, args=('WS001', 'C')) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    connections.release.set()
+    for thread in threads:
+        thread.join()
+    assert connections.calls == [('\\\\WS001\\C$', 'admin', 's3cret')]
+
+
+def test_unreachable_host_fails_only_its_files(tmp_path):
+    connections = Connections(refuse=('DOWN',))
+    transport = UncTransport('admin', 's3cret', connections.add, connections.cancel)
+    transport.resolve = LocalTransport(str(tmp_path)).resolve
+    place(tmp_path, 'UP', 'C:\\Users\\a\\roster.csv')
+    results = purge([('DOWN', 'C:\\Users\\a\\roster.csv'), ('UP', 'C:\\Users\\a\\roster.csv')], transport)
+    assert [result.status for result in results] == [FAILED, DELETED]
+    assert 'cannot connect' in results[0].detail
+
+
+def test_files_go_through_their_own_drive_share(tmp_path):
+    connections = Connections()
+    transport = UncTransport('admin', 's3cret', connections.add, connections.cancel)
+    assert transport.resolve('WS001', 'D:\\Data\\roster.csv') == '\\\\WS001\\D$\\Data\\roster.csv'
+    assert transport.resolve('WS001', 'e:/Exports/roster.csv') == '\\\\WS001\\E$\\Exports\\roster.csv'
+
+    local = LocalTransport(str(tmp_path))
+    transport.resolve = local.resolve
+    on_c = place(tmp_path, 'WS001', 'C:\\Data\\roster.csv')
+    on_d = place(tmp_path, 'WS001', 'D:\\Data\\roster.csv')
+    results = purge([('WS001', 'D:\\Data\\roster.csv')], transport)
+    assert [result.status for result in results] == [DELETED]
+    assert os.path.exists(on_c) and not os.path.exists(on_d)
+    assert connections.calls == [('\\\\WS001\\D$', 'admin', 's3cret')]
+    assert connections.cancelled == ['\\\\WS001\\D$']
+
+
+def test_paths_without_a_drive_are_refused(tmp_path):
+    connections = Connections()
+    transport = UncTransport('admin', 's3cret', connections.add, connections.cancel)
+    items = [('WS001', 'Users\\a\\roster.csv'), ('WS001', '\\\\other\\share\\roster.csv')]
+    results = purge(items, transport)
+    assert [result.status for result in results] == [FAILED, FAILED]
+    assert all('no drive letter' in result.detail for result in results)
+    assert connections.calls == []
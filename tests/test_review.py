@@ -0,0 +1,102 @@
+import csv
+import io
+import os
+import sqlite3
+
+from benchmarks.synth import ROSTER_HEADER, roster_rows, write_roster_xlsx
+from globalfinder.content import ContentClassifier
+from globalfinder.review import INFO_SUFFIX, extract_file, extract_records, review_share
+
+ROWS = list(roster_rows(25))
+
+
+def csv_bytes(header, rows, delimiter=','):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter, lineterminator='\r\n')
+    writer.writerow(header)
+    writer.writerows(rows)
+    return buffer.getvalue().encode('utf-8')
+
+
+def keys(records):
+    return sorted(record[0] for record in records)
+
+
+def test_header_roster_is_extracted():
+    data = b'Headcount export\r\n\r\n' + csv_bytes(ROSTER_HEADER, ROWS)
+    verdict, sheet, records = extract_records('roster.csv', io.BytesIO(data))
+    assert verdict == 'header'
+    assert keys(records) == sorted(f"id:{row[0]}" for row in ROWS)
+    by_key = {record[0]: record for record in records}
+    assert by_key[f"id:{ROWS[0][0]}"][1:4] == (ROWS[0][0], ROWS[0][1], ROWS[0][5])
+
+
+def test_semicolon_roster_with_commas_in_values_is_split_like_its_header():
+    # More commas than semicolons, so a fresh guess would split on ','
+    rows = [[row[0], ', '.join(reversed(row[1].split())), *row[2:4], f"{row[4]}, Level 2", row[5],
+             f"{row[6]}, EMEA, North, Region {n}, Cost centre {n}, Floor 2"] for n, row in enumerate(ROWS)]
+    data = csv_bytes(ROSTER_HEADER, rows, ';')
+    assert data.count(b',') > data.count(b';')
+    verdict, _, records = extract_records('roster.csv', io.BytesIO(data))
+    assert verdict == 'header'
+    assert len(records) == len(ROWS)
+    assert records[0][-1] == rows[0][6]
+
+
+def test_utf16_roster_is_extracted():
+    data = csv_bytes(ROSTER_HEADER, ROWS, '\t').decode('utf-8').encode('utf-16')
+    verdict, _, records = extract_records('roster.csv', io.BytesIO(data))
+    assert (verdict, len(records)) == ('header', len(ROWS))
+
+
+def test_content_mapped_roster_is_extracted():
+    header = ['Emp #', 'Name', 'Start Date', 'Country', 'Job Title', 'E-mail', 'Department']
+    data = csv_bytes(header, ROWS)
+    assert extract_records('renamed.csv', io.BytesIO(data)) == (None, None, [])
+    verdict, _, records = extract_records('renamed.csv', io.BytesIO(data), ContentClassifier())
+    assert verdict == 'content'
+    assert keys(records) == sorted(f"id:{row[0]}" for row in ROWS)
+    assert {record[3] for record in records} == {row[5] for row in ROWS}
+
+
+def test_workbook_is_extracted(tmp_path):
+    path = str(tmp_path / 'roster.xlsx')
+    write_roster_xlsx(path, rows=25)
+    verdict, member, sheet, records = extract_file(path, 'roster.xlsx')
+    assert (verdict, member, sheet, len(records)) == ('header', None, 'Roster', 25)
+
+
+def place(share, folder, name, data):
+    os.makedirs(share / folder, exist_ok=True)
+    (share / folder / name).write_bytes(data)
+    (share / folder / (name + INFO_SUFFIX)).write_text(f"File location: C:\\Users\\x\\{name}\n", encoding='utf-8')
+
+
+def test_second_run_skips_what_was_reviewed(tmp_path):
+    share = tmp_path / 'share'
+    roster = csv_bytes(ROSTER_HEADER, ROWS)
+    place(share, 'WS001.ann', 'roster.csv', roster)
+    place(share, 'WS002.ben', 'copy.csv', roster)
+    place(share, 'WS002.ben', 'notes.csv', b'Date,Amount\r\n2024-01-01,3\r\n')
+    database = str(tmp_path / 'review.sqlite3')
+
+    first = review_share(str(share), database, workers=1)
+    assert (first.sources, first.copies, first.bodies, first.records, first.errors) == (2, 3, 2, len(ROWS), 0)
+
+    again = review_share(str(share), database, workers=1)
+    assert (again.sources, again.copies, again.bodies) == (0, 0, 0)
+
+    more = [list(row) for row in roster_rows(5, seed=9)]
+    place(share, 'WS003.cat', 'new.csv', csv_bytes(ROSTER_HEADER, more))
+    place(share, 'WS003.cat', 'roster.csv', roster)
+    later = review_share(str(share), database, workers=1)
+    assert (later.sources, later.copies, later.bodies) == (1, 2, 1)
+
+    db = sqlite3.connect(database)
+    try:
+        hosts = dict(db.execute('SELECT hostname, COUNT(*) FROM copies GROUP BY hostname'))
+        (employees,) = db.execute('SELECT COUNT(*) FROM employees').fetchone()
+    finally:
+        db.close()
+    assert hosts == {'WS001': 1, 'WS002': 2, 'WS003': 2}
+    assert employees == len({row[0] for row in ROWS + more})
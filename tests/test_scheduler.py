@@ -0,0 +1,65 @@
+import os
+import zipfile
+from functools import partial
+
+import pytest
+
+from benchmarks.synth import ROSTER_HEADER, roster_rows
+from globalfinder.archive import ArchiveScanner
+from globalfinder.detectors import has_required_columns
+from globalfinder.governor import Governor
+from globalfinder.scanner import classify_file
+from globalfinder.scheduler import ScanPipeline
+from globalfinder.telemetry import telemetry
+
+EXTENSIONS = ('.csv', '.zip')
+ROSTER = ('\r\n'.join(','.join(row) for row in [ROSTER_HEADER, *roster_rows(20)]) + '\r\n').encode('utf-8')
+
+
+@pytest.fixture
+def tree(tmp_path):
+    folder = tmp_path / 'Documents'
+    folder.mkdir()
+    (folder / 'roster.csv').write_bytes(ROSTER)
+    (folder / 'ledger.csv').write_bytes(b'Date,Amount\r\n2024-01-01,3\r\n' * 50)
+    with zipfile.ZipFile(folder / 'export.zip', 'w') as archive:
+        archive.writestr('readme.txt', 'x')
+        archive.writestr('ledger.csv', 'Date,Amount\r\n')
+        archive.writestr('roster.csv', ROSTER)
+    return str(folder)
+
+
+def run(folder, sniff_processes, governor=None):
+    telemetry.counters.clear()
+    telemetry.histograms.clear()
+    hits = []
+    pipeline = ScanPipeline(
+        accept=lambda name: name.lower().endswith(EXTENSIONS),
+        classify=partial(classify_file, extensions=EXTENSIONS,
+                         archive_scanner=ArchiveScanner(has_required_columns)),
+        upload=lambda user, hit: hits.append(hit),
+        sniff_workers=2,
+        sniff_processes=sniff_processes,
+        governor=governor,
+    )
+    pipeline.run([('user', folder)])
+    counters = {name: value for name, value in telemetry.counters.items()
+                if name.startswith(('bytes.sniffed.', 'zip.', 'files.'))}
+    return sorted(os.path.basename(hit.path) for hit in hits), counters
+
+
+def test_worker_processes_report_the_classifier_counters(tree):
+    threads = run(tree, sniff_processes=False)
+    processes = run(tree, sniff_processes=True)
+    assert processes == threads
+    hits, counters = processes
+    assert hits == ['export.zip', 'roster.csv']
+    assert counters['bytes.sniffed.csv'] > 0 and counters['bytes.sniffed.zip'] > 0
+    assert (counters['zip.members_inspected'], counters['zip.members_skipped']) == (2, 1)
+
+
+def test_worker_processes_are_charged_to_the_governor(tree):
+    governor = Governor(100000, 1024 ** 4, read_bytes=lambda: 0)
+    _, counters = run(tree, sniff_processes=True, governor=governor)
+    assert governor._child_read == counters['bytes.sniffed.csv'] + counters['bytes.sniffed.zip']
+    assert governor._child_cpu > 0
@@ -0,0 +1,70 @@
+import json
+import logging
+import os
+
+import pytest
+
+from globalfinder.telemetry import SampledFilter, Telemetry, configure_logging, log, telemetry
+
+
+def test_reports_started_in_the_same_second_get_their_own_file(tmp_path):
+    runs = []
+    for _ in range(3):
+        run = Telemetry()
+        run.started = 1700000000.5
+        run.count('files.matched', len(runs) + 1)
+        runs.append(run)
+    paths = [run.write_report(str(tmp_path)) for run in runs]
+
+    assert len(set(paths)) == 3
+    assert sorted(os.listdir(tmp_path / 'reports')) == sorted(os.path.basename(path) for path in paths)
+    assert paths[1].endswith('-1.json') and paths[2].endswith('-2.json')
+    for number, path in enumerate(paths, 1):
+        with open(path, encoding='utf-8') as f:
+            assert json.load(f)['counters']['files.matched'] == number
+
+
+class Records(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture
+def captured():
+    handler = Records()
+    handler.addFilter(SampledFilter(burst=3, every=1000))
+    level = log.level
+    log.addHandler(handler)
+    log.setLevel('WARNING')
+    yield handler.messages
+    log.removeHandler(handler)
+    log.setLevel(level)
+
+
+def test_each_kind_of_failure_is_sampled_on_its_own(captured):
+    for number in range(10):
+        telemetry.error(OSError('unreadable'), 'Error reading file %s, skipping it', f"roster_{number}.csv")
+    telemetry.error(TimeoutError('share down'), 'Error uploading %s (attempt %d of %d)', 'roster_0.csv', 1, 3)
+
+    assert captured == [
+        'Error reading file roster_0.csv, skipping it: unreadable',
+        'Error reading file roster_1.csv, skipping it: unreadable',
+        'Error reading file roster_2.csv, skipping it: unreadable',
+        'Error uploading roster_0.csv (attempt 1 of 3): share down',
+    ]
+
+
+def test_paths_holding_percent_signs_are_logged_as_they_are(captured):
+    telemetry.error(OSError('unreadable'), 'Error reading file %s, skipping it', '100%done.csv')
+    assert captured == ['Error reading file 100%done.csv, skipping it: unreadable']
+
+
+def test_configure_logging_keeps_one_handler():
+    configure_logging('INFO')
+    configure_logging('WARNING')
+    assert sum(isinstance(handler.filters[0], SampledFilter) for handler in log.handlers
+               if handler.filters) == 1
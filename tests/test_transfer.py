@@ -0,0 +1,123 @@
+import os
+import time
+
+import pytest
+
+import globalfinder.transfer as transfer
+from globalfinder.store import hash_file
+from globalfinder.transfer import BandwidthLimiter, CopyTimeout, CopyVerifyError, resumable_copy
+
+CHUNK = 64 * 1024
+
+
+class Interrupted(Exception):
+    pass
+
+
+class CutAfter:
+    # Stands in for the bandwidth limiter and breaks the copy after limit bytes,
+    # the way a dropped VPN link does
+    def __init__(self, limit):
+        self.limit = limit
+        self.sent = 0
+
+    def consume(self, amount, deadline=None):
+        if self.sent + amount > self.limit:
+            raise Interrupted()
+        self.sent += amount
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'roster.xlsx'
+    path.write_bytes(os.urandom(10 * CHUNK + 123))
+    return str(path)
+
+
+def leftovers(folder):
+    return sorted(name for name in os.listdir(folder) if name.endswith(('.part', '.json')))
+
+
+def test_copy(tmp_path, source):
+    dest = str(tmp_path / 'share' / 'copy')
+    os.makedirs(os.path.dirname(dest))
+    digest, size = resumable_copy(source, dest, chunk_size=CHUNK)
+    assert open(dest, 'rb').read() == open(source, 'rb').read()
+    assert (digest, size) == hash_file(source)
+    assert leftovers(os.path.dirname(dest)) == []
+
+
+def test_interrupted_copy_resumes_from_its_checkpoint(tmp_path, source):
+    dest = str(tmp_path / 'copy')
+    with pytest.raises(Interrupted):
+        resumable_copy(source, dest, limiter=CutAfter(4 * CHUNK), chunk_size=CHUNK)
+    assert not os.path.exists(dest)
+    assert os.path.getsize(dest + '.part') == 4 * CHUNK
+
+    second = CutAfter(float('inf'))
+    resumable_copy(source, dest, limiter=second, chunk_size=CHUNK)
+    assert second.sent == os.path.getsize(source) - 4 * CHUNK
+    assert open(dest, 'rb').read() == open(source, 'rb').read()
+    assert leftovers(tmp_path) == []
+
+
+def test_torn_write_past_the_checkpoint_is_discarded(tmp_path, source):
+    dest = str(tmp_path / 'copy')
+    with pytest.raises(Interrupted):
+        resumable_copy(source, dest, limiter=CutAfter(3 * CHUNK), chunk_size=CHUNK)
+    with open(dest + '.part', 'ab') as part:
+        part.write(b'garbage from a write the checkpoint never saw')
+    resumable_copy(source, dest, chunk_size=CHUNK)
+    assert open(dest, 'rb').read() == open(source, 'rb').read()
+
+
+def test_changed_source_starts_over(tmp_path, source):
+    dest = str(tmp_path / 'copy')
+    with pytest.raises(Interrupted):
+        resumable_copy(source, dest, limiter=CutAfter(3 * CHUNK), chunk_size=CHUNK)
+    with open(source, 'wb') as f:
+        f.write(os.urandom(5 * CHUNK))
+    resumable_copy(source, dest, chunk_size=CHUNK)
+    assert open(dest, 'rb').read() == open(source, 'rb').read()
+
+
+def test_source_changed_during_the_copy_is_not_renamed(tmp_path, source):
+    dest = str(tmp_path / 'copy')
+    with pytest.raises(CopyVerifyError):
+        resumable_copy(source, dest, chunk_size=CHUNK, expected_digest='0' * 64)
+    assert not os.path.exists(dest) and leftovers(tmp_path) == []
+
+
+def test_verification_hashes_the_local_source(tmp_path, source, monkeypatch):
+    hashed = []
+    monkeypatch.setattr(transfer, 'hash_file', lambda path, hash_name: hashed.append(path) or hash_file(path))
+    dest = str(tmp_path / 'copy')
+    resumable_copy(source, dest, chunk_size=CHUNK)
+    assert hashed == [source]
+    hashed.clear()
+    resumable_copy(source, str(tmp_path / 'again'), chunk_size=CHUNK, expected_digest=hash_file(source)[0])
+    assert hashed == []
+
+
+def test_timeout_leaves_a_resumable_part(tmp_path, source):
+    dest = str(tmp_path / 'copy')
+    with pytest.raises(CopyTimeout):
+        resumable_copy(source, dest, timeout=0, chunk_size=CHUNK)
+    resumable_copy(source, dest, chunk_size=CHUNK)
+    assert open(dest, 'rb').read() == open(source, 'rb').read()
+
+
+def test_bandwidth_cap_does_not_sleep_past_the_deadline(tmp_path, source):
+    limiter = BandwidthLimiter(CHUNK, burst=CHUNK)
+    started = time.monotonic()
+    with pytest.raises(CopyTimeout):
+        resumable_copy(source, str(tmp_path / 'copy'), limiter=limiter, timeout=0.5, chunk_size=CHUNK)
+    assert time.monotonic() - started < 1.0
+
+
+def test_bandwidth_cap(tmp_path, source):
+    limiter = BandwidthLimiter(8 * CHUNK, burst=CHUNK)
+    started = time.monotonic()
+    resumable_copy(source, str(tmp_path / 'copy'), limiter=limiter, chunk_size=CHUNK)
+    # 10 chunks at 8 a second, the first one paid from the burst
+    assert time.monotonic() - started >= 1.0
@@ -0,0 +1,129 @@
+import os
+
+from globalfinder.columns import Hit
+from globalfinder.manifest import ManifestWriter, read_manifest
+from globalfinder.store import hash_file, object_name
+from globalfinder.upload import FakeBackend, LocalBackend, TransientUploadError, UploadClient, UploadSpool
+
+
+def make_hits(root, count, same_body=False):
+    hits = []
+    for number in range(count):
+        path = os.path.join(root, f"roster_{number}.csv")
+        with open(path, 'wb') as f:
+            f.write(b'same body' if same_body else os.urandom(4096))
+        hits.append(Hit(path, 'header'))
+    return hits
+
+
+def run(tmp_path, backend, hits, label='run', **options):
+    options.setdefault('backoff', 0.001)
+    spool = UploadSpool(str(tmp_path / 'spool.sqlite3'))
+    manifest = ManifestWriter(str(tmp_path / 'manifests' / label), 'host', 'jsonl')
+    client = UploadClient(backend, spool, manifest, 'host', seed=1, **options)
+    client.start()
+    for hit in hits:
+        client.submit('user', hit)
+    client.close()
+    rows = list(read_manifest(client.manifest_path))
+    return client, rows
+
+
+def pending(tmp_path):
+    spool = UploadSpool(str(tmp_path / 'spool.sqlite3'))
+    try:
+        return len(spool)
+    finally:
+        spool.close()
+
+
+def test_local_backend_stores_every_body_once(tmp_path):
+    src = tmp_path / 'src'
+    src.mkdir()
+    hits = make_hits(str(src), 5)
+    duplicate = src / 'copy.csv'
+    duplicate.write_bytes(open(hits[0].path, 'rb').read())
+    hits.append(Hit(str(duplicate), 'header'))
+
+    share = tmp_path / 'share'
+    client, rows = run(tmp_path, LocalBackend(str(share)), hits)
+    assert client.completed == 6 and pending(tmp_path) == 0
+    assert len(rows) == 6 and sum(row['uploaded'] for row in rows) == 5
+    for hit in hits:
+        digest = hash_file(hit.path)[0]
+        assert (share / object_name(digest)).read_bytes() == open(hit.path, 'rb').read()
+
+
+def test_directories_are_created_once(tmp_path):
+    src = tmp_path / 'src'
+    src.mkdir()
+    backend = FakeBackend(latency=0)
+    client, _ = run(tmp_path, backend, make_hits(str(src), 50))
+    assert backend.calls['makedirs'] == len(backend.directories)
+    assert client.completed == 50
+
+
+def test_transient_failures_are_retried(tmp_path):
+    src = tmp_path / 'src'
+    src.mkdir()
+    backend = FakeBackend(latency=0, failure_rate=0.3, seed=2)
+    client, rows = run(tmp_path, backend, make_hits(str(src), 30), retries=20)
+    assert backend.calls['failed'] > 0
+    assert client.completed == 30 and client.deferred == 0 and len(rows) == 30
+    assert pending(tmp_path) == 0
+
+
+def test_share_down_leaves_hits_spooled_for_the_next_run(tmp_path):
+    src = tmp_path / 'src'
+    src.mkdir()
+    hits = make_hits(str(src), 10)
+    client, rows = run(tmp_path, FakeBackend(latency=0, failure_rate=1.0), hits, 'down', retries=2)
+    assert client.completed == 0 and client.deferred == 10 and rows == []
+    assert pending(tmp_path) == 10
+
+    client, rows = run(tmp_path, FakeBackend(latency=0), [], 'next')
+    assert client.drained == 10 and client.completed == 10
+    assert sorted(row['path'] for row in rows) == sorted(hit.path for hit in hits)
+    assert pending(tmp_path) == 0
+
+
+def test_stored_hits_survive_a_crash_before_the_manifest_is_written(tmp_path):
+    src = tmp_path / 'src'
+    src.mkdir()
+    hits = make_hits(str(src), 5)
+    share = tmp_path / 'share'
+    spool = UploadSpool(str(tmp_path / 'spool.sqlite3'))
+    manifest = ManifestWriter(str(tmp_path / 'manifests' / 'crashed'), 'host', 'jsonl')
+    client = UploadClient(LocalBackend(str(share)), spool, manifest, 'host')
+    client.start()
+    for hit in hits:
+        client.submit('user', hit)
+    client.join()
+    # The process dies here: every body is on the share, the manifest is not
+    assert client.completed == 5 and pending(tmp_path) == 5
+
+    client, rows = run(tmp_path, LocalBackend(str(share)), [], 'next')
+    assert client.drained == 5
+    assert sorted(row['path'] for row in rows) == sorted(hit.path for hit in hits)
+    assert not any(row['uploaded'] for row in rows)
+    assert pending(tmp_path) == 0
+
+
+class FailingPuts(FakeBackend):
+
+    async def put(self, src, name, digest, hash_name):
+        self.calls['put'] += 1
+        raise TransientUploadError('put failed')
+
+
+def test_upload_locks_are_released(tmp_path):
+    src = tmp_path / 'src'
+    src.mkdir()
+    hits = make_hits(str(src), 4, same_body=True)
+    client, _ = run(tmp_path, FailingPuts(latency=0), hits, 'failing', retries=1)
+    assert client.deferred == 4 and client._uploading == {}
+
+    backend = FakeBackend(latency=0)
+    client, rows = run(tmp_path, backend, hits, 'existing')
+    assert client.completed == 4 and client._uploading == {}
+    assert backend.calls['put'] == 1 and sum(row['uploaded'] for row in rows) == 1
@@ -0,0 +1,79 @@
+import argparse
+import os
+
+import pytest
+
+from globalfinder.walk import HEADER_MIN_SIZE, Walker, add_walk_arguments, walker_from_arguments
+
+EXTENSIONS = ('.csv', '.xlsx')
+
+
+def walker(*argv):
+    parser = argparse.ArgumentParser()
+    add_walk_arguments(parser)
+    return walker_from_arguments(parser.parse_args(argv), EXTENSIONS)
+
+
+def touch(root, *parts, size=128):
+    path = os.path.join(root, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    return path
+
+
+def walked(root, walker):
+    return sorted(os.path.relpath(entry.path, root).replace(os.sep, '/') for entry in walker.walk(str(root)))
+
+
+@pytest.fixture
+def profile(tmp_path):
+    for folder in ('Documents', 'Desktop', 'Temp', 'Pictures', 'Downloads/tmp', 'AppData/Local',
+                   '$RECYCLE.BIN', 'repo/.git', 'app/node_modules/pkg'):
+        touch(tmp_path, *folder.split('/'), 'roster.csv')
+    touch(tmp_path, 'Documents', 'notes.txt')
+    touch(tmp_path, 'Documents', 'empty.csv', size=0)
+    return tmp_path
+
+
+def test_default_prune_skips_only_system_and_tool_folders(profile):
+    assert walked(profile, walker()) == [
+        'Desktop/roster.csv', 'Documents/empty.csv', 'Documents/roster.csv', 'Downloads/tmp/roster.csv',
+        'Pictures/roster.csv', 'Temp/roster.csv',
+    ]
+
+
+def test_temp_and_media_prune_is_opt_in(profile):
+    assert walked(profile, walker('--prune-temp-and-media')) == [
+        'Desktop/roster.csv', 'Documents/empty.csv', 'Documents/roster.csv',
+    ]
+
+
+def test_no_default_prune_walks_everything(profile):
+    assert len(walked(profile, walker('--no-default-prune'))) == 10
+
+
+def test_path_globs_prune_by_path(profile):
+    assert 'Downloads/tmp/roster.csv' not in walked(profile, walker('--prune', '*/Downloads/*'))
+    assert 'Temp/roster.csv' in walked(profile, walker('--prune', '*/Downloads/*'))
+
+
+def test_min_size_is_opt_in(profile):
+    assert 'Documents/empty.csv' in walked(profile, walker())
+    assert 'Documents/empty.csv' not in walked(profile, walker('--min-size', str(HEADER_MIN_SIZE)))
+
+
+def test_max_depth_and_max_size(profile):
+    touch(profile, 'Documents', 'large.csv', size=2 * 1024 * 1024)
+    assert walked(profile, walker('--max-depth', '1', '--max-size-mb', '1')) == [
+        'Desktop/roster.csv', 'Documents/empty.csv', 'Documents/roster.csv', 'Pictures/roster.csv',
+        'Temp/roster.csv',
+    ]
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink'), reason='needs symlinks')
+def test_link_loops_are_entered_once(tmp_path):
+    touch(tmp_path, 'Documents', 'roster.csv')
+    os.symlink(tmp_path, tmp_path / 'Documents' / 'loop')
+    assert walked(tmp_path, Walker(EXTENSIONS)) == ['Documents/roster.csv']
+    assert walked(tmp_path, Walker(EXTENSIONS, follow_links=True)) == ['Documents/roster.csv']